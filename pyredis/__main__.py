@@ -1,69 +1,56 @@
 import asyncio
-from typing import Any
 
 import typer
 
-from pyredis.command_handler import handle_command
-from pyredis.models.data_store import DataStore
-from pyredis.models.resp.data_types.array import Array
-from pyredis.models.resp.data_types.error import Error
-from pyredis.models.server_protocol import ServerProtocol
-from pyredis.models.append_only_persister import AppendOnlyPersister
-from pyredis.protocol_handler import extract_resp_data_and_size
-
-_DEFAULT_PORT = 6379
-_DEFAULT_HOSTNAME = "127.0.0.1"
-_DEFAULT_PERSISTENCE_FILE = "db.aof"
-
-
-async def flush_expired_data(data_store: DataStore) -> None:
-    while True:
-        data_store.flush_expired_data()
-        await asyncio.sleep(1)
-
-
-def restore_from_file(file_name: str, data_store: DataStore) -> bool:
-    buffer = bytearray()
-
-    try:
-        with open(file_name, "rb") as file:
-            for line in file:
-                buffer.extend(line)
-            while len(buffer) > 0:
-                command_data, size = extract_resp_data_and_size(buffer)
-                if command_data and isinstance(command_data, Array):
-                    buffer = buffer[size:]
-                    response = handle_command(command_data, data_store, None)
-                    if isinstance(response, Error):
-                        return False
-        return True
-    except FileNotFoundError:
-        return True
-
-
-async def main(
-    host: str = _DEFAULT_HOSTNAME,
-    port: int = _DEFAULT_PORT,
-    persistence_file: str = _DEFAULT_PERSISTENCE_FILE,
-) -> Any:
-    print(f"Starting PyRedis on port: {port}")
-
-    loop = asyncio.get_running_loop()
-
-    data_store = DataStore()
-    if not restore_from_file(persistence_file, data_store):
-        return -1
-
-    persister = AppendOnlyPersister(persistence_file)
-
-    _ = loop.create_task(flush_expired_data(data_store))
-
-    server = await loop.create_server(
-        lambda: ServerProtocol(data_store, persister), host, port
-    )
-    async with server:
-        await server.serve_forever()
+from pyredis.models.append_only_persister import FsyncPolicy
+from pyredis.models.eviction import EvictionPolicy
+from pyredis.server import (
+    DEFAULT_PORT,
+    DEFAULT_HOSTNAME,
+    DEFAULT_PERSISTENCE_FILE,
+    DEFAULT_SNAPSHOT_FILE,
+    DEFAULT_APPEND_FSYNC,
+    DEFAULT_AUTO_AOF_REWRITE_PERCENTAGE,
+    DEFAULT_AUTO_AOF_REWRITE_MIN_SIZE,
+    DEFAULT_HZ,
+    DEFAULT_ACTIVE_EXPIRE_BUDGET,
+    DEFAULT_MAXMEMORY,
+    DEFAULT_MAXMEMORY_POLICY,
+    DEFAULT_MAXMEMORY_SAMPLES,
+    DEFAULT_WORKERS,
+    DEFAULT_HASH_MAX_LISTPACK_ENTRIES,
+    DEFAULT_HASH_MAX_LISTPACK_VALUE,
+    DEFAULT_ZSET_MAX_LISTPACK_ENTRIES,
+    DEFAULT_ZSET_MAX_LISTPACK_VALUE,
+    DEFAULT_SET_MAX_INTSET_ENTRIES,
+    main,
+)
+
+
+def cli(
+    host: str = DEFAULT_HOSTNAME,
+    port: int = DEFAULT_PORT,
+    persistence_file: str = DEFAULT_PERSISTENCE_FILE,
+    snapshot_file: str = DEFAULT_SNAPSHOT_FILE,
+    append_fsync: FsyncPolicy = DEFAULT_APPEND_FSYNC,
+    auto_aof_rewrite_percentage: int = DEFAULT_AUTO_AOF_REWRITE_PERCENTAGE,
+    auto_aof_rewrite_min_size: int = DEFAULT_AUTO_AOF_REWRITE_MIN_SIZE,
+    hz: int = DEFAULT_HZ,
+    active_expire_budget: float = DEFAULT_ACTIVE_EXPIRE_BUDGET,
+    maxmemory: int = DEFAULT_MAXMEMORY,
+    maxmemory_policy: EvictionPolicy = DEFAULT_MAXMEMORY_POLICY,
+    maxmemory_samples: int = DEFAULT_MAXMEMORY_SAMPLES,
+    workers: int = DEFAULT_WORKERS,
+    hash_max_listpack_entries: int = DEFAULT_HASH_MAX_LISTPACK_ENTRIES,
+    hash_max_listpack_value: int = DEFAULT_HASH_MAX_LISTPACK_VALUE,
+    zset_max_listpack_entries: int = DEFAULT_ZSET_MAX_LISTPACK_ENTRIES,
+    zset_max_listpack_value: int = DEFAULT_ZSET_MAX_LISTPACK_VALUE,
+    set_max_intset_entries: int = DEFAULT_SET_MAX_INTSET_ENTRIES,
+) -> None:
+    # Typer parses the options from the command line into main's arguments.
+    if asyncio.run(main(**locals())) == -1:
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
-    typer.run(asyncio.run(main()))
+    typer.run(cli)
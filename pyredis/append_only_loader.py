@@ -0,0 +1,97 @@
+import mmap
+import os
+from typing import Callable
+
+from pyredis.command_handler import replay_command
+from pyredis.models.data_store import DataStore
+from pyredis.models.snapshot import load_snapshot, read_snapshot_header
+from pyredis.models.resp.shared_replies import is_error
+from pyredis.protocol_handler import (
+    Buffer,
+    ProtocolError,
+    extract_command_arguments_and_size,
+)
+
+_PROGRESS_INTERVAL = 16 * 1024 * 1024
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def restore(
+    file_name: str,
+    snapshot_file_name: str,
+    data_store: DataStore,
+    progress: ProgressCallback | None = None,
+) -> bool:
+    # A snapshot is only used when it was taken against the current append
+    # only file, in which case just the commands logged after it are replayed.
+    start, header = 0, read_snapshot_header(snapshot_file_name)
+    try:
+        aof_stat = os.stat(file_name)
+    except FileNotFoundError:
+        aof_stat = None
+    if (
+        header is not None
+        and aof_stat is not None
+        and header.aof_inode == aof_stat.st_ino
+        and header.aof_offset <= aof_stat.st_size
+    ):
+        if load_snapshot(snapshot_file_name, data_store):
+            start = header.aof_offset
+        else:
+            print(f"Ignoring {snapshot_file_name}: checksum mismatch")
+    return restore_from_file(file_name, data_store, progress, start)
+
+
+def restore_from_file(
+    file_name: str,
+    data_store: DataStore,
+    progress: ProgressCallback | None = None,
+    start: int = 0,
+) -> bool:
+    try:
+        file = open(file_name, "rb")
+    except FileNotFoundError:
+        return True
+
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        if size <= start:
+            return True
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            loaded = _replay(buffer, start, data_store, progress)
+
+    if loaded is None:
+        return False
+    if loaded < size:
+        print(
+            f"Truncating {size - loaded} bytes of incomplete command "
+            f"at the end of {file_name}"
+        )
+        os.truncate(file_name, loaded)
+    return True
+
+
+def _replay(
+    buffer: Buffer,
+    offset: int,
+    data_store: DataStore,
+    progress: ProgressCallback | None,
+) -> int | None:
+    size, next_report = len(buffer), offset + _PROGRESS_INTERVAL
+    while offset < size:
+        try:
+            arguments, command_size = extract_command_arguments_and_size(buffer, offset)
+        except ProtocolError:
+            return None
+        if arguments is None:
+            break
+        if is_error(replay_command(arguments, data_store)):
+            return None
+        offset += command_size
+        if progress and offset >= next_report:
+            progress(offset, size)
+            next_report += _PROGRESS_INTERVAL
+    if progress:
+        progress(offset, size)
+    return offset
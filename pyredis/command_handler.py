@@ -1,237 +1,1531 @@
-import builtins
-import collections
-from copy import deepcopy
-from datetime import datetime, timedelta, timezone
-from typing import Any
+import asyncio
+import math
+import sys
+from typing import Callable
 
+from pyredis.models import clock, lazy_free
 from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.command import Command
 from pyredis.models.data_store import DataStore
-from pyredis.models.entry import Entry
+from pyredis.models.encoding import (
+    INT64_MAX,
+    INT64_MIN,
+    encode_string,
+    object_encoding,
+    parse_int,
+    shared_integer,
+)
+from pyredis.models.entry import Entry, type_name
+from pyredis.models.glob import compile_glob
+from pyredis.models.hash import Hash
+from pyredis.models.memory import (
+    estimate_elements_size,
+    estimate_key_size,
+    estimate_value_size,
+    format_bytes,
+)
+from pyredis.models.quicklist import QuickList
 from pyredis.models.resp.data_types.array import Array
 from pyredis.models.resp.data_types.bulk_string import BulkString
 from pyredis.models.resp.data_types.error import (
     Error,
     NumberOfArgumentsError,
-    WrongValueTypeError,
     NonIntOrOutOfRangeError,
 )
 from pyredis.models.resp.data_types.integer import Integer
 from pyredis.models.resp.data_types.simple_string import SimpleString
+from pyredis.models.resp import shared_replies
+from pyredis.models.resp.pending_reply import PendingReply
 from pyredis.models.resp.resp_data_type import RespDataType
+from pyredis.models.resp.shared_replies import Reply, is_error
+from pyredis.models.set import Set, difference, intersection, union
+from pyredis.models.sorted_set import ScoreRange, SortedSet, format_score, parse_score
+
+_DEFAULT_SCAN_COUNT = 10
+_KEYS_BATCH_SIZE = 1000
+_ZADD_OPTIONS = {b"NX", b"XX", b"GT", b"LT", b"CH", b"INCR"}
+_NOT_A_FLOAT = Error("ERR", "value is not a valid float").encode()
+_EMPTY_SET = Set()
+_TIMEOUT_NOT_A_FLOAT = Error("ERR", "timeout is not a float or out of range").encode()
+_TIMEOUT_IS_NEGATIVE = Error("ERR", "timeout is negative").encode()
+_INVALID_EXPIRE_TIME = Error("ERR", "invalid expire time in 'set' command")
 
 
 def handle_command(
     command: Array, data_store: DataStore, persister: AppendOnlyPersister | None
-) -> RespDataType:
-    command_copy, name, args = deepcopy(command), command.popleft(), command
-    match str(name).upper():
-        case "PING":
-            return _handle_pong(args)
-        case "ECHO":
-            return _handle_echo(args)
-        case "SET":
-            response: RespDataType = _handle_set(args, data_store)
-            if persister and not isinstance(response, Error):
-                persister.log_command(command_copy)
-            return response
-        case "GET":
-            return _handle_get(args, data_store)
-        case "EXISTS":
-            return _handle_exists(args, data_store)
-        case "INCR":
-            response = _handle_incr(args, data_store)
-            if persister and not isinstance(response, Error):
-                persister.log_command(command_copy)
-            return response
-        case "DECR":
-            response = _handle_decr(args, data_store)
-            if persister and not isinstance(response, Error):
-                persister.log_command(command_copy)
-            return response
-        case "LPUSH":
-            response = _handle_lpush(args, data_store)
-            if persister and not isinstance(response, Error):
-                persister.log_command(command_copy)
-            return response
-        case "RPUSH":
-            response = _handle_rpush(args, data_store)
-            if persister and not isinstance(response, Error):
-                persister.log_command(command_copy)
-            return response
-        case "LRANGE":
-            return _handle_lrange(args, data_store)
-        case "DEL":
-            response = _handle_del(args, data_store)
-            if persister and not isinstance(response, Error):
-                persister.log_command(command_copy)
-            return response
-    return Error("ERR", f"unknown command '{name}', with args beginning with")
+) -> Reply:
+    arguments = [_to_bytes(element) for element in command]
+    name = arguments[0] if arguments else b""
+    command_spec = COMMANDS.get(name.upper())
+    if command_spec is None:
+        return Error(
+            "ERR",
+            f"unknown command '{name.decode(errors='replace')}', "
+            "with args beginning with",
+        )
+    if not command_spec.accepts(len(arguments)):
+        return NumberOfArgumentsError(command_spec.name)
+    if command_spec.write and data_store.maxmemory:
+        evicted = data_store.evict()
+        if evicted and persister:
+            persister.log_command(_to_array(b"DEL", *evicted))
+        if command_spec.deny_oom and data_store.over_maxmemory():
+            return shared_replies.OUT_OF_MEMORY
+    response = command_spec.handler(arguments[1:], data_store, persister)
+    # A blocked command logs what it does once it is served.
+    if (
+        command_spec.write
+        and not command_spec.logs_itself
+        and persister
+        and not is_error(response)
+        and not isinstance(response, PendingReply)
+    ):
+        persister.log_command(command)
+    if data_store.blocked_clients.ready:
+        data_store.blocked_clients.serve_ready()
+    return response
+
+
+def replay_command(arguments: list[bytes], data_store: DataStore) -> Reply:
+    command_spec = COMMANDS.get(arguments[0].upper()) if arguments else None
+    if command_spec is None or not command_spec.accepts(len(arguments)):
+        return Error("ERR", f"cannot replay command {arguments[:1]!r}")
+    return command_spec.handler(arguments[1:], data_store, None)
+
+
+def _to_bytes(element: RespDataType) -> bytes:
+    if isinstance(element, BulkString):
+        return element.data or b""
+    return str(element).encode()
+
+
+def _to_array(*arguments: bytes) -> Array:
+    return Array.from_list([BulkString(argument) for argument in arguments])
 
 
 def _handle_pong(
-    args: Array,
-) -> RespDataType:
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
     if len(args) == 0:
-        return SimpleString("PONG")
+        return shared_replies.PONG
     elif len(args) == 1:
-        return args.popleft()
+        return BulkString(args[0])
     else:
         return NumberOfArgumentsError("ping")
 
 
 def _handle_echo(
-    args: Array,
-) -> RespDataType:
-    if len(args) == 1:
-        return args.popleft()
-    else:
-        return NumberOfArgumentsError("echo")
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return BulkString(args[0])
 
 
-def _handle_set(args: Array, data_store: DataStore) -> SimpleString | Error:
+def _handle_set(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
     if len(args) == 2 or len(args) == 4:
-        key, value, expiry = str(args.popleft()), str(args.popleft()), _get_expiry(args)
+        key, value, expiry = args[0], args[1], _get_expiry(args[2:])
         if isinstance(expiry, Error):
             return expiry
-        try:
-            data_store[key] = Entry(int(value), expiry)
-        except ValueError:
-            data_store[key] = Entry(value, expiry)
-        return SimpleString("OK")
+        data_store[key] = Entry(encode_string(value), expiry)
+        if persister:
+            # A relative expiry would start over when the log is replayed.
+            persister.log_command(
+                _to_array(b"SET", key, value)
+                if expiry is None
+                else _to_array(b"SET", key, value, b"PXAT", b"%d" % expiry)
+            )
+        return shared_replies.OK
     else:
         return NumberOfArgumentsError("set")
 
 
-def _get_expiry(args: Array) -> datetime | None | Error:
+def _get_expiry(args: list[bytes]) -> int | None | Error:
     if len(args) == 0:
         return None
     try:
-        option, expiry = (
-            str(args.popleft()),
-            float(str(args.popleft())),
-        )
-    except TypeError:
+        option, expiry = args[0].upper(), float(args[1])
+    except ValueError:
         return NonIntOrOutOfRangeError()
-    match option.upper():
-        case "EX":
-            return datetime.now(timezone.utc) + timedelta(seconds=expiry)
-        case "PX":
-            return datetime.now(timezone.utc) + timedelta(milliseconds=expiry)
-        case "EXAT":
-            return datetime.fromtimestamp(expiry, timezone.utc)
-        case "PXAT":
-            return datetime.fromtimestamp(expiry / 1000, timezone.utc)
-    return NumberOfArgumentsError("set")
-
-
-def _handle_get(args: Array, data_store: DataStore) -> RespDataType:
-    if len(args) == 1:
-        key = str(args.popleft())
-        if key not in data_store:
-            return BulkString(None)
-        value = data_store[key].value
-        if isinstance(value, int):
-            return Integer(value)
-        elif isinstance(value, str):
-            return BulkString(value)
-        else:
-            return WrongValueTypeError()
+    match option:
+        case b"EX" | b"EXAT":
+            milliseconds = expiry * 1000
+        case b"PX" | b"PXAT":
+            milliseconds = expiry
+        case _:
+            return NumberOfArgumentsError("set")
+    if not math.isfinite(milliseconds):
+        return _INVALID_EXPIRE_TIME
+    absolute = int(milliseconds)
+    if option in (b"EX", b"PX"):
+        absolute += clock.now_ms()
+    # Snapshots store expiries as int64 milliseconds.
+    if not INT64_MIN <= absolute <= INT64_MAX:
+        return _INVALID_EXPIRE_TIME
+    return absolute
+
+
+def _handle_get(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.NIL
+    value = _string_value(entry.value)
+    if value is None:
+        return shared_replies.WRONG_TYPE
+    return b"$%d\r\n%b\r\n" % (len(value), value)
+
+
+def _string_value(value: object) -> bytes | None:
+    # The bytes of a string value, whatever its encoding, or None if the value
+    # is not a string.
+    if isinstance(value, int):
+        return b"%d" % value
+    if isinstance(value, bytes):
+        return value
+    return None
+
+
+def _handle_mget(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    # Values that are not strings are returned as nil, as in Redis.
+    values = []
+    for entry in data_store.lookup_many(args):
+        value = None if entry is None else _string_value(entry.value)
+        values.append(
+            shared_replies.NIL
+            if value is None
+            else b"$%d\r\n%b\r\n" % (len(value), value)
+        )
+    return b"*%d\r\n%b" % (len(values), b"".join(values))
+
+
+def _handle_mset(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if len(args) % 2:
+        return NumberOfArgumentsError("mset")
+    for key, value in zip(args[::2], args[1::2]):
+        data_store[key] = Entry(encode_string(value), None)
+    return shared_replies.OK
+
+
+def _handle_msetnx(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    # Sets all of the keys or, if any of them exists, none of them.
+    if len(args) % 2:
+        return NumberOfArgumentsError("msetnx")
+    if any(entry is not None for entry in data_store.lookup_many(args[::2])):
+        return shared_replies.integer(0)
+    for key, value in zip(args[::2], args[1::2]):
+        data_store[key] = Entry(encode_string(value), None)
+    return shared_replies.integer(1)
+
+
+def _handle_exists(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    num_exist = sum(entry is not None for entry in data_store.lookup_many(args))
+    return shared_replies.integer(num_exist)
+
+
+def _handle_incr(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _increment(args[0], 1, data_store)
+
+
+def _handle_decr(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _increment(args[0], -1, data_store)
+
+
+def _increment(key: bytes, amount: int, data_store: DataStore) -> Reply:
+    entry = data_store.lookup(key)
+    if entry is None:
+        data_store[key] = Entry(shared_integer(amount), None)
+        return shared_replies.integer(amount)
+    if isinstance(entry.value, bytes):
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    if not isinstance(entry.value, int):
+        return shared_replies.WRONG_TYPE
+    value = entry.value + amount
+    if not INT64_MIN <= value <= INT64_MAX:
+        return Error("ERR", "increment or decrement would overflow")
+    # The value may switch between a shared and a private integer.
+    size = estimate_value_size(entry.value)
+    entry.value = shared_integer(value)
+    data_store.resize(entry, estimate_value_size(entry.value) - size)
+    return shared_replies.integer(value)
+
+
+def _handle_lpush(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = _get_or_create_list(args[0], data_store)
+    if entry is None:
+        return shared_replies.WRONG_TYPE
+    entry.value.extendleft(args[1:])
+    data_store.resize(entry, estimate_elements_size(args[1:]))
+    data_store.blocked_clients.signal(args[0])
+    return shared_replies.integer(len(entry.value))
+
+
+def _handle_rpush(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = _get_or_create_list(args[0], data_store)
+    if entry is None:
+        return shared_replies.WRONG_TYPE
+    entry.value.extend(args[1:])
+    data_store.resize(entry, estimate_elements_size(args[1:]))
+    data_store.blocked_clients.signal(args[0])
+    return shared_replies.integer(len(entry.value))
+
+
+def _get_or_create_list(key: bytes, data_store: DataStore) -> Entry | None:
+    entry = data_store.lookup(key)
+    if entry is None:
+        entry = Entry(QuickList(), None)
+        data_store[key] = entry
+    elif not isinstance(entry.value, QuickList):
+        return None
+    return entry
+
+
+def _handle_lrange(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    try:
+        key, start, stop = args[0], int(args[1]), int(args[2])
+    except ValueError:
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    entry = data_store.lookup(key)
+    if entry is None:
+        return shared_replies.EMPTY_ARRAY
+    if not isinstance(entry.value, QuickList):
+        return shared_replies.WRONG_TYPE
+    start, stop = _list_range(start, stop, len(entry.value))
+    return _encode_bulk_strings(entry.value.range(start, stop))
+
+
+def _encode_bulk_strings(values: list[bytes]) -> bytes:
+    return b"*%d\r\n%b" % (
+        len(values),
+        b"".join([b"$%d\r\n%b\r\n" % (len(value), value) for value in values]),
+    )
+
+
+def _list_range(start: int, stop: int, length: int) -> tuple[int, int]:
+    # Converts an inclusive Redis range, where negative indexes count from the
+    # end, to a half-open range clamped to the list.
+    if start < 0:
+        start = max(start + length, 0)
+    if stop < 0:
+        stop += length
+    stop = min(stop + 1, length)
+    return start, max(start, stop)
+
+
+def _handle_lindex(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    try:
+        key, index = args[0], int(args[1])
+    except ValueError:
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    entry = data_store.lookup(key)
+    if entry is None:
+        return shared_replies.NIL
+    if not isinstance(entry.value, QuickList):
+        return shared_replies.WRONG_TYPE
+    try:
+        return BulkString(entry.value[index])
+    except IndexError:
+        return shared_replies.NIL
+
+
+def _handle_lset(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    try:
+        key, index, value = args[0], int(args[1]), args[2]
+    except ValueError:
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    entry = data_store.lookup(key)
+    if entry is None:
+        return Error("ERR", "no such key")
+    if not isinstance(entry.value, QuickList):
+        return shared_replies.WRONG_TYPE
+    try:
+        previous = entry.value[index]
+        entry.value[index] = value
+    except IndexError:
+        return Error("ERR", "index out of range")
+    data_store.resize(
+        entry, estimate_elements_size([value]) - estimate_elements_size([previous])
+    )
+    return shared_replies.OK
+
+
+def _handle_ltrim(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    try:
+        key, start, stop = args[0], int(args[1]), int(args[2])
+    except ValueError:
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    entry = data_store.lookup(key)
+    if entry is None:
+        return shared_replies.OK
+    if not isinstance(entry.value, QuickList):
+        return shared_replies.WRONG_TYPE
+    length = len(entry.value)
+    start, stop = _list_range(start, stop, length)
+    if start == stop:
+        data_store.delete(key)
+        return shared_replies.OK
+    removed = entry.value.range(0, start) + entry.value.range(stop, length)
+    entry.value.trim(start, stop)
+    data_store.resize(entry, -estimate_elements_size(removed))
+    return shared_replies.OK
+
+
+def _handle_lpop(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _pop_reply(args[0], True, data_store)
+
+
+def _handle_rpop(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _pop_reply(args[0], False, data_store)
+
+
+def _pop_reply(key: bytes, left: bool, data_store: DataStore) -> Reply:
+    entry = data_store.lookup(key)
+    if entry is None:
+        return shared_replies.NIL
+    if not isinstance(entry.value, QuickList):
+        return shared_replies.WRONG_TYPE
+    return BulkString(_pop(key, entry, left, data_store))
+
+
+def _pop(key: bytes, entry: Entry, left: bool, data_store: DataStore) -> bytes:
+    # Pops an element off a non-empty list, deleting the key once it is empty.
+    value: bytes = entry.value.popleft() if left else entry.value.pop()
+    if entry.value:
+        data_store.resize(entry, -estimate_elements_size([value]))
     else:
-        return NumberOfArgumentsError("get")
+        data_store.delete(key)
+    return value
 
 
-def _handle_exists(args: Array, data_store: DataStore) -> Integer | Error:
-    if len(args) > 0:
-        num_exist = len([arg for arg in args if (str(arg) in data_store)])
-        return Integer(num_exist)
+def _handle_lmove(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    source, destination = args[0], args[1]
+    pop_left, push_left = _parse_side(args[2]), _parse_side(args[3])
+    if pop_left is None or push_left is None:
+        return shared_replies.SYNTAX_ERROR
+    entry = data_store.lookup(source)
+    if entry is None:
+        return shared_replies.NIL
+    if not isinstance(entry.value, QuickList):
+        return shared_replies.WRONG_TYPE
+    value = _move(source, entry, destination, pop_left, push_left, data_store)
+    return shared_replies.WRONG_TYPE if value is None else BulkString(value)
+
+
+def _parse_side(side: bytes) -> bool | None:
+    # Whether a LEFT or RIGHT argument means the left end of a list.
+    match side.upper():
+        case b"LEFT":
+            return True
+        case b"RIGHT":
+            return False
+    return None
+
+
+def _move(
+    source: bytes,
+    entry: Entry,
+    destination: bytes,
+    pop_left: bool,
+    push_left: bool,
+    data_store: DataStore,
+) -> bytes | None:
+    # Moves an element from a non-empty source list to the destination list,
+    # unless the destination holds another type, in which case it returns
+    # None and nothing moves.
+    destination_entry = data_store.lookup(destination)
+    if destination_entry is not None and not isinstance(
+        destination_entry.value, QuickList
+    ):
+        return None
+    value = _pop(source, entry, pop_left, data_store)
+    # The destination may be the source, deleted by the pop if it is empty.
+    destination_entry = _get_or_create_list(destination, data_store)
+    assert destination_entry is not None
+    if push_left:
+        destination_entry.value.appendleft(value)
     else:
-        return NumberOfArgumentsError("exists")
+        destination_entry.value.append(value)
+    data_store.resize(destination_entry, estimate_elements_size([value]))
+    data_store.blocked_clients.signal(destination)
+    return value
 
 
-def _handle_incr(args: Array, data_store: DataStore) -> Integer | Error:
-    if len(args) == 1:
-        key = str(args.popleft())
-        entry = data_store.get(key, Entry(0, None))
-        if isinstance(entry.value, int):
-            entry.value += 1
-            data_store[key] = entry
-            return Integer(entry.value)
-        else:
-            return NonIntOrOutOfRangeError()
-    return NumberOfArgumentsError("incr")
-
-
-def _handle_decr(args: Array, data_store: DataStore) -> Integer | Error:
-    if len(args) == 1:
-        key = str(args.popleft())
-        entry = data_store.get(key, Entry(0, None))
-        if type(entry.value) is int:
-            entry.value -= 1
-            data_store[key] = entry
-            return Integer(entry.value)
-        else:
-            return NonIntOrOutOfRangeError()
+def _handle_blpop(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _blocking_pop(args, True, data_store, persister)
+
+
+def _handle_brpop(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _blocking_pop(args, False, data_store, persister)
+
+
+def _blocking_pop(
+    args: list[bytes],
+    left: bool,
+    data_store: DataStore,
+    persister: AppendOnlyPersister | None,
+) -> Reply:
+    # Pops from the first of the keys holding a list or, if none does, waits
+    # for one of them to be pushed to.
+    keys, timeout = args[:-1], _parse_timeout(args[-1])
+    if isinstance(timeout, bytes):
+        return timeout
+    for key in keys:
+        entry = data_store.lookup(key)
+        if entry is None:
+            continue
+        if not isinstance(entry.value, QuickList):
+            return shared_replies.WRONG_TYPE
+        return _encode_bulk_strings([key, _pop(key, entry, left, data_store)])
+
+    def serve(key: bytes) -> bytes | None:
+        entry = data_store.lookup(key)
+        if entry is None or not isinstance(entry.value, QuickList):
+            return None
+        if persister:
+            persister.log_command(_to_array(b"LPOP" if left else b"RPOP", key))
+        return _encode_bulk_strings([key, _pop(key, entry, left, data_store)])
+
+    return _block(keys, serve, timeout, shared_replies.NULL_ARRAY, data_store)
+
+
+def _handle_blmove(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    source, destination = args[0], args[1]
+    pop_left, push_left = _parse_side(args[2]), _parse_side(args[3])
+    if pop_left is None or push_left is None:
+        return shared_replies.SYNTAX_ERROR
+    timeout = _parse_timeout(args[4])
+    if isinstance(timeout, bytes):
+        return timeout
+    entry = data_store.lookup(source)
+    if entry is not None:
+        if not isinstance(entry.value, QuickList):
+            return shared_replies.WRONG_TYPE
+        value = _move(source, entry, destination, pop_left, push_left, data_store)
+        return shared_replies.WRONG_TYPE if value is None else BulkString(value)
+
+    def serve(key: bytes) -> bytes | None:
+        entry = data_store.lookup(key)
+        if entry is None or not isinstance(entry.value, QuickList):
+            return None
+        value = _move(key, entry, destination, pop_left, push_left, data_store)
+        if value is None:
+            return shared_replies.WRONG_TYPE
+        if persister:
+            persister.log_command(_to_array(b"LMOVE", *args[:4]))
+        return BulkString(value).encode()
+
+    return _block([source], serve, timeout, shared_replies.NIL, data_store)
+
+
+def _parse_timeout(data: bytes) -> float | bytes:
+    # Returns the timeout in seconds, or the error to reply with.
+    try:
+        timeout = float(data)
+    except ValueError:
+        return _TIMEOUT_NOT_A_FLOAT
+    if not math.isfinite(timeout):
+        return _TIMEOUT_NOT_A_FLOAT
+    if timeout < 0:
+        return _TIMEOUT_IS_NEGATIVE
+    return timeout
+
+
+def _block(
+    keys: list[bytes],
+    serve: Callable[[bytes], bytes | None],
+    timeout: float,
+    timeout_reply: bytes,
+    data_store: DataStore,
+) -> Reply:
+    # Parks the client until serve can reply for one of the keys, or until
+    # the timeout, if it is not 0. Without an event loop, as when replaying
+    # the append only file, nothing could ever be pushed meanwhile.
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return timeout_reply
+    return PendingReply(
+        data_store.blocked_clients.block(keys, serve, timeout, timeout_reply)
+    )
+
+
+def _handle_hset(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if len(args) % 2 == 0:
+        return NumberOfArgumentsError("hset")
+    key = args[0]
+    entry = _get_or_create_hash(key, data_store)
+    if entry is None:
+        return shared_replies.WRONG_TYPE
+    num_added = 0
+    for field, value in zip(args[1::2], args[2::2]):
+        num_added += _set_field(key, entry, field, value, data_store)
+    return shared_replies.integer(num_added)
+
+
+def _get_or_create_hash(key: bytes, data_store: DataStore) -> Entry | None:
+    entry = data_store.lookup(key)
+    if entry is None:
+        entry = Entry(Hash(), None)
+        data_store[key] = entry
+    elif not isinstance(entry.value, Hash):
+        return None
+    return entry
+
+
+def _set_field(
+    key: bytes, entry: Entry, field: bytes, value: bytes, data_store: DataStore
+) -> bool:
+    hash_: Hash = entry.value
+    previous, compact = hash_.get(field), hash_.compact
+    is_new = hash_.set(
+        field,
+        value,
+        data_store.hash_max_listpack_entries,
+        data_store.hash_max_listpack_value,
+    )
+    if compact and not hash_.compact:
+        _remeasure(key, entry, data_store)
+    elif previous is None:
+        data_store.resize(entry, estimate_elements_size([field, value]))
     else:
-        return NumberOfArgumentsError("decr")
+        data_store.resize(entry, sys.getsizeof(value) - sys.getsizeof(previous))
+    return is_new
 
 
-def _handle_lpush(args: Array, data_store: DataStore) -> Integer | Error:
-    if len(args) > 1:
-        key = str(args.popleft())
-        entry = data_store.get(key, Entry(collections.deque([]), None))
-        if not isinstance(entry.value, collections.deque):
-            return WrongValueTypeError()
-        for element in args:
-            entry.value.appendleft(element.underlying())
+def _remeasure(key: bytes, entry: Entry, data_store: DataStore) -> None:
+    # A value converted to another encoding changed its whole layout, so it
+    # is measured again, which happens at most once per value.
+    value_size = entry.size - estimate_key_size(key)
+    data_store.resize(entry, estimate_value_size(entry.value) - value_size)
+
+
+def _handle_hget(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.NIL
+    if not isinstance(entry.value, Hash):
+        return shared_replies.WRONG_TYPE
+    value = entry.value.get(args[1])
+    return shared_replies.NIL if value is None else BulkString(value)
+
+
+def _handle_hmget(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is not None and not isinstance(entry.value, Hash):
+        return shared_replies.WRONG_TYPE
+    values = []
+    for field in args[1:]:
+        value = None if entry is None else entry.value.get(field)
+        values.append(
+            shared_replies.NIL
+            if value is None
+            else b"$%d\r\n%b\r\n" % (len(value), value)
+        )
+    return b"*%d\r\n%b" % (len(values), b"".join(values))
+
+
+def _handle_hgetall(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.EMPTY_ARRAY
+    if not isinstance(entry.value, Hash):
+        return shared_replies.WRONG_TYPE
+    return _encode_bulk_strings(
+        [element for item in entry.value.items() for element in item]
+    )
+
+
+def _handle_hincrby(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    key, field = args[0], args[1]
+    amount = parse_int(args[2])
+    if amount is None:
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    entry = _get_or_create_hash(key, data_store)
+    if entry is None:
+        return shared_replies.WRONG_TYPE
+    previous = entry.value.get(field)
+    value = 0 if previous is None else parse_int(previous)
+    if value is None:
+        return Error("ERR", "hash value is not an integer")
+    value += amount
+    if not INT64_MIN <= value <= INT64_MAX:
+        return Error("ERR", "increment or decrement would overflow")
+    _set_field(key, entry, field, b"%d" % value, data_store)
+    return shared_replies.integer(value)
+
+
+def _handle_zadd(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    key, options, index = args[0], set[bytes](), 1
+    while index < len(args) and args[index].upper() in _ZADD_OPTIONS:
+        options.add(args[index].upper())
+        index += 1
+    pairs = args[index:]
+    if not pairs or len(pairs) % 2:
+        return shared_replies.SYNTAX_ERROR
+    if {b"NX", b"XX"} <= options:
+        return Error("ERR", "XX and NX options at the same time are not compatible")
+    if len(options & {b"GT", b"LT", b"NX"}) > 1:
+        return Error(
+            "ERR", "GT, LT, and/or NX options at the same time are not compatible"
+        )
+    increment = b"INCR" in options
+    if increment and len(pairs) != 2:
+        return Error("ERR", "INCR option supports a single increment-element pair")
+    parsed_scores = [parse_score(score) for score in pairs[::2]]
+    scores = [score for score in parsed_scores if score is not None]
+    if len(scores) != len(parsed_scores):
+        return _NOT_A_FLOAT
+    entry = data_store.lookup(key)
+    if entry is not None and not isinstance(entry.value, SortedSet):
+        return shared_replies.WRONG_TYPE
+    if entry is None and b"XX" in options:
+        return shared_replies.NIL if increment else shared_replies.integer(0)
+    if entry is None:
+        entry = Entry(SortedSet(), None)
         data_store[key] = entry
-        return Integer(len(entry.value))
-    return NumberOfArgumentsError("lpush")
+    num_added, num_changed, score = 0, 0, None
+    for new_score, member in zip(scores, pairs[1::2]):
+        previous = entry.value.score(member)
+        if (previous is None and b"XX" in options) or (
+            previous is not None and b"NX" in options
+        ):
+            continue
+        if increment and previous is not None:
+            new_score += previous
+            if math.isnan(new_score):
+                return Error("ERR", "resulting score is not a number (NaN)")
+        if previous is not None and (
+            (b"GT" in options and new_score <= previous)
+            or (b"LT" in options and new_score >= previous)
+        ):
+            continue
+        score = new_score
+        _add_member(key, entry, member, score, data_store)
+        if previous is None:
+            num_added += 1
+        elif score != previous:
+            num_changed += 1
+    if increment:
+        return shared_replies.NIL if score is None else BulkString(format_score(score))
+    if b"CH" in options:
+        return shared_replies.integer(num_added + num_changed)
+    return shared_replies.integer(num_added)
 
 
-def _handle_rpush(args: Array, data_store: DataStore) -> Integer | Error:
-    if len(args) > 1:
-        key = str(args.popleft())
-        entry = data_store.get(key, Entry(collections.deque([]), None))
-        if not isinstance(entry.value, collections.deque):
-            return WrongValueTypeError()
-        for element in args:
-            entry.value.append(element.underlying())
+def _add_member(
+    key: bytes, entry: Entry, member: bytes, score: float, data_store: DataStore
+) -> None:
+    sorted_set: SortedSet = entry.value
+    compact = sorted_set.compact
+    is_new = sorted_set.add(
+        member,
+        score,
+        data_store.zset_max_listpack_entries,
+        data_store.zset_max_listpack_value,
+    )
+    if compact and not sorted_set.compact:
+        _remeasure(key, entry, data_store)
+    elif is_new:
+        data_store.resize(entry, sorted_set.element_size(member))
+
+
+def _handle_zincrby(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    key, increment, member = args
+    return _handle_zadd([key, b"INCR", increment, member], data_store, persister)
+
+
+def _handle_zrange(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    try:
+        key, start, stop = args[0], int(args[1]), int(args[2])
+    except ValueError:
+        return shared_replies.NON_INT_OR_OUT_OF_RANGE
+    with_scores = _with_scores(args[3:])
+    if with_scores is None:
+        return shared_replies.SYNTAX_ERROR
+    entry = data_store.lookup(key)
+    if entry is None:
+        return shared_replies.EMPTY_ARRAY
+    if not isinstance(entry.value, SortedSet):
+        return shared_replies.WRONG_TYPE
+    start, stop = _list_range(start, stop, len(entry.value))
+    return _encode_members(entry.value.range(start, stop), with_scores)
+
+
+def _handle_zrangebyscore(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    key, options = args[0], args[3:]
+    score_range = _parse_score_range(args[1], args[2])
+    if score_range is None:
+        return Error("ERR", "min or max is not a float")
+    offset, count, with_scores = 0, -1, False
+    i = 0
+    while i < len(options):
+        option = options[i].upper()
+        if option == b"WITHSCORES":
+            with_scores = True
+            i += 1
+        elif option == b"LIMIT" and i + 2 < len(options):
+            try:
+                offset, count = int(options[i + 1]), int(options[i + 2])
+            except ValueError:
+                return shared_replies.NON_INT_OR_OUT_OF_RANGE
+            i += 3
+        else:
+            return shared_replies.SYNTAX_ERROR
+    entry = data_store.lookup(key)
+    if entry is None or offset < 0:
+        return shared_replies.EMPTY_ARRAY
+    if not isinstance(entry.value, SortedSet):
+        return shared_replies.WRONG_TYPE
+    items = entry.value.range_by_score(score_range, offset, count)
+    return _encode_members(items, with_scores)
+
+
+def _parse_score_range(min_score: bytes, max_score: bytes) -> ScoreRange | None:
+    # A bound starting with "(" is exclusive, as in Redis.
+    min_exclusive, max_exclusive = min_score[:1] == b"(", max_score[:1] == b"("
+    minimum = parse_score(min_score[1:] if min_exclusive else min_score)
+    maximum = parse_score(max_score[1:] if max_exclusive else max_score)
+    if minimum is None or maximum is None:
+        return None
+    return ScoreRange(minimum, maximum, min_exclusive, max_exclusive)
+
+
+def _with_scores(options: list[bytes]) -> bool | None:
+    if not options:
+        return False
+    if len(options) == 1 and options[0].upper() == b"WITHSCORES":
+        return True
+    return None
+
+
+def _encode_members(items: list[tuple[bytes, float]], with_scores: bool) -> bytes:
+    if not with_scores:
+        return _encode_bulk_strings([member for member, _ in items])
+    return _encode_bulk_strings(
+        [
+            element
+            for member, score in items
+            for element in (member, format_score(score))
+        ]
+    )
+
+
+def _handle_zrank(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.NIL
+    if not isinstance(entry.value, SortedSet):
+        return shared_replies.WRONG_TYPE
+    rank = entry.value.rank(args[1])
+    return shared_replies.NIL if rank is None else shared_replies.integer(rank)
+
+
+def _handle_zscore(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.NIL
+    if not isinstance(entry.value, SortedSet):
+        return shared_replies.WRONG_TYPE
+    score = entry.value.score(args[1])
+    return shared_replies.NIL if score is None else BulkString(format_score(score))
+
+
+def _handle_zcard(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.integer(0)
+    if not isinstance(entry.value, SortedSet):
+        return shared_replies.WRONG_TYPE
+    return shared_replies.integer(len(entry.value))
+
+
+def _handle_sadd(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    key = args[0]
+    entry = data_store.lookup(key)
+    if entry is None:
+        entry = Entry(Set(), None)
         data_store[key] = entry
-        return Integer(len(entry.value))
-    return NumberOfArgumentsError("rpush")
+    elif not isinstance(entry.value, Set):
+        return shared_replies.WRONG_TYPE
+    members: Set = entry.value
+    num_added = 0
+    for member in args[1:]:
+        intset = members.intset
+        if not members.add(member, data_store.set_max_intset_entries):
+            continue
+        num_added += 1
+        if intset and not members.intset:
+            _remeasure(key, entry, data_store)
+        else:
+            data_store.resize(entry, members.element_size(member))
+    return shared_replies.integer(num_added)
 
 
-def _handle_lrange(args: Array, data_store: DataStore) -> Array | Error:
-    if len(args) == 3:
-        try:
-            key, start, stop = (
-                str(args.popleft()),
-                int(str(args.popleft())),
-                int(str(args.popleft())),
-            )
-        except ValueError:
-            return NonIntOrOutOfRangeError()
-        entry = data_store.get(key, Entry(collections.deque([]), None))
-        if not isinstance(entry.value, collections.deque):
-            return WrongValueTypeError()
-        stop = stop if 0 <= stop < len(entry.value) else len(entry.value) - 1
-        return Array(
-            collections.deque(
-                [BulkString(entry.value[i]) for i in range(stop + 1) if start <= i],
-                maxlen=stop + 1,
-            )
+def _handle_srem(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    key = args[0]
+    entry = data_store.lookup(key)
+    if entry is None:
+        return shared_replies.integer(0)
+    if not isinstance(entry.value, Set):
+        return shared_replies.WRONG_TYPE
+    num_removed = 0
+    for member in args[1:]:
+        if entry.value.remove(member):
+            num_removed += 1
+            data_store.resize(entry, -entry.value.element_size(member))
+    if not entry.value:
+        data_store.delete(key)
+    return shared_replies.integer(num_removed)
+
+
+def _handle_sismember(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.integer(0)
+    if not isinstance(entry.value, Set):
+        return shared_replies.WRONG_TYPE
+    return shared_replies.integer(args[1] in entry.value)
+
+
+def _handle_smembers(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _set_operation(args, data_store, lambda sets: list(sets[0]))
+
+
+def _handle_scard(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    entry = data_store.lookup(args[0])
+    if entry is None:
+        return shared_replies.integer(0)
+    if not isinstance(entry.value, Set):
+        return shared_replies.WRONG_TYPE
+    return shared_replies.integer(len(entry.value))
+
+
+def _handle_sinter(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _set_operation(args, data_store, intersection)
+
+
+def _handle_sunion(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _set_operation(args, data_store, union)
+
+
+def _handle_sdiff(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return _set_operation(args, data_store, lambda sets: difference(sets[0], sets[1:]))
+
+
+def _set_operation(
+    keys: list[bytes],
+    data_store: DataStore,
+    operation: Callable[[list[Set]], list[bytes]],
+) -> Reply:
+    # Missing keys count as empty sets, which the operation gets too, so
+    # that SDIFF still knows which set came first.
+    sets = []
+    for entry in data_store.lookup_many(keys):
+        if entry is None:
+            sets.append(_EMPTY_SET)
+        elif isinstance(entry.value, Set):
+            sets.append(entry.value)
+        else:
+            return shared_replies.WRONG_TYPE
+    return _encode_bulk_strings(operation(sets))
+
+
+def _handle_publish(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    return shared_replies.integer(data_store.pubsub.publish(args[0], args[1]))
+
+
+def _handle_del(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    num_deleted = sum(1 for key in args if data_store.delete(key))
+    return shared_replies.integer(num_deleted)
+
+
+def _handle_scan(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    try:
+        cursor = int(args[0])
+    except ValueError:
+        cursor = -1
+    if cursor < 0:
+        return Error("ERR", "invalid cursor")
+    count, pattern, type_ = _DEFAULT_SCAN_COUNT, b"*", None
+    options = args[1:]
+    if len(options) % 2:
+        return shared_replies.SYNTAX_ERROR
+    for option, value in zip(options[::2], options[1::2]):
+        match option.upper():
+            case b"COUNT":
+                try:
+                    count = int(value)
+                except ValueError:
+                    return shared_replies.NON_INT_OR_OUT_OF_RANGE
+                if count < 1:
+                    return shared_replies.SYNTAX_ERROR
+            case b"MATCH":
+                pattern = value
+            case b"TYPE":
+                type_ = value.decode(errors="replace").lower()
+            case _:
+                return shared_replies.SYNTAX_ERROR
+    cursor, items = data_store.scan(cursor, count)
+    keys = [
+        key
+        for key, entry in items
+        if (type_ is None or type_name(entry.value) == type_) and _matches(key, pattern)
+    ]
+    next_cursor = b"%d" % cursor
+    return b"*2\r\n$%d\r\n%b\r\n%b" % (
+        len(next_cursor),
+        next_cursor,
+        _encode_bulk_strings(keys),
+    )
+
+
+def _matches(key: bytes, pattern: bytes) -> bool:
+    return pattern == b"*" or compile_glob(pattern)(key) is not None
+
+
+def _handle_keys(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    # Collects keys one SCAN batch per event loop iteration, so other clients
+    # are served in between. Keys added or removed meanwhile may or may not
+    # be part of the reply.
+    keys: list[bytes] = []
+    cursor = _collect_keys(data_store, args[0], 0, keys)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        while cursor:
+            cursor = _collect_keys(data_store, args[0], cursor, keys)
+        return _encode_bulk_strings(list(dict.fromkeys(keys)))
+    future: asyncio.Future[bytes] = loop.create_future()
+    _continue_keys(data_store, args[0], cursor, keys, future)
+    return PendingReply(future)
+
+
+def _collect_keys(
+    data_store: DataStore, pattern: bytes, cursor: int, keys: list[bytes]
+) -> int:
+    cursor, items = data_store.scan(cursor, _KEYS_BATCH_SIZE)
+    keys += [key for key, _ in items if _matches(key, pattern)]
+    return cursor
+
+
+def _continue_keys(
+    data_store: DataStore,
+    pattern: bytes,
+    cursor: int,
+    keys: list[bytes],
+    future: asyncio.Future[bytes],
+) -> None:
+    if future.cancelled():
+        return
+    if cursor:
+        cursor = _collect_keys(data_store, pattern, cursor, keys)
+    if cursor:
+        asyncio.get_running_loop().call_soon(
+            _continue_keys, data_store, pattern, cursor, keys, future
         )
-    return NumberOfArgumentsError("lrange")
-
-
-def _handle_del(args: Array, data_store: DataStore) -> Integer | Error:
-    if len(args) > 0:
-        num_deleted = 0
-        for arg in args:
-            key = str(arg)
-            if key in data_store:
-                del data_store[key]
-                num_deleted += 1
-        return Integer(num_deleted)
     else:
-        return NumberOfArgumentsError("del")
+        # A key deleted and set again while the scan was under way may have
+        # been seen twice.
+        future.set_result(_encode_bulk_strings(list(dict.fromkeys(keys))))
+
+
+def _handle_unlink(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    num_unlinked = 0
+    for key in args:
+        entry = data_store.pop(key)
+        if entry is not None:
+            lazy_free.free(entry.value)
+            num_unlinked += 1
+    return shared_replies.integer(num_unlinked)
+
+
+def _handle_flushall(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if len(args) > 1:
+        return shared_replies.SYNTAX_ERROR
+    mode = args[0].upper() if args else b"SYNC"
+    if mode not in (b"ASYNC", b"SYNC"):
+        return shared_replies.SYNTAX_ERROR
+    data = data_store.clear()
+    if mode == b"ASYNC":
+        lazy_free.free(data)
+    return shared_replies.OK
+
+
+def _handle_object(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if args[0].upper() != b"ENCODING" or len(args) != 2:
+        return Error(
+            "ERR",
+            f"unknown subcommand or wrong number of arguments for "
+            f"'{args[0].decode(errors='replace')}'",
+        )
+    entry = data_store.lookup(args[1])
+    if entry is None:
+        return shared_replies.NIL
+    return BulkString(object_encoding(entry.value).encode())
+
+
+def _handle_memory(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    match args[0].upper():
+        case b"USAGE" if len(args) in (2, 4):
+            # Sizes are kept up to date per key, so SAMPLES is accepted for
+            # compatibility but nothing needs to be sampled.
+            if len(args) == 4:
+                if args[2].upper() != b"SAMPLES":
+                    return shared_replies.SYNTAX_ERROR
+                if parse_int(args[3]) is None:
+                    return shared_replies.NON_INT_OR_OUT_OF_RANGE
+            entry = data_store.lookup(args[1])
+            if entry is None:
+                return shared_replies.NIL
+            return shared_replies.integer(entry.size)
+        case b"STATS" if len(args) == 1:
+            return Array.from_list(
+                [
+                    element
+                    for name, value in _memory_stats(data_store)
+                    for element in (BulkString(name.encode()), value)
+                ]
+            )
+    return Error(
+        "ERR",
+        f"unknown subcommand or wrong number of arguments for "
+        f"'{args[0].decode(errors='replace')}'",
+    )
+
+
+def _memory_stats(data_store: DataStore) -> list[tuple[str, RespDataType]]:
+    num_keys, used_memory = len(data_store), data_store.used_memory
+    dataset = sum(data_store.memory_by_type.values())
+    return [
+        ("peak.allocated", Integer(data_store.peak_memory)),
+        ("total.allocated", Integer(used_memory)),
+        ("overhead.total", Integer(used_memory - dataset)),
+        ("keys.count", Integer(num_keys)),
+        ("keys.bytes-per-key", Integer(used_memory // num_keys if num_keys else 0)),
+        ("dataset.bytes", Integer(dataset)),
+        (
+            "dataset.percentage",
+            BulkString(b"%.2f" % (dataset * 100 / used_memory if used_memory else 0)),
+        ),
+        *[
+            (f"dataset.{type_}.bytes", Integer(size))
+            for type_, size in sorted(data_store.memory_by_type.items())
+        ],
+    ]
+
+
+def _handle_info(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    sections = {section.lower() for section in args} or {b"default"}
+    lines = []
+    if sections & {b"clients", b"default", b"all", b"everything"}:
+        lines += ["# Clients", f"blocked_clients:{len(data_store.blocked_clients)}"]
+    if sections & {b"memory", b"default", b"all", b"everything"}:
+        lines += ["# Memory", *_memory_info(data_store)]
+    return BulkString("".join(f"{line}\r\n" for line in lines).encode())
+
+
+def _memory_info(data_store: DataStore) -> list[str]:
+    used_memory, peak_memory = data_store.used_memory, data_store.peak_memory
+    dataset = sum(data_store.memory_by_type.values())
+    return [
+        f"used_memory:{used_memory}",
+        f"used_memory_human:{format_bytes(used_memory)}",
+        f"used_memory_peak:{peak_memory}",
+        f"used_memory_peak_human:{format_bytes(peak_memory)}",
+        f"used_memory_overhead:{used_memory - dataset}",
+        f"used_memory_dataset:{dataset}",
+        *[
+            f"used_memory_dataset_{type_}:{size}"
+            for type_, size in sorted(data_store.memory_by_type.items())
+        ],
+        f"maxmemory:{data_store.maxmemory}",
+        f"maxmemory_human:{format_bytes(data_store.maxmemory)}",
+        f"maxmemory_policy:{data_store.maxmemory_policy}",
+        f"lazyfree_pending_objects:{lazy_free.pending()}",
+    ]
+
+
+def _handle_bgrewriteaof(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if persister is None:
+        return Error("ERR", "append only file is disabled")
+    if not persister.start_background_rewrite(data_store):
+        return Error("ERR", "Background append only file rewriting already in progress")
+    return SimpleString("Background append only file rewriting started")
+
+
+def _handle_save(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if persister is None:
+        return Error("ERR", "persistence is disabled")
+    if persister.child_in_progress:
+        return Error("ERR", "Background save already in progress")
+    persister.save(data_store)
+    return shared_replies.OK
+
+
+def _handle_bgsave(
+    args: list[bytes], data_store: DataStore, persister: AppendOnlyPersister | None
+) -> Reply:
+    if persister is None:
+        return Error("ERR", "persistence is disabled")
+    if not persister.start_background_save(data_store):
+        return Error("ERR", "Background save already in progress")
+    return SimpleString("Background saving started")
+
+
+COMMANDS: dict[bytes, Command] = {
+    command.name.upper().encode(): command
+    for command in [
+        Command("ping", _handle_pong, -1, write=False),
+        Command("echo", _handle_echo, 2, write=False),
+        Command(
+            "set",
+            _handle_set,
+            -3,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+            logs_itself=True,
+        ),
+        Command("get", _handle_get, 2, write=False, first_key=1, last_key=1, step=1),
+        Command(
+            "mget", _handle_mget, -2, write=False, first_key=1, last_key=-1, step=1
+        ),
+        Command(
+            "mset",
+            _handle_mset,
+            -3,
+            write=True,
+            first_key=1,
+            last_key=-1,
+            step=2,
+            deny_oom=True,
+        ),
+        Command(
+            "msetnx",
+            _handle_msetnx,
+            -3,
+            write=True,
+            first_key=1,
+            last_key=-1,
+            step=2,
+            deny_oom=True,
+        ),
+        Command(
+            "exists", _handle_exists, -2, write=False, first_key=1, last_key=-1, step=1
+        ),
+        Command(
+            "incr",
+            _handle_incr,
+            2,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "decr",
+            _handle_decr,
+            2,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "lpush",
+            _handle_lpush,
+            -3,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "rpush",
+            _handle_rpush,
+            -3,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "lrange", _handle_lrange, 4, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "lindex", _handle_lindex, 3, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "lset",
+            _handle_lset,
+            4,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command("ltrim", _handle_ltrim, 4, write=True, first_key=1, last_key=1, step=1),
+        Command("lpop", _handle_lpop, 2, write=True, first_key=1, last_key=1, step=1),
+        Command("rpop", _handle_rpop, 2, write=True, first_key=1, last_key=1, step=1),
+        Command(
+            "lmove",
+            _handle_lmove,
+            5,
+            write=True,
+            first_key=1,
+            last_key=2,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "blpop", _handle_blpop, -3, write=True, first_key=1, last_key=-2, step=1
+        ),
+        Command(
+            "brpop", _handle_brpop, -3, write=True, first_key=1, last_key=-2, step=1
+        ),
+        Command(
+            "blmove",
+            _handle_blmove,
+            6,
+            write=True,
+            first_key=1,
+            last_key=2,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "hset",
+            _handle_hset,
+            -4,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command("hget", _handle_hget, 3, write=False, first_key=1, last_key=1, step=1),
+        Command(
+            "hmget", _handle_hmget, -3, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "hgetall", _handle_hgetall, 2, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "hincrby",
+            _handle_hincrby,
+            4,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "zadd",
+            _handle_zadd,
+            -4,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "zincrby",
+            _handle_zincrby,
+            4,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command(
+            "zrange", _handle_zrange, -4, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "zrangebyscore",
+            _handle_zrangebyscore,
+            -4,
+            write=False,
+            first_key=1,
+            last_key=1,
+            step=1,
+        ),
+        Command(
+            "zrank", _handle_zrank, 3, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "zscore", _handle_zscore, 3, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "zcard", _handle_zcard, 2, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "sadd",
+            _handle_sadd,
+            -3,
+            write=True,
+            first_key=1,
+            last_key=1,
+            step=1,
+            deny_oom=True,
+        ),
+        Command("srem", _handle_srem, -3, write=True, first_key=1, last_key=1, step=1),
+        Command(
+            "sismember",
+            _handle_sismember,
+            3,
+            write=False,
+            first_key=1,
+            last_key=1,
+            step=1,
+        ),
+        Command(
+            "smembers",
+            _handle_smembers,
+            2,
+            write=False,
+            first_key=1,
+            last_key=1,
+            step=1,
+        ),
+        Command(
+            "scard", _handle_scard, 2, write=False, first_key=1, last_key=1, step=1
+        ),
+        Command(
+            "sinter", _handle_sinter, -2, write=False, first_key=1, last_key=-1, step=1
+        ),
+        Command(
+            "sunion", _handle_sunion, -2, write=False, first_key=1, last_key=-1, step=1
+        ),
+        Command(
+            "sdiff", _handle_sdiff, -2, write=False, first_key=1, last_key=-1, step=1
+        ),
+        Command("del", _handle_del, -2, write=True, first_key=1, last_key=-1, step=1),
+        Command(
+            "unlink", _handle_unlink, -2, write=True, first_key=1, last_key=-1, step=1
+        ),
+        Command("publish", _handle_publish, 3, write=False),
+        Command("flushall", _handle_flushall, -1, write=True),
+        Command("flushdb", _handle_flushall, -1, write=True),
+        Command(
+            "memory", _handle_memory, -2, write=False, first_key=2, last_key=2, step=1
+        ),
+        Command("info", _handle_info, -1, write=False),
+        Command("scan", _handle_scan, -2, write=False),
+        Command("keys", _handle_keys, 2, write=False),
+        Command(
+            "object", _handle_object, -2, write=False, first_key=2, last_key=2, step=1
+        ),
+        Command("bgrewriteaof", _handle_bgrewriteaof, 1, write=False),
+        Command("save", _handle_save, 1, write=False),
+        Command("bgsave", _handle_bgsave, 1, write=False),
+    ]
+}
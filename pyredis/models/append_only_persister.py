@@ -1,13 +1,254 @@
+import asyncio
+import collections
+import os
+from enum import StrEnum
+from itertools import chain, islice
+from typing import Any, Callable, Iterator
+
+from pyredis.models.data_store import DataStore
+from pyredis.models.entry import Entry
+from pyredis.models.hash import Hash
+from pyredis.models.quicklist import QuickList
+from pyredis.models.set import Set
+from pyredis.models.sorted_set import SortedSet, format_score
 from pyredis.models.resp.data_types.array import Array
+from pyredis.models.resp.data_types.bulk_string import BulkString
+from pyredis.models.snapshot import SnapshotHeader, write_snapshot
+
+_DEFAULT_AUTO_REWRITE_PERCENTAGE = 100
+_DEFAULT_AUTO_REWRITE_MIN_SIZE = 64 * 1024 * 1024
+_DEFAULT_SNAPSHOT_FILENAME = "db.snapshot"
+_REWRITE_ITEMS_PER_COMMAND = 64
+_FSYNC_INTERVAL = 1
+
+
+class FsyncPolicy(StrEnum):
+    ALWAYS = "always"
+    EVERYSEC = "everysec"
+    NO = "no"
 
 
 class AppendOnlyPersister:
-    def __init__(self, filename: str) -> None:
+    def __init__(
+        self,
+        filename: str,
+        fsync_policy: FsyncPolicy = FsyncPolicy.EVERYSEC,
+        auto_rewrite_percentage: int = _DEFAULT_AUTO_REWRITE_PERCENTAGE,
+        auto_rewrite_min_size: int = _DEFAULT_AUTO_REWRITE_MIN_SIZE,
+        snapshot_filename: str = _DEFAULT_SNAPSHOT_FILENAME,
+    ) -> None:
         self._filename = filename
-        self._file = open(filename, mode="ab", buffering=0)
+        self._file = open(filename, mode="ab")
+        self._buffer = bytearray()
+        self._flush_scheduled = False
+        self._needs_fsync = False
+        self._size = self._base_size = self._file.tell()
+        self._rewrite_buffer: bytearray | None = None
+        self._child_task: asyncio.Task[Any] | None = None
+        self.fsync_policy = fsync_policy
+        self.auto_rewrite_percentage = auto_rewrite_percentage
+        self.auto_rewrite_min_size = auto_rewrite_min_size
+        self.snapshot_filename = snapshot_filename
+
+    @property
+    def rewrite_in_progress(self) -> bool:
+        return self._rewrite_buffer is not None
+
+    @property
+    def child_in_progress(self) -> bool:
+        return self._child_task is not None and not self._child_task.done()
 
     def log_command(self, command: Array) -> None:
-        self._file.write(f"*{len(command)}\r\n".encode())
+        self._buffer += command.encode()
+        if self._flush_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        # Commands logged during the same event loop iteration are written
+        # together once the loop gets back to its scheduled callbacks.
+        loop.call_soon(self.flush)
+        self._flush_scheduled = True
+
+    def flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._buffer:
+            return
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._size += len(self._buffer)
+        if self._rewrite_buffer is not None:
+            self._rewrite_buffer += self._buffer
+        self._buffer.clear()
+        if self.fsync_policy is FsyncPolicy.ALWAYS:
+            os.fsync(self._file.fileno())
+        elif self.fsync_policy is FsyncPolicy.EVERYSEC:
+            self._needs_fsync = True
+
+    async def fsync_every_second(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(_FSYNC_INTERVAL)
+            if not self._needs_fsync:
+                continue
+            self._needs_fsync = False
+            # The executor thread syncs a duplicate of the file descriptor, as
+            # installing a rewrite may close the file meanwhile. A failed fsync
+            # is reported and retried rather than ending the task.
+            try:
+                fd = os.dup(self._file.fileno())
+                try:
+                    await loop.run_in_executor(None, os.fsync, fd)
+                finally:
+                    os.close(fd)
+            except OSError as error:
+                print(f"Failed to fsync the append only file: {error}")
+                self._needs_fsync = True
+
+    def should_rewrite(self) -> bool:
+        if self.child_in_progress or self.auto_rewrite_percentage <= 0:
+            return False
+        if self._size < self.auto_rewrite_min_size:
+            return False
+        growth = (self._size - self._base_size) * 100 / max(self._base_size, 1)
+        return growth >= self.auto_rewrite_percentage
+
+    def rewrite(self, data_store: DataStore) -> None:
+        self.flush()
+        _write_dataset(self._rewrite_filename, data_store)
+        self._install_rewrite(b"")
+
+    def start_background_rewrite(self, data_store: DataStore) -> bool:
+        if self.child_in_progress:
+            return False
+        loop = _running_loop()
+        if loop is None or not hasattr(os, "fork"):
+            self.rewrite(data_store)
+            return True
+
+        # Everything logged so far is reflected in the forked child's copy of
+        # the data store; commands logged from here on are kept in the rewrite
+        # buffer and appended to the new file once the child is done.
+        self.flush()
+        pid = _fork(lambda: _write_dataset(self._rewrite_filename, data_store))
+        self._rewrite_buffer = bytearray()
+        self._child_task = loop.create_task(self._finish_background_rewrite(pid))
+        return True
+
+    async def _finish_background_rewrite(self, pid: int) -> None:
+        succeeded = await _wait_for_child(pid)
+        self.flush()
+        rewrite_buffer, self._rewrite_buffer = self._rewrite_buffer, None
+        if not succeeded or rewrite_buffer is None:
+            if os.path.exists(self._rewrite_filename):
+                os.remove(self._rewrite_filename)
+            return
+        self._install_rewrite(rewrite_buffer)
+
+    def save(self, data_store: DataStore) -> None:
+        self.flush()
+        write_snapshot(self.snapshot_filename, data_store, self._snapshot_header())
+
+    def start_background_save(self, data_store: DataStore) -> bool:
+        if self.child_in_progress:
+            return False
+        loop = _running_loop()
+        if loop is None or not hasattr(os, "fork"):
+            self.save(data_store)
+            return True
+
+        self.flush()
+        header = self._snapshot_header()
+        pid = _fork(lambda: write_snapshot(self.snapshot_filename, data_store, header))
+        self._child_task = loop.create_task(_wait_for_child(pid))
+        return True
+
+    def _snapshot_header(self) -> SnapshotHeader:
+        return SnapshotHeader(os.fstat(self._file.fileno()).st_ino, self._size)
+
+    def _install_rewrite(self, rewrite_buffer: bytes | bytearray) -> None:
+        with open(self._rewrite_filename, mode="ab") as file:
+            file.write(rewrite_buffer)
+            file.flush()
+            os.fsync(file.fileno())
+        self._file.close()
+        os.replace(self._rewrite_filename, self._filename)
+        self._file = open(self._filename, mode="ab")
+        self._size = self._base_size = self._file.tell()
+
+    @property
+    def _rewrite_filename(self) -> str:
+        return f"{self._filename}.rewrite"
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _fork(target: Callable[[], None]) -> int:
+    # The child works on a copy-on-write image of the parent's memory and
+    # exits without running any of the parent's cleanup.
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            target()
+            exit_code = 0
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+async def _wait_for_child(pid: int) -> bool:
+    loop = asyncio.get_running_loop()
+    _, status = await loop.run_in_executor(None, os.waitpid, pid, 0)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+def _write_dataset(filename: str, data_store: DataStore) -> None:
+    with open(filename, mode="wb") as file:
+        for key, entry in data_store.items():
+            for command in _rewrite_commands(key, entry):
+                file.write(command.encode())
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _rewrite_commands(key: bytes, entry: Entry) -> Iterator[Array]:
+    if isinstance(entry.value, QuickList):
+        elements = iter(entry.value)
+        while chunk := list(islice(elements, _REWRITE_ITEMS_PER_COMMAND)):
+            yield _to_command(b"RPUSH", key, *chunk)
+        return
+    if isinstance(entry.value, Set):
+        members = iter(entry.value)
+        while chunk := list(islice(members, _REWRITE_ITEMS_PER_COMMAND)):
+            yield _to_command(b"SADD", key, *chunk)
+        return
+    if isinstance(entry.value, Hash):
+        fields = chain.from_iterable(entry.value.items())
+        while chunk := list(islice(fields, 2 * _REWRITE_ITEMS_PER_COMMAND)):
+            yield _to_command(b"HSET", key, *chunk)
+        return
+    if isinstance(entry.value, SortedSet):
+        members = chain.from_iterable(
+            (format_score(score), member) for member, score in entry.value.items()
+        )
+        while chunk := list(islice(members, 2 * _REWRITE_ITEMS_PER_COMMAND)):
+            yield _to_command(b"ZADD", key, *chunk)
+        return
+    value = str(entry.value).encode() if isinstance(entry.value, int) else entry.value
+    if entry.expiry is None:
+        yield _to_command(b"SET", key, value)
+    else:
+        expiry = str(entry.expiry).encode()
+        yield _to_command(b"SET", key, value, b"PXAT", expiry)
+
 
-        for item in command:
-            self._file.write(item.encode())
+def _to_command(*arguments: bytes) -> Array:
+    return Array(collections.deque([BulkString(argument) for argument in arguments]))
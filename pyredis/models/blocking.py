@@ -0,0 +1,91 @@
+import asyncio
+import collections
+from typing import Callable
+
+# Serves a waiter from the key that became ready, returning its encoded reply,
+# or None if the key has nothing for it.
+Serve = Callable[[bytes], bytes | None]
+
+
+class _Waiter:
+    __slots__ = ("keys", "serve", "future", "timer")
+
+    def __init__(
+        self, keys: list[bytes], serve: Serve, future: asyncio.Future[bytes]
+    ) -> None:
+        self.keys = keys
+        self.serve = serve
+        self.future = future
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class BlockedClients:
+    # Clients blocked on keys, queued per key in the order they blocked, like
+    # Redis' blocking_keys. A push only marks its key as ready when someone
+    # waits on it; once the pushing command has run, the waiters of ready keys
+    # are served first come first served for as long as they can be, so no
+    # client is woken up just to find nothing left.
+    def __init__(self) -> None:
+        self._waiters: dict[bytes, collections.deque[_Waiter]] = {}
+        self._ready_keys: dict[bytes, None] = {}
+
+    def __len__(self) -> int:
+        return len({waiter for waiters in self._waiters.values() for waiter in waiters})
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._ready_keys)
+
+    def block(
+        self, keys: list[bytes], serve: Serve, timeout: float, timeout_reply: bytes
+    ) -> asyncio.Future[bytes]:
+        # Returns a future resolved with the reply of serve, with timeout_reply
+        # after timeout seconds unless timeout is 0, or cancelled if the client
+        # goes away.
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(list(dict.fromkeys(keys)), serve, loop.create_future())
+        for key in waiter.keys:
+            self._waiters.setdefault(key, collections.deque()).append(waiter)
+        if timeout:
+            waiter.timer = loop.call_later(
+                timeout, self._time_out, waiter, timeout_reply
+            )
+        waiter.future.add_done_callback(lambda _: self._unblock(waiter))
+        return waiter.future
+
+    def signal(self, key: bytes) -> None:
+        if key in self._waiters:
+            self._ready_keys[key] = None
+
+    def serve_ready(self) -> None:
+        # Serving a waiter may push to another key, such as the destination of
+        # BLMOVE, which then becomes ready in turn.
+        while self._ready_keys:
+            key = next(iter(self._ready_keys))
+            del self._ready_keys[key]
+            waiters = self._waiters.get(key)
+            while waiters:
+                waiter = waiters[0]
+                if waiter.future.done():
+                    self._unblock(waiter)
+                    continue
+                reply = waiter.serve(key)
+                if reply is None:
+                    break
+                self._unblock(waiter)
+                waiter.future.set_result(reply)
+
+    def _time_out(self, waiter: _Waiter, reply: bytes) -> None:
+        self._unblock(waiter)
+        if not waiter.future.done():
+            waiter.future.set_result(reply)
+
+    def _unblock(self, waiter: _Waiter) -> None:
+        if waiter.timer is not None:
+            waiter.timer.cancel()
+        for key in waiter.keys:
+            waiters = self._waiters.get(key)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[key]
@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+_cached_ms: int | None = None
+_last_ms = 0
+
+
+def now_ms() -> int:
+    # Reads the wall clock at most once per event loop iteration; outside a
+    # running loop every call reads it afresh. The returned time never goes
+    # backwards, so a clock adjustment cannot resurrect expired keys.
+    global _cached_ms, _last_ms
+    if _cached_ms is not None:
+        return _cached_ms
+    _last_ms = max(_last_ms, time.time_ns() // 1_000_000)
+    try:
+        asyncio.get_running_loop().call_soon(_invalidate)
+    except RuntimeError:
+        return _last_ms
+    _cached_ms = _last_ms
+    return _cached_ms
+
+
+def _invalidate() -> None:
+    global _cached_ms
+    _cached_ms = None
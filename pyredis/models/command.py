@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp.shared_replies import Reply
+
+
+@dataclass(frozen=True)
+class Command:
+    name: str
+    handler: Callable[[list[bytes], DataStore, AppendOnlyPersister | None], Reply]
+    # Number of arguments including the command name; a negative arity -n
+    # means "at least n", as in Redis' COMMAND INFO.
+    arity: int
+    write: bool
+    first_key: int = 0
+    last_key: int = 0
+    step: int = 0
+    # Rejected with an OOM error while memory usage is over maxmemory.
+    deny_oom: bool = False
+    # Logs to the append only file itself, in a form that replays the same
+    # way later, such as SET with its expiry made absolute.
+    logs_itself: bool = False
+
+    def accepts(self, number_of_arguments: int) -> bool:
+        if self.arity < 0:
+            return number_of_arguments >= -self.arity
+        return number_of_arguments == self.arity
+
+    def keys(self, arguments: list[bytes]) -> list[bytes]:
+        return [arguments[position] for position in self.key_positions(arguments)]
+
+    def key_positions(self, arguments: list[bytes]) -> range:
+        if self.first_key == 0:
+            return range(0)
+        last_key = (
+            self.last_key if self.last_key >= 0 else len(arguments) + self.last_key
+        )
+        # Subcommands such as MEMORY STATS have no key where others have one.
+        last_key = min(last_key, len(arguments) - 1)
+        return range(self.first_key, last_key + 1, self.step)
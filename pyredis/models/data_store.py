@@ -1,50 +1,323 @@
+import collections
+import heapq
 import random
-from datetime import datetime, timezone
-from threading import Lock
+import time
+from typing import Iterator
 
-from pyredis.models.entry import Entry
+from pyredis.models import clock
+from pyredis.models.blocking import BlockedClients
+from pyredis.models.entry import Entry, type_name
+from pyredis.models.eviction import (
+    LFU_MAX_VALUE,
+    EvictionPolicy,
+    lfu_counter,
+    lfu_initial_access,
+    lfu_touch,
+)
+from pyredis.models.hash import HASH_MAX_LISTPACK_ENTRIES, HASH_MAX_LISTPACK_VALUE
+from pyredis.models.key_index import KEY_CHUNK_SIZE, KeyIndex
+from pyredis.models.memory import estimate_key_size, estimate_value_size
+from pyredis.models.pubsub import PubSub
+from pyredis.models.set import SET_MAX_INTSET_ENTRIES
+from pyredis.models.sorted_set import ZSET_MAX_LISTPACK_ENTRIES, ZSET_MAX_LISTPACK_VALUE
+
+# Stale expiry index items are only dropped when they reach the top of the
+# heap, so it is compacted once they outnumber the live volatile keys.
+_MIN_EXPIRY_INDEX_SIZE_TO_COMPACT = 1024
+_CLOCK_CHECK_INTERVAL = 16
+_EVICTION_POOL_SIZE = 16
+_MAX_SAMPLING_ATTEMPTS = 64
 
 
 class DataStore:
-    def __init__(self) -> None:
-        self._data: dict[str, Entry] = dict()
-        self._lock = Lock()
+    def __init__(
+        self,
+        maxmemory: int = 0,
+        maxmemory_policy: EvictionPolicy = EvictionPolicy.NOEVICTION,
+        maxmemory_samples: int = 5,
+        hash_max_listpack_entries: int = HASH_MAX_LISTPACK_ENTRIES,
+        hash_max_listpack_value: int = HASH_MAX_LISTPACK_VALUE,
+        zset_max_listpack_entries: int = ZSET_MAX_LISTPACK_ENTRIES,
+        zset_max_listpack_value: int = ZSET_MAX_LISTPACK_VALUE,
+        set_max_intset_entries: int = SET_MAX_INTSET_ENTRIES,
+    ) -> None:
+        self._data: dict[bytes, Entry] = dict()
+        self._expiry_index: list[tuple[int, bytes]] = []
+        self._num_volatile_keys = 0
+        # Estimated bytes held by keys and values, the highest it has been, and
+        # the part of it held by values of each type.
+        self.used_memory = 0
+        self.peak_memory = 0
+        self.memory_by_type: dict[str, int] = collections.defaultdict(int)
+        self.maxmemory = maxmemory
+        self._maxmemory_policy = maxmemory_policy
+        self.maxmemory_samples = maxmemory_samples
+        self._lfu = maxmemory_policy.lfu
+        # Sizes up to which hashes and sorted sets keep their compact
+        # encoding, in elements and in bytes per element, and sets of
+        # integers keep theirs, in members.
+        self.hash_max_listpack_entries = hash_max_listpack_entries
+        self.hash_max_listpack_value = hash_max_listpack_value
+        self.zset_max_listpack_entries = zset_max_listpack_entries
+        self.zset_max_listpack_value = zset_max_listpack_value
+        self.set_max_intset_entries = set_max_intset_entries
+        self._key_index = KeyIndex(self._data)
+        self._eviction_pool: list[tuple[int, bytes]] = []
+        self.blocked_clients = BlockedClients()
+        self.pubsub = PubSub()
+
+    @property
+    def maxmemory_policy(self) -> EvictionPolicy:
+        return self._maxmemory_policy
 
-    def __getitem__(self, key: str) -> Entry:
-        with self._lock:
-            entry = self._data[key]
-            if entry.expiry is not None and entry.expiry <= datetime.now(timezone.utc):
-                del self._data[key]
-            return self._data[key]
+    # All commands run on the event loop thread, and background persistence
+    # works on a forked copy of the store, so no locking is needed here.
 
-    def __setitem__(self, key: str, entry: Entry) -> None:
-        with self._lock:
-            self._data[key] = entry
+    def __getitem__(self, key: bytes) -> Entry:
+        entry = self.lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __setitem__(self, key: bytes, entry: Entry) -> None:
+        previous = self._data.get(key)
+        self._data[key] = entry
+        if previous is None:
+            entry.access = self._initial_access()
+            self._key_index.add(key, entry)
+        else:
+            self._release_memory(key, previous)
+            entry.access = previous.access
+            entry.key_chunk = previous.key_chunk
+        value_size = estimate_value_size(entry.value)
+        entry.size = estimate_key_size(key) + value_size
+        self.memory_by_type[type_name(entry.value)] += value_size
+        self.used_memory += entry.size
+        self.peak_memory = max(self.peak_memory, self.used_memory)
+        previous_expiry = None if previous is None else previous.expiry
+        if previous_expiry == entry.expiry:
+            return
+        if previous_expiry is not None:
+            self._num_volatile_keys -= 1
+        if entry.expiry is not None:
+            self._num_volatile_keys += 1
+            heapq.heappush(self._expiry_index, (entry.expiry, key))
+            self._compact_expiry_index()
 
-    def __delitem__(self, key: str) -> None:
-        with self._lock:
-            del self._data[key]
+    def __delitem__(self, key: bytes) -> None:
+        self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
 
     def __str__(self) -> str:
         return f"{self._data}"
 
-    def __contains__(self, key: str) -> bool:
-        try:
-            return self[key] is not None
-        except KeyError:
-            return False
+    def __contains__(self, key: bytes) -> bool:
+        return self.lookup(key) is not None
+
+    def get(self, key: bytes, default: Entry) -> Entry:
+        entry = self.lookup(key)
+        return default if entry is None else entry
+
+    def lookup(self, key: bytes) -> Entry | None:
+        # Resolves a key with a single dict probe, lazily removing it if it
+        # has expired. Returns None for missing and expired keys.
+        return self._lookup(key, clock.now_ms())
+
+    def lookup_many(self, keys: list[bytes]) -> list[Entry | None]:
+        # Like lookup, for a batch of keys checked against one clock reading.
+        now = clock.now_ms()
+        return [self._lookup(key, now) for key in keys]
+
+    def delete(self, key: bytes) -> bool:
+        return self.pop(key) is not None
+
+    def pop(self, key: bytes) -> Entry | None:
+        # Removes a key and returns its entry, or None if it was missing or
+        # had already expired.
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        self._release_memory(key, entry)
+        if entry.expiry is not None:
+            self._num_volatile_keys -= 1
+            if entry.expiry <= clock.now_ms():
+                return None
+        return entry
+
+    def clear(self) -> dict[bytes, Entry]:
+        # Detaches every key from the store in O(1) and returns them, so the
+        # caller decides where the old dict gets freed.
+        data = self._data
+        self._data = dict()
+        self._expiry_index = []
+        self._num_volatile_keys = 0
+        self.used_memory = 0
+        self.memory_by_type.clear()
+        self._key_index = KeyIndex(self._data)
+        self._eviction_pool = []
+        return data
+
+    def resize(self, entry: Entry, delta: int) -> None:
+        # Accounts for a value that was grown or shrunk in place.
+        entry.size += delta
+        self.memory_by_type[type_name(entry.value)] += delta
+        self.used_memory += delta
+        self.peak_memory = max(self.peak_memory, self.used_memory)
+
+    def items(self) -> Iterator[tuple[bytes, Entry]]:
+        now = clock.now_ms()
+        for key, entry in self._data.items():
+            if entry.expiry is None or entry.expiry > now:
+                yield key, entry
 
-    def get(self, key: str, default: Entry) -> Entry:
-        if key in self:
-            return self[key]
+    def flush_expired_data(self, time_budget: float) -> int:
+        # Pops due keys off the expiry index until none are left or the time
+        # budget (in seconds) is spent, and returns how many were removed.
+        deadline = time.monotonic() + time_budget
+        num_expired, num_checked, now = 0, 0, clock.now_ms()
+        while self._expiry_index and self._expiry_index[0][0] <= now:
+            expiry, key = heapq.heappop(self._expiry_index)
+            entry = self._data.get(key)
+            if entry is not None and entry.expiry == expiry:
+                self._remove(key)
+                num_expired += 1
+            num_checked += 1
+            if (
+                num_checked % _CLOCK_CHECK_INTERVAL == 0
+                and time.monotonic() >= deadline
+            ):
+                break
+        return num_expired
+
+    def scan(self, cursor: int, count: int) -> tuple[int, list[tuple[bytes, Entry]]]:
+        # Returns the live items of the key index chunks from `cursor` on, until
+        # about `count` keys are found or ten times as many slots examined,
+        # and the cursor to continue from, which is 0 once all were visited.
+        # Keys present for a whole scan are returned at least once.
+        items: list[tuple[bytes, Entry]] = []
+        budget, now = max(KEY_CHUNK_SIZE, 10 * count), clock.now_ms()
+        while cursor < len(self._key_index) and len(items) < count and budget > 0:
+            for key in self._key_index.keys(cursor):
+                entry = self._data[key]
+                if entry.expiry is None or entry.expiry > now:
+                    items.append((key, entry))
+            budget -= KEY_CHUNK_SIZE
+            cursor += 1
+        return (0 if cursor >= len(self._key_index) else cursor), items
+
+    def over_maxmemory(self) -> bool:
+        return 0 < self.maxmemory < self.used_memory
+
+    def evict(self) -> list[bytes]:
+        # Evicts keys chosen by the eviction policy until memory usage is back
+        # under maxmemory or no candidate is left, and returns their names.
+        evicted: list[bytes] = []
+        while self.over_maxmemory():
+            key = self._eviction_candidate()
+            if key is None:
+                break
+            self._remove(key)
+            evicted.append(key)
+        return evicted
+
+    def _eviction_candidate(self) -> bytes | None:
+        policy = self._maxmemory_policy
+        if policy is EvictionPolicy.NOEVICTION:
+            return None
+        if policy is EvictionPolicy.VOLATILE_TTL:
+            return self._soonest_expiring_key()
+        if not (policy.lru or policy.lfu):
+            return self._random_key()
+        # Like Redis, sampled keys are merged into a pool that keeps the best
+        # candidates seen across evictions, ranked by idle time or rarity.
+        now, pool = clock.now_ms(), self._eviction_pool
+        for _ in range(self.maxmemory_samples):
+            key = self._random_key()
+            if key is None:
+                break
+            score = self._eviction_score(self._data[key], now)
+            if all(key != pooled for _, pooled in pool):
+                pool.append((score, key))
+        pool.sort(reverse=True)
+        del pool[_EVICTION_POOL_SIZE:]
+        while pool:
+            _, key = pool.pop(0)
+            if key in self._data:
+                return key
+        return None
+
+    def _eviction_score(self, entry: Entry, now: int) -> int:
+        if self._lfu:
+            return LFU_MAX_VALUE - lfu_counter(entry.access, now)
+        return now - entry.access
+
+    def _soonest_expiring_key(self) -> bytes | None:
+        while self._expiry_index:
+            expiry, key = heapq.heappop(self._expiry_index)
+            entry = self._data.get(key)
+            if entry is not None and entry.expiry == expiry:
+                return key
+        return None
+
+    def _random_key(self) -> bytes | None:
+        # Stale samples are retried a bounded number of times; with the
+        # compaction of both sources most samples are live keys.
+        if not self._data:
+            return None
+        volatile = self._maxmemory_policy.volatile
+        for _ in range(_MAX_SAMPLING_ATTEMPTS):
+            if not volatile:
+                key = self._key_index.random_key()
+                if key is not None:
+                    return key
+            elif not self._expiry_index:
+                return None
+            else:
+                expiry, key = random.choice(self._expiry_index)
+                entry = self._data.get(key)
+                if entry is not None and entry.expiry == expiry:
+                    return key
+        return None if volatile else next(iter(self._data))
+
+    def _lookup(self, key: bytes, now: int) -> Entry | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expiry is not None and entry.expiry <= now:
+            self._remove(key)
+            return None
+        if self._lfu:
+            entry.access = lfu_touch(entry.access, now)
         else:
-            return default
-
-    def flush_expired_data(self) -> None:
-        percent_expired: float = 1
-        while percent_expired > 0.25 and len(self._data) > 0:
-            sample_size = min(len(self._data), 20)
-            sample: list[str] = random.sample(list(self._data.keys()), sample_size)
-            num_expired = len([key for key in sample if key not in self])
-            percent_expired = float(num_expired) / float(sample_size)
-            print(percent_expired)
+            entry.access = now
+        return entry
+
+    def _initial_access(self) -> int:
+        now = clock.now_ms()
+        return lfu_initial_access(now) if self._lfu else now
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._data.pop(key)
+        self._release_memory(key, entry)
+        if entry.expiry is not None:
+            self._num_volatile_keys -= 1
+
+    def _release_memory(self, key: bytes, entry: Entry) -> None:
+        self.memory_by_type[type_name(entry.value)] -= entry.size - estimate_key_size(
+            key
+        )
+        self.used_memory -= entry.size
+
+    def _compact_expiry_index(self) -> None:
+        if len(self._expiry_index) < max(
+            _MIN_EXPIRY_INDEX_SIZE_TO_COMPACT, 2 * self._num_volatile_keys
+        ):
+            return
+        self._expiry_index = [
+            (expiry, key)
+            for expiry, key in self._expiry_index
+            if (entry := self._data.get(key)) is not None and entry.expiry == expiry
+        ]
+        heapq.heapify(self._expiry_index)
@@ -0,0 +1,58 @@
+from typing import Any
+
+from pyredis.models.resp.shared_replies import SHARED_INTEGERS
+
+# Strings up to this length are stored inline with their object header, the
+# way Redis' embstr encoding is.
+EMBSTR_SIZE_LIMIT = 44
+
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+_MAX_INT64_DIGITS = 20
+
+# Values of 0 to SHARED_INTEGERS - 1 share one int object across all keys.
+_SHARED_INTEGERS = list(range(SHARED_INTEGERS))
+
+
+def encode_string(value: bytes) -> int | bytes:
+    # Stores a string as an int if it is the canonical form of a 64-bit
+    # integer, so it can be shared and incremented in place.
+    number = parse_int(value)
+    return value if number is None else shared_integer(number)
+
+
+def parse_int(value: bytes) -> int | None:
+    # Like Redis' string2ll: no whitespace, sign prefix, leading zeros or
+    # underscores, and within the range of a signed 64-bit integer.
+    if not 0 < len(value) <= _MAX_INT64_DIGITS or not value[-1:].isdigit():
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    if b"%d" % number != value or not INT64_MIN <= number <= INT64_MAX:
+        return None
+    return number
+
+
+def shared_integer(number: int) -> int:
+    if 0 <= number < SHARED_INTEGERS:
+        return _SHARED_INTEGERS[number]
+    return number
+
+
+def is_shared(value: Any) -> bool:
+    return (
+        isinstance(value, int)
+        and 0 <= value < SHARED_INTEGERS
+        and value is _SHARED_INTEGERS[value]
+    )
+
+
+def object_encoding(value: Any) -> str:
+    # Values of the container types report their own encoding.
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, bytes):
+        return "embstr" if len(value) <= EMBSTR_SIZE_LIMIT else "raw"
+    encoding: str = value.encoding
+    return encoding
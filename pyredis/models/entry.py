@@ -1,9 +1,33 @@
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
 from typing import Any
 
+from pyredis.models.hash import Hash
+from pyredis.models.quicklist import QuickList
+from pyredis.models.set import Set
+from pyredis.models.sorted_set import SortedSet
 
-@dataclass
+
+@dataclass(slots=True)
 class Entry:
     value: Any
-    expiry: datetime | None
+    # Absolute expiry time in Unix milliseconds.
+    expiry: int | None
+    # Estimated memory held by the key and its value, in bytes.
+    size: int = field(default=0, compare=False)
+    # Last access time in Unix milliseconds, or packed LFU counter, depending
+    # on the data store's eviction policy.
+    access: int = field(default=0, compare=False)
+    # The chunk of the data store's key index that holds this entry's key.
+    key_chunk: list[bytes] | None = field(default=None, compare=False, repr=False)
+
+
+def type_name(value: Any) -> str:
+    if isinstance(value, QuickList):
+        return "list"
+    if isinstance(value, Hash):
+        return "hash"
+    if isinstance(value, SortedSet):
+        return "zset"
+    if isinstance(value, Set):
+        return "set"
+    return "string"
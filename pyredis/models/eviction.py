@@ -0,0 +1,59 @@
+import math
+import random
+from enum import StrEnum
+
+LFU_INIT_VALUE = 5
+LFU_MAX_VALUE = 255
+_LFU_LOG_FACTOR = 10
+_LFU_DECAY_MINUTES = 1
+_LFU_COUNTER_BITS = 8
+
+
+class EvictionPolicy(StrEnum):
+    NOEVICTION = "noeviction"
+    ALLKEYS_LRU = "allkeys-lru"
+    VOLATILE_LRU = "volatile-lru"
+    ALLKEYS_LFU = "allkeys-lfu"
+    VOLATILE_LFU = "volatile-lfu"
+    ALLKEYS_RANDOM = "allkeys-random"
+    VOLATILE_RANDOM = "volatile-random"
+    VOLATILE_TTL = "volatile-ttl"
+
+    @property
+    def volatile(self) -> bool:
+        return self.startswith("volatile-")
+
+    @property
+    def lru(self) -> bool:
+        return self.endswith("-lru")
+
+    @property
+    def lfu(self) -> bool:
+        return self.endswith("-lfu")
+
+
+# An entry's LFU access metadata packs the minute its counter was last
+# decremented above a logarithmic access counter, as Redis does.
+
+
+def lfu_initial_access(now_ms: int) -> int:
+    return _minutes(now_ms) << _LFU_COUNTER_BITS | LFU_INIT_VALUE
+
+
+def lfu_touch(access: int, now_ms: int) -> int:
+    counter = lfu_counter(access, now_ms)
+    if counter < LFU_MAX_VALUE:
+        base = max(counter - LFU_INIT_VALUE, 0)
+        if random.random() < 1.0 / (base * _LFU_LOG_FACTOR + 1):
+            counter += 1
+    return _minutes(now_ms) << _LFU_COUNTER_BITS | counter
+
+
+def lfu_counter(access: int, now_ms: int) -> int:
+    counter = access & LFU_MAX_VALUE
+    elapsed_minutes = _minutes(now_ms) - (access >> _LFU_COUNTER_BITS)
+    return max(counter - elapsed_minutes // _LFU_DECAY_MINUTES, 0)
+
+
+def _minutes(now_ms: int) -> int:
+    return math.floor(now_ms / 60_000)
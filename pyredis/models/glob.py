@@ -0,0 +1,61 @@
+import functools
+import re
+from typing import Callable
+
+Matcher = Callable[[bytes], re.Match[bytes] | None]
+
+
+@functools.lru_cache(maxsize=256)
+def compile_glob(pattern: bytes) -> Matcher:
+    # Compiles a glob with the rules of Redis' stringmatchlen: * matches any
+    # run of bytes, ? any byte, and [...] a byte in a set of bytes and ranges
+    # or, after a ^, a byte not in it. A backslash matches the byte after it
+    # literally, in a set or not.
+    return re.compile(_translate(pattern), re.DOTALL).fullmatch
+
+
+def _translate(pattern: bytes) -> bytes:
+    parts, position = list[bytes](), 0
+    while position < len(pattern):
+        character = pattern[position : position + 1]
+        position += 1
+        if character == b"*":
+            if not parts or parts[-1] != b".*":
+                parts.append(b".*")
+        elif character == b"?":
+            parts.append(b".")
+        elif character == b"\\" and position < len(pattern):
+            parts.append(re.escape(pattern[position : position + 1]))
+            position += 1
+        elif character == b"[":
+            part, position = _translate_set(pattern, position)
+            parts.append(part)
+        else:
+            parts.append(re.escape(character))
+    return b"".join(parts)
+
+
+def _translate_set(pattern: bytes, position: int) -> tuple[bytes, int]:
+    # A set left open runs to the end of the pattern, as in Redis.
+    negated = pattern[position : position + 1] == b"^"
+    if negated:
+        position += 1
+    members = []
+    while position < len(pattern) and pattern[position : position + 1] != b"]":
+        if pattern[position : position + 1] == b"\\" and position + 1 < len(pattern):
+            members.append(re.escape(pattern[position + 1 : position + 2]))
+            position += 2
+        elif (
+            position + 2 < len(pattern) and pattern[position + 1 : position + 2] == b"-"
+        ):
+            start, end = sorted((pattern[position], pattern[position + 2]))
+            members.append(re.escape(bytes([start])) + b"-" + re.escape(bytes([end])))
+            position += 3
+        else:
+            members.append(re.escape(pattern[position : position + 1]))
+            position += 1
+    position += 1
+    if not members:
+        # [] matches nothing and [^] any byte.
+        return (b"." if negated else b"(?!)"), position
+    return b"[" + (b"^" if negated else b"") + b"".join(members) + b"]", position
@@ -0,0 +1,94 @@
+import sys
+from typing import Iterator
+
+HASH_MAX_LISTPACK_ENTRIES = 128
+HASH_MAX_LISTPACK_VALUE = 64
+
+
+class Hash:
+    # The fields of a hash. Small hashes are packed into one flat list of
+    # alternating fields and values, like Redis' listpack: finding a field
+    # scans the list, which for a few fields is as fast as hashing it and
+    # saves the memory of a dict per hash. The hash converts to a dict for
+    # good once it outgrows the limits it is given.
+    __slots__ = ("_fields",)
+
+    def __init__(self) -> None:
+        self._fields: list[bytes] | dict[bytes, bytes] = []
+
+    def __len__(self) -> int:
+        if isinstance(self._fields, dict):
+            return len(self._fields)
+        return len(self._fields) // 2
+
+    def __repr__(self) -> str:
+        return f"Hash({dict(self.items())!r})"
+
+    @property
+    def compact(self) -> bool:
+        return isinstance(self._fields, list)
+
+    @property
+    def encoding(self) -> str:
+        return "listpack" if self.compact else "hashtable"
+
+    def container_size(self) -> int:
+        return sys.getsizeof(self._fields)
+
+    def items(self) -> Iterator[tuple[bytes, bytes]]:
+        if isinstance(self._fields, dict):
+            return iter(self._fields.items())
+        return zip(self._fields[::2], self._fields[1::2])
+
+    def get(self, field: bytes) -> bytes | None:
+        if isinstance(self._fields, dict):
+            return self._fields.get(field)
+        index = _find_field(self._fields, field)
+        return None if index < 0 else self._fields[index + 1]
+
+    def set(self, field: bytes, value: bytes, max_entries: int, max_value: int) -> bool:
+        # Sets a field, converting to a dict first if the compact encoding
+        # would then hold more than max_entries fields or a field or value
+        # longer than max_value bytes. Returns whether the field is new.
+        if isinstance(self._fields, list) and (
+            len(field) > max_value or len(value) > max_value
+        ):
+            self.convert()
+        if isinstance(self._fields, dict):
+            is_new = field not in self._fields
+            self._fields[field] = value
+            return is_new
+        index = _find_field(self._fields, field)
+        if index >= 0:
+            self._fields[index + 1] = value
+            return False
+        if len(self) < max_entries:
+            self._fields += (field, value)
+        else:
+            self._fields = dict(self.items())
+            self._fields[field] = value
+        return True
+
+    def popitem(self) -> tuple[bytes, bytes]:
+        if isinstance(self._fields, dict):
+            return self._fields.popitem()
+        if not self._fields:
+            raise KeyError("popitem(): hash is empty")
+        value, field = self._fields.pop(), self._fields.pop()
+        return field, value
+
+    def convert(self) -> None:
+        if isinstance(self._fields, list):
+            self._fields = dict(zip(self._fields[::2], self._fields[1::2]))
+
+
+def _find_field(fields: list[bytes], field: bytes) -> int:
+    # list.index searches in C; a match at an odd index is a value.
+    index = -1
+    while True:
+        try:
+            index = fields.index(field, index + 1)
+        except ValueError:
+            return -1
+        if index % 2 == 0:
+            return index
@@ -0,0 +1,70 @@
+import random
+
+from pyredis.models.entry import Entry
+
+KEY_CHUNK_SIZE = 128
+_CHUNKS_COMPACTED_PER_NEW_CHUNK = 2
+
+
+class KeyIndex:
+    # Every key in insertion order, split into chunks that keep their position
+    # in the index for as long as the store lives. Each entry points at the
+    # chunk holding its key, so a key stays in the same chunk until removed.
+    # That makes chunk positions usable as SCAN cursors, and lets keys be
+    # sampled at random, which a dict cannot do.
+    #
+    # Removed keys are not looked for. Instead, whenever a chunk fills up, the
+    # next chunks in round-robin order are compacted, dropping keys whose
+    # entry no longer points at them, and emptied chunks are reused.
+    def __init__(self, data: dict[bytes, Entry]) -> None:
+        self._data = data
+        self._chunks: list[list[bytes]] = [[]]
+        self._fill_index = 0
+        self._free_indexes: list[int] = []
+        self._compact_index = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def add(self, key: bytes, entry: Entry) -> None:
+        chunk = self._chunks[self._fill_index]
+        if len(chunk) >= KEY_CHUNK_SIZE:
+            for _ in range(_CHUNKS_COMPACTED_PER_NEW_CHUNK):
+                self._compact_next_chunk()
+            if self._free_indexes:
+                self._fill_index = self._free_indexes.pop()
+            else:
+                self._fill_index = len(self._chunks)
+                self._chunks.append([])
+            chunk = self._chunks[self._fill_index]
+        chunk.append(key)
+        entry.key_chunk = chunk
+
+    def keys(self, index: int) -> list[bytes]:
+        # Returns the live keys of a chunk, each one once.
+        chunk = self._chunks[index]
+        return [
+            key
+            for key in dict.fromkeys(chunk)
+            if (entry := self._data.get(key)) is not None and entry.key_chunk is chunk
+        ]
+
+    def random_key(self) -> bytes | None:
+        # Returns a key picked at random, or None if the one picked was
+        # removed, so callers retry.
+        chunk = random.choice(self._chunks)
+        if not chunk:
+            return None
+        key = random.choice(chunk)
+        entry = self._data.get(key)
+        return key if entry is not None and entry.key_chunk is chunk else None
+
+    def _compact_next_chunk(self) -> None:
+        index = self._compact_index
+        self._compact_index = (index + 1) % len(self._chunks)
+        chunk = self._chunks[index]
+        if not chunk or index == self._fill_index:
+            return
+        chunk[:] = self.keys(index)
+        if not chunk:
+            self._free_indexes.append(index)
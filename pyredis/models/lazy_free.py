@@ -0,0 +1,75 @@
+import queue
+import threading
+from typing import Any
+
+from pyredis.models.entry import Entry
+from pyredis.models.hash import Hash
+from pyredis.models.quicklist import QuickList
+from pyredis.models.set import Set
+from pyredis.models.sorted_set import SortedSet
+
+# Values made of at most this many objects are cheaper to free inline than
+# to hand over to the background thread, as in Redis.
+LAZYFREE_THRESHOLD = 64
+
+_queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+_thread: threading.Thread | None = None
+_lock = threading.Lock()
+_pending = 0
+
+
+def free(value: Any) -> None:
+    # Takes over a value that is no longer referenced from the keyspace and
+    # releases it on a background thread if it is large.
+    global _pending, _thread
+    if _free_effort(value) <= LAZYFREE_THRESHOLD:
+        return
+    with _lock:
+        _pending += 1
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=_run, name="lazy-free", daemon=True)
+        _thread.start()
+    _queue.put(value)
+
+
+def pending() -> int:
+    return _pending
+
+
+def _free_effort(value: Any) -> int:
+    # A detached keyspace is always freed in the background, however few keys
+    # it has, since any of its values may be large.
+    if isinstance(value, dict):
+        return LAZYFREE_THRESHOLD + 1
+    if isinstance(value, (QuickList, Hash, SortedSet, Set)):
+        return len(value)
+    return 1
+
+
+def _run() -> None:
+    global _pending
+    while True:
+        value = _queue.get()
+        _release(value)
+        del value
+        with _lock:
+            _pending -= 1
+
+
+def _release(value: Any) -> None:
+    # Empties containers one element at a time instead of in a single
+    # deallocation, so the GIL is handed back to the event loop regularly.
+    if isinstance(value, (QuickList, Set)):
+        while value:
+            value.pop()
+    elif isinstance(value, Hash):
+        while value:
+            value.popitem()
+    elif isinstance(value, SortedSet):
+        while value:
+            value.popmin()
+    elif isinstance(value, dict):
+        while value:
+            _, element = value.popitem()
+            if isinstance(element, Entry):
+                _release(element.value)
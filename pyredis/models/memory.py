@@ -0,0 +1,60 @@
+import sys
+from typing import Any, Iterable
+
+from pyredis.models.encoding import is_shared
+from pyredis.models.entry import Entry
+from pyredis.models.hash import Hash
+from pyredis.models.quicklist import QuickList
+from pyredis.models.set import Set
+from pyredis.models.sorted_set import SortedSet
+
+_POINTER_SIZE = 8
+_UNITS = ["B", "K", "M", "G", "T"]
+
+# Approximate cost of a key's dict slot (hash, key and value pointers, with
+# room for the table's load factor) plus the Entry object wrapping its value.
+ENTRY_OVERHEAD = 4 * 3 * _POINTER_SIZE // 2 + sys.getsizeof(Entry(None, None))
+
+
+def estimate_key_size(key: bytes) -> int:
+    return ENTRY_OVERHEAD + sys.getsizeof(key)
+
+
+def estimate_value_size(value: Any) -> int:
+    if isinstance(value, QuickList):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(node) + sum(sys.getsizeof(element) for element in node)
+            for node in value.nodes
+        )
+    if isinstance(value, Set):
+        return sys.getsizeof(value) + value.container_size()
+    if isinstance(value, Hash):
+        return (
+            sys.getsizeof(value)
+            + value.container_size()
+            + sum(
+                sys.getsizeof(field) + sys.getsizeof(field_value)
+                for field, field_value in value.items()
+            )
+        )
+    if isinstance(value, SortedSet):
+        return sys.getsizeof(value) + sum(
+            value.element_size(member) for member, _ in value.items()
+        )
+    if is_shared(value):
+        return 0
+    return sys.getsizeof(value)
+
+
+def estimate_elements_size(elements: Iterable[bytes]) -> int:
+    return sum(sys.getsizeof(element) + _POINTER_SIZE for element in elements)
+
+
+def format_bytes(size: int) -> str:
+    # Formats a size the way Redis' INFO does, e.g. "100B" or "1.50M".
+    if size < 1024:
+        return f"{size}B"
+    scaled, unit = float(size), 0
+    while scaled >= 1024 and unit < len(_UNITS) - 1:
+        scaled, unit = scaled / 1024, unit + 1
+    return f"{scaled:.2f}{_UNITS[unit]}"
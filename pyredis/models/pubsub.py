@@ -0,0 +1,140 @@
+import asyncio
+import collections
+import re
+from typing import Protocol
+
+from pyredis.models.glob import Matcher, compile_glob
+
+_GLOB_CHARACTERS = re.compile(rb"[*?\[\\]")
+
+
+class Subscriber(Protocol):
+    # Messages published to the subscriber since they were last written.
+    messages: list[bytes]
+
+    def flush_messages(self) -> None: ...
+
+
+class _Pattern:
+    __slots__ = ("match", "subscribers")
+
+    def __init__(self, pattern: bytes) -> None:
+        self.match: Matcher = compile_glob(pattern)
+        self.subscribers: dict[Subscriber, None] = {}
+
+
+def _literal_prefix(pattern: bytes) -> bytes:
+    glob = _GLOB_CHARACTERS.search(pattern)
+    return pattern if glob is None else pattern[: glob.start()]
+
+
+class PubSub:
+    # Subscribers by channel and by pattern. Patterns are indexed by the
+    # literal prefix before their first glob character, so PUBLISH only
+    # matches the channel against patterns whose prefix it starts with, with
+    # one dict lookup per distinct prefix length.
+    #
+    # Each message is encoded once and shared by all of its subscribers, which
+    # write the messages they got during an event loop iteration together.
+    def __init__(self) -> None:
+        self._channels: dict[bytes, dict[Subscriber, None]] = {}
+        self._patterns: dict[bytes, _Pattern] = {}
+        self._patterns_by_prefix: dict[bytes, dict[bytes, _Pattern]] = {}
+        self._prefix_lengths: collections.Counter[int] = collections.Counter()
+        self._pending: list[Subscriber] = []
+        self._flush_scheduled = False
+
+    def subscribe(self, subscriber: Subscriber, channel: bytes) -> None:
+        self._channels.setdefault(channel, {})[subscriber] = None
+
+    def unsubscribe(self, subscriber: Subscriber, channel: bytes) -> None:
+        subscribers = self._channels.get(channel)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        del subscribers[subscriber]
+        if not subscribers:
+            del self._channels[channel]
+
+    def psubscribe(self, subscriber: Subscriber, pattern: bytes) -> None:
+        compiled = self._patterns.get(pattern)
+        if compiled is None:
+            compiled = self._patterns[pattern] = _Pattern(pattern)
+            prefix = _literal_prefix(pattern)
+            self._patterns_by_prefix.setdefault(prefix, {})[pattern] = compiled
+            self._prefix_lengths[len(prefix)] += 1
+        compiled.subscribers[subscriber] = None
+
+    def punsubscribe(self, subscriber: Subscriber, pattern: bytes) -> None:
+        compiled = self._patterns.get(pattern)
+        if compiled is None or subscriber not in compiled.subscribers:
+            return
+        del compiled.subscribers[subscriber]
+        if compiled.subscribers:
+            return
+        del self._patterns[pattern]
+        prefix = _literal_prefix(pattern)
+        patterns = self._patterns_by_prefix[prefix]
+        del patterns[pattern]
+        if not patterns:
+            del self._patterns_by_prefix[prefix]
+        self._prefix_lengths[len(prefix)] -= 1
+        if not self._prefix_lengths[len(prefix)]:
+            del self._prefix_lengths[len(prefix)]
+
+    def publish(self, channel: bytes, message: bytes) -> int:
+        # Returns the number of subscriptions the message was delivered to.
+        receivers = 0
+        subscribers = self._channels.get(channel)
+        if subscribers:
+            encoded = b"*3\r\n$7\r\nmessage\r\n$%d\r\n%b\r\n$%d\r\n%b\r\n" % (
+                len(channel),
+                channel,
+                len(message),
+                message,
+            )
+            self._deliver(subscribers, encoded)
+            receivers += len(subscribers)
+        for length in self._prefix_lengths:
+            if length > len(channel):
+                continue
+            patterns = self._patterns_by_prefix.get(channel[:length])
+            if patterns is None:
+                continue
+            for pattern, compiled in patterns.items():
+                if compiled.match(channel) is None:
+                    continue
+                encoded = (
+                    b"*4\r\n$8\r\npmessage\r\n$%d\r\n%b\r\n$%d\r\n%b\r\n$%d\r\n%b\r\n"
+                    % (
+                        len(pattern),
+                        pattern,
+                        len(channel),
+                        channel,
+                        len(message),
+                        message,
+                    )
+                )
+                self._deliver(compiled.subscribers, encoded)
+                receivers += len(compiled.subscribers)
+        if self._pending and not self._flush_scheduled:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._flush()
+            else:
+                loop.call_soon(self._flush)
+                self._flush_scheduled = True
+        return receivers
+
+    def _deliver(self, subscribers: dict[Subscriber, None], encoded: bytes) -> None:
+        pending = self._pending
+        for subscriber in subscribers:
+            if not subscriber.messages:
+                pending.append(subscriber)
+            subscriber.messages.append(encoded)
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, []
+        self._flush_scheduled = False
+        for subscriber in pending:
+            subscriber.flush_messages()
@@ -0,0 +1,144 @@
+import collections
+from typing import Iterable, Iterator
+
+NODE_CAPACITY = 128
+
+
+class QuickList:
+    # A list stored as a deque of small nodes of up to NODE_CAPACITY elements,
+    # like Redis' quicklist. Pushing and popping at either end is O(1), and
+    # reaching an index only walks nodes, from whichever end is closer, so
+    # it costs O(index / NODE_CAPACITY).
+    __slots__ = ("_nodes", "_length")
+
+    def __init__(self, values: Iterable[bytes] = ()) -> None:
+        self._nodes: collections.deque[list[bytes]] = collections.deque()
+        self._length = 0
+        self.extend(values)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        for node in self._nodes:
+            yield from node
+
+    def __repr__(self) -> str:
+        return f"QuickList({list(self)!r})"
+
+    def __getitem__(self, index: int) -> bytes:
+        node_index, offset = self._locate(index)
+        return self._nodes[node_index][offset]
+
+    def __setitem__(self, index: int, value: bytes) -> None:
+        node_index, offset = self._locate(index)
+        self._nodes[node_index][offset] = value
+
+    @property
+    def encoding(self) -> str:
+        return "quicklist"
+
+    @property
+    def nodes(self) -> Iterator[list[bytes]]:
+        return iter(self._nodes)
+
+    def append(self, value: bytes) -> None:
+        if not self._nodes or len(self._nodes[-1]) >= NODE_CAPACITY:
+            self._nodes.append([])
+        self._nodes[-1].append(value)
+        self._length += 1
+
+    def appendleft(self, value: bytes) -> None:
+        if not self._nodes or len(self._nodes[0]) >= NODE_CAPACITY:
+            self._nodes.appendleft([])
+        self._nodes[0].insert(0, value)
+        self._length += 1
+
+    def extend(self, values: Iterable[bytes]) -> None:
+        for value in values:
+            self.append(value)
+
+    def extendleft(self, values: Iterable[bytes]) -> None:
+        # Like deque.extendleft, each value is pushed in turn, so they end up
+        # in reverse order.
+        for value in values:
+            self.appendleft(value)
+
+    def pop(self) -> bytes:
+        if not self._nodes:
+            raise IndexError("pop from an empty list")
+        node = self._nodes[-1]
+        value = node.pop()
+        if not node:
+            self._nodes.pop()
+        self._length -= 1
+        return value
+
+    def popleft(self) -> bytes:
+        if not self._nodes:
+            raise IndexError("pop from an empty list")
+        node = self._nodes[0]
+        value = node.pop(0)
+        if not node:
+            self._nodes.popleft()
+        self._length -= 1
+        return value
+
+    def range(self, start: int, stop: int) -> list[bytes]:
+        # Returns the elements from index start up to, but excluding, stop,
+        # for 0 <= start and stop <= len(self).
+        if start >= stop:
+            return []
+        node_index, offset = self._locate(start)
+        values, remaining = [], stop - start
+        while remaining > 0:
+            chunk = self._nodes[node_index][offset : offset + remaining]
+            values += chunk
+            remaining -= len(chunk)
+            node_index, offset = node_index + 1, 0
+        return values
+
+    def trim(self, start: int, stop: int) -> None:
+        # Keeps only the elements from index start up to, but excluding, stop,
+        # dropping whole nodes from both ends.
+        if start >= stop:
+            self._nodes.clear()
+            self._length = 0
+            return
+        to_drop = self._length - stop
+        while to_drop > 0:
+            node = self._nodes[-1]
+            if len(node) <= to_drop:
+                self._nodes.pop()
+                to_drop -= len(node)
+            else:
+                del node[len(node) - to_drop :]
+                to_drop = 0
+        to_drop = start
+        while to_drop > 0:
+            node = self._nodes[0]
+            if len(node) <= to_drop:
+                self._nodes.popleft()
+                to_drop -= len(node)
+            else:
+                del node[:to_drop]
+                to_drop = 0
+        self._length = stop - start
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("list index out of range")
+        if index < self._length // 2:
+            for node_index, node in enumerate(self._nodes):
+                if index < len(node):
+                    return node_index, index
+                index -= len(node)
+        else:
+            index = self._length - 1 - index
+            for node_index, node in enumerate(reversed(self._nodes)):
+                if index < len(node):
+                    return len(self._nodes) - 1 - node_index, len(node) - 1 - index
+                index -= len(node)
+        raise AssertionError("list length is out of sync with its nodes")
@@ -35,7 +35,7 @@ class Array(RespDataType):
         split = str_.split()
         return Array(
             collections.deque(
-                [BulkString(element) for element in split], maxlen=len(split)
+                [BulkString(element.encode()) for element in split], maxlen=len(split)
             )
         )
 
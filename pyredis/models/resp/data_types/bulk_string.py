@@ -6,15 +6,15 @@ from pyredis.models.resp.resp_data_type import RespDataType
 
 @dataclass
 class BulkString(RespDataType):
-    data: str | None
+    data: bytes | None
 
     def __str__(self) -> str:
-        return self.data or ""
+        return self.data.decode(errors="replace") if self.data else ""
 
     def encode(self) -> bytes:
         if self.data is None:
             return b"$-1\r\n"
-        return f"${len(self.data)}\r\n{self.data}\r\n".encode()
+        return b"$%d\r\n%b\r\n" % (len(self.data), self.data)
 
     def underlying(self) -> Any:
         return self.data
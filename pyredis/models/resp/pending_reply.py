@@ -0,0 +1,18 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any
+
+from pyredis.models.resp.resp_data_type import RespDataType
+
+
+@dataclass
+class PendingReply(RespDataType):
+    # A reply that is not ready when its command returns. The connection
+    # writes it, in order, once the future resolves with the encoded reply.
+    future: asyncio.Future[bytes]
+
+    def encode(self) -> bytes:
+        return self.future.result()
+
+    def underlying(self) -> Any:
+        return self.future
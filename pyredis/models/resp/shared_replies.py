@@ -0,0 +1,42 @@
+from pyredis.models.resp.data_types.error import (
+    Error,
+    NonIntOrOutOfRangeError,
+    WrongValueTypeError,
+)
+from pyredis.models.resp.resp_data_type import RespDataType
+
+Reply = RespDataType | bytes
+
+OK = b"+OK\r\n"
+PONG = b"+PONG\r\n"
+NIL = b"$-1\r\n"
+NULL_ARRAY = b"*-1\r\n"
+EMPTY_ARRAY = b"*0\r\n"
+WRONG_TYPE = WrongValueTypeError().encode()
+NON_INT_OR_OUT_OF_RANGE = NonIntOrOutOfRangeError().encode()
+SYNTAX_ERROR = Error("ERR", "syntax error").encode()
+OUT_OF_MEMORY = Error(
+    "OOM", "command not allowed when used memory > 'maxmemory'."
+).encode()
+
+SHARED_INTEGERS = 10000
+
+_INTEGERS = [b":%d\r\n" % value for value in range(SHARED_INTEGERS + 1)]
+
+
+def integer(value: int) -> bytes:
+    if 0 <= value <= SHARED_INTEGERS:
+        return _INTEGERS[value]
+    return b":%d\r\n" % value
+
+
+def encode_reply(reply: Reply) -> bytes:
+    if isinstance(reply, bytes):
+        return reply
+    return reply.encode()
+
+
+def is_error(reply: Reply) -> bool:
+    if isinstance(reply, bytes):
+        return reply[:1] == b"-"
+    return isinstance(reply, Error)
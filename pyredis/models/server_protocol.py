@@ -1,30 +1,245 @@
 import asyncio
-from copy import copy, deepcopy
+import collections
+from typing import Callable
 
 from pyredis.command_handler import handle_command
-from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.append_only_persister import AppendOnlyPersister, FsyncPolicy
 from pyredis.models.data_store import DataStore
+from pyredis.models.pubsub import Subscriber
 from pyredis.models.resp.data_types.array import Array
-from pyredis.models.resp.data_types.error import Error
-from pyredis.protocol_handler import extract_resp_data_and_size
+from pyredis.models.resp.data_types.bulk_string import BulkString
+from pyredis.models.resp.data_types.error import Error, NumberOfArgumentsError
+from pyredis.models.resp.pending_reply import PendingReply
+from pyredis.models.resp.resp_data_type import RespDataType
+from pyredis.models.resp.shared_replies import encode_reply
+from pyredis.models.shard_router import ShardReply, ShardRouter
+from pyredis.protocol_handler import CommandReader, ProtocolError
+
+# Commands run by the connection itself, as they act on its subscriptions.
+_SUBSCRIPTION_COMMANDS = {b"SUBSCRIBE", b"UNSUBSCRIBE", b"PSUBSCRIBE", b"PUNSUBSCRIBE"}
+_NOT_ALLOWED_WHILE_SUBSCRIBED = (
+    "only (P)SUBSCRIBE / (P)UNSUBSCRIBE / PING are allowed in this context"
+)
 
 
 class ServerProtocol(asyncio.Protocol):
-    def __init__(self, data_store: DataStore, persister: AppendOnlyPersister) -> None:
+    def __init__(
+        self,
+        data_store: DataStore,
+        persister: AppendOnlyPersister,
+        router: ShardRouter | None = None,
+    ) -> None:
         self._data_store = data_store
         self._persister = persister
-        self.transport: asyncio.BaseTransport | None = None
+        self._router = router
+        self._reader = CommandReader()
+        # Replies queued behind one that is still pending, such as a command
+        # forwarded to another shard, so they are written in command order.
+        self._queued_replies: collections.deque[ShardReply] = collections.deque()
+        # Channels and patterns the client is subscribed to, in the order it
+        # subscribed, and messages published to them not written yet.
+        self._channels: dict[bytes, None] = {}
+        self._patterns: dict[bytes, None] = {}
+        self.messages: list[bytes] = []
+        self.transport: asyncio.Transport | None = None
+        # Set once the client sent something that is not RESP, after which
+        # the connection is closed as soon as its replies are written.
+        self._close_after_reply = False
 
     def connection_made(self, transport: asyncio.BaseTransport) -> None:
-        self.transport = transport
+        self.transport = transport  # type: ignore
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.transport = None
+        pubsub = self._data_store.pubsub
+        for channel in self._channels:
+            pubsub.unsubscribe(self, channel)
+        for pattern in self._patterns:
+            pubsub.punsubscribe(self, pattern)
+        self._channels, self._patterns, self.messages = {}, {}, []
+        # Cancelling the pending replies unblocks the client's blocked
+        # commands, so nothing is popped for a client that is gone.
+        queued_replies, self._queued_replies = self._queued_replies, collections.deque()
+        for reply in queued_replies:
+            if isinstance(reply, asyncio.Future):
+                reply.cancel()
 
     def data_received(self, data: bytes) -> None:
         if not data:
             self.transport.close()  # type: ignore
+            return
+        if self._close_after_reply:
+            return
+
+        # Messages published before this data arrived go out before its
+        # replies.
+        if self.messages:
+            self.flush_messages()
+
+        self._reader.feed(data)
+        responses = []
+
+        while True:
+            response: ShardReply
+            try:
+                arguments = self._reader.read_command()
+            except ProtocolError as error:
+                response = Error("ERR", f"Protocol error: {error}").encode()
+                self._close_after_reply = True
+                if self._queued_replies:
+                    self._queue_reply(response)
+                else:
+                    responses.append(response)
+                break
+            if arguments is None:
+                break
+            command_data = Array.from_list(list(map(BulkString, arguments)))
+            if (
+                self._channels
+                or self._patterns
+                or _command_name(command_data) in _SUBSCRIPTION_COMMANDS
+            ):
+                response = self._handle_subscription(command_data)
+            elif self._router is None:
+                reply = handle_command(command_data, self._data_store, self._persister)
+                if isinstance(reply, PendingReply):
+                    response = reply.future
+                else:
+                    response = encode_reply(reply)
+            else:
+                raw_command = self._reader.last_command()
+                response = self._router.execute(command_data, raw_command)
+            if self._queued_replies or isinstance(response, asyncio.Future):
+                self._queue_reply(response)
+            else:
+                responses.append(response)
+
+        if self._persister.fsync_policy is FsyncPolicy.ALWAYS:
+            self._persister.flush()
+        if responses:
+            self.transport.writelines(responses)  # type: ignore
+        self._write_queued_replies()
+
+    def _queue_reply(self, reply: ShardReply) -> None:
+        self._queued_replies.append(reply)
+        if isinstance(reply, asyncio.Future):
+            reply.add_done_callback(lambda _: self._write_queued_replies())
+
+    def _write_queued_replies(self) -> None:
+        ready = []
+        while self._queued_replies:
+            reply = self._queued_replies[0]
+            if isinstance(reply, asyncio.Future):
+                if not reply.done():
+                    break
+                reply = reply.result()
+            self._queued_replies.popleft()
+            ready.append(reply)
+        if ready and self.transport is not None:
+            self.transport.writelines(ready)
+        if (
+            self._close_after_reply
+            and not self._queued_replies
+            and self.transport is not None
+        ):
+            self.transport.close()
+
+    def flush_messages(self) -> None:
+        messages, self.messages = self.messages, []
+        if self._queued_replies:
+            self._queued_replies.extend(messages)
+        elif messages and self.transport is not None:
+            self.transport.writelines(messages)
+
+    def _handle_subscription(self, command: Array) -> bytes:
+        # Once subscribed to anything, the connection is in push mode, where it
+        # only takes commands that change its subscriptions, and PING.
+        arguments = [_to_bytes(argument) for argument in command]
+        name = arguments[0].upper() if arguments else b""
+        args = arguments[1:]
+        pubsub = self._data_store.pubsub
+        match name:
+            case b"SUBSCRIBE" | b"PSUBSCRIBE" if not args:
+                return NumberOfArgumentsError(name.lower().decode()).encode()
+            case b"SUBSCRIBE":
+                return self._subscribe(
+                    b"subscribe", self._channels, args, pubsub.subscribe
+                )
+            case b"PSUBSCRIBE":
+                return self._subscribe(
+                    b"psubscribe", self._patterns, args, pubsub.psubscribe
+                )
+            case b"UNSUBSCRIBE":
+                return self._unsubscribe(
+                    b"unsubscribe", self._channels, args, pubsub.unsubscribe
+                )
+            case b"PUNSUBSCRIBE":
+                return self._unsubscribe(
+                    b"punsubscribe", self._patterns, args, pubsub.punsubscribe
+                )
+            case b"PING" if len(args) <= 1:
+                message = args[0] if args else b""
+                return b"*2\r\n$4\r\npong\r\n$%d\r\n%b\r\n" % (len(message), message)
+        return Error(
+            "ERR",
+            f"Can't execute '{name.lower().decode(errors='replace')}': "
+            + _NOT_ALLOWED_WHILE_SUBSCRIBED,
+        ).encode()
+
+    def _subscribe(
+        self,
+        kind: bytes,
+        subscriptions: dict[bytes, None],
+        names: list[bytes],
+        subscribe: Callable[[Subscriber, bytes], None],
+    ) -> bytes:
+        replies = []
+        for name in names:
+            if name not in subscriptions:
+                subscriptions[name] = None
+                subscribe(self, name)
+            replies.append(self._subscription_reply(kind, name))
+        return b"".join(replies)
+
+    def _unsubscribe(
+        self,
+        kind: bytes,
+        subscriptions: dict[bytes, None],
+        names: list[bytes],
+        unsubscribe: Callable[[Subscriber, bytes], None],
+    ) -> bytes:
+        # Without names, unsubscribes from every channel or pattern, replying
+        # once even if there are none.
+        replies = []
+        for name in names or list(subscriptions):
+            if name in subscriptions:
+                del subscriptions[name]
+                unsubscribe(self, name)
+            replies.append(self._subscription_reply(kind, name))
+        return b"".join(replies) or self._subscription_reply(kind, None)
+
+    def _subscription_reply(self, kind: bytes, name: bytes | None) -> bytes:
+        # Confirms a change with the number of subscriptions left.
+        count = len(self._channels) + len(self._patterns)
+        if name is None:
+            return b"*3\r\n$%d\r\n%b\r\n$-1\r\n:%d\r\n" % (len(kind), kind, count)
+        return b"*3\r\n$%d\r\n%b\r\n$%d\r\n%b\r\n:%d\r\n" % (
+            len(kind),
+            kind,
+            len(name),
+            name,
+            count,
+        )
+
+
+def _command_name(command: Array) -> bytes:
+    first = command[0] if len(command) else None
+    if isinstance(first, BulkString) and first.data is not None:
+        return first.data.upper()
+    return b""
 
-        command_data, size = extract_resp_data_and_size(data)
 
-        if command_data and isinstance(command_data, Array):
-            response = handle_command(command_data, self._data_store, self._persister)
-            if response is not None:
-                self.transport.write(response.encode())  # type: ignore
+def _to_bytes(element: RespDataType) -> bytes:
+    if isinstance(element, BulkString):
+        return element.data or b""
+    return str(element).encode()
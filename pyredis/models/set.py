@@ -0,0 +1,131 @@
+import array
+import bisect
+import sys
+from typing import Iterator
+
+from pyredis.models.encoding import parse_int
+
+SET_MAX_INTSET_ENTRIES = 512
+
+
+class Set:
+    # Unordered unique members. A set of integers is packed into a sorted
+    # array of 64-bit ints, like Redis' intset, where membership is found by
+    # bisection and each member takes 8 bytes. It converts to a Python set
+    # for good once it gets a member that is not an integer or grows past
+    # the limit it is given.
+    __slots__ = ("_members",)
+
+    def __init__(self) -> None:
+        self._members: array.array[int] | set[bytes] = array.array("q")
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __iter__(self) -> Iterator[bytes]:
+        if isinstance(self._members, set):
+            return iter(self._members)
+        return (b"%d" % member for member in self._members)
+
+    def __contains__(self, member: bytes) -> bool:
+        if isinstance(self._members, set):
+            return member in self._members
+        number = parse_int(member)
+        return number is not None and self._has_int(number)
+
+    def __repr__(self) -> str:
+        return f"Set({set(self)!r})"
+
+    @property
+    def intset(self) -> bool:
+        return isinstance(self._members, array.array)
+
+    @property
+    def encoding(self) -> str:
+        return "intset" if self.intset else "hashtable"
+
+    def container_size(self) -> int:
+        if isinstance(self._members, set):
+            return sys.getsizeof(self._members) + sum(
+                sys.getsizeof(member) for member in self._members
+            )
+        return sys.getsizeof(self._members)
+
+    def element_size(self, member: bytes) -> int:
+        # Estimated bytes one member takes up in the current encoding.
+        if isinstance(self._members, set):
+            return sys.getsizeof(member)
+        return self._members.itemsize
+
+    def add(self, member: bytes, max_intset_entries: int) -> bool:
+        # Adds a member, converting to a Python set first if the intset would
+        # then hold a member that is not an integer or more than
+        # max_intset_entries members. Returns whether the member is new.
+        if isinstance(self._members, array.array):
+            number = parse_int(member)
+            if number is not None:
+                index = bisect.bisect_left(self._members, number)
+                if index < len(self._members) and self._members[index] == number:
+                    return False
+                if len(self._members) < max_intset_entries:
+                    self._members.insert(index, number)
+                    return True
+            self._members = {b"%d" % number for number in self._members}
+        if member in self._members:
+            return False
+        self._members.add(member)
+        return True
+
+    def remove(self, member: bytes) -> bool:
+        if isinstance(self._members, set):
+            if member not in self._members:
+                return False
+            self._members.remove(member)
+            return True
+        number = parse_int(member)
+        if number is None or not self._has_int(number):
+            return False
+        del self._members[bisect.bisect_left(self._members, number)]
+        return True
+
+    def pop(self) -> bytes:
+        if isinstance(self._members, set):
+            return self._members.pop()
+        return b"%d" % self._members.pop()
+
+    def _has_int(self, number: int) -> bool:
+        if isinstance(self._members, set):
+            return b"%d" % number in self._members
+        index = bisect.bisect_left(self._members, number)
+        return index < len(self._members) and self._members[index] == number
+
+
+def intersection(sets: list[Set]) -> list[bytes]:
+    # Walks the smallest set and probes the others, smallest first, so the
+    # cost is bounded by the smallest set times the number of sets. Integer
+    # sets are probed with ints, without formatting or parsing members.
+    sets = sorted(sets, key=len)
+    smallest, others = sets[0], sets[1:]
+    if isinstance(smallest._members, array.array) and all(
+        other.intset for other in others
+    ):
+        return [
+            b"%d" % number
+            for number in smallest._members
+            if all(other._has_int(number) for other in others)
+        ]
+    return [member for member in smallest if all(member in other for other in others)]
+
+
+def union(sets: list[Set]) -> list[bytes]:
+    members: set[bytes] = set()
+    for member_set in sets:
+        members.update(member_set)
+    return list(members)
+
+
+def difference(first: Set, others: list[Set]) -> list[bytes]:
+    # Probes the other sets, largest first, as they are the likeliest to
+    # rule a member out.
+    others = sorted(others, key=len, reverse=True)
+    return [member for member in first if all(member not in other for other in others)]
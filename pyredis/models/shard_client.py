@@ -0,0 +1,93 @@
+import asyncio
+import functools
+import collections
+
+from pyredis.models.resp.data_types.error import Error
+from pyredis.protocol_handler import extract_resp_data_and_size
+
+SHARD_UNAVAILABLE = Error("ERR", "shard unavailable").encode()
+
+
+class ShardClient(asyncio.Protocol):
+    # Connection to a peer shard that forwards raw commands and resolves
+    # futures with its raw replies, which arrive in the order sent.
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._buffer = bytearray()
+        self._pending: list[bytes] = []
+        self._waiters: collections.deque[asyncio.Future[bytes]] = collections.deque()
+        self.transport: asyncio.Transport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.transport = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.cancelled():
+                waiter.set_result(SHARD_UNAVAILABLE)
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer.extend(data)
+        offset = 0
+        while offset < len(self._buffer):
+            reply, size = extract_resp_data_and_size(self._buffer, offset)
+            if reply is None:
+                break
+            # The client the reply was for may have gone away meanwhile.
+            waiter = self._waiters.popleft()
+            if not waiter.cancelled():
+                waiter.set_result(bytes(self._buffer[offset : offset + size]))
+            offset += size
+        del self._buffer[:offset]
+
+    def send(self, command: bytes) -> asyncio.Future[bytes]:
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        if self.transport is None:
+            waiter.set_result(SHARD_UNAVAILABLE)
+            return waiter
+        # Commands forwarded during the same event loop iteration are written
+        # to the peer together.
+        if not self._pending:
+            loop.call_soon(self._flush)
+        self._pending.append(command)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _flush(self) -> None:
+        if self.transport is not None:
+            self.transport.writelines(self._pending)
+        self._pending = []
+
+    def send_alone(self, command: bytes) -> asyncio.Future[bytes]:
+        # Sends a command that may block on the peer over a connection of its
+        # own, so it does not hold up the replies to other clients' commands.
+        # The connection is closed once the reply arrives or the future is
+        # cancelled, which unblocks the command on the peer.
+        loop = asyncio.get_running_loop()
+        reply = loop.create_future()
+        task = loop.create_task(self._send_alone(command, reply))
+        reply.add_done_callback(lambda _: task.cancel())
+        return reply
+
+    async def _send_alone(self, command: bytes, reply: asyncio.Future[bytes]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            transport, client = await loop.create_unix_connection(
+                functools.partial(ShardClient, self.path), self.path
+            )
+        except OSError:
+            reply.set_result(SHARD_UNAVAILABLE)
+            return
+        if reply.done():
+            transport.close()
+            return
+        reply.add_done_callback(lambda _: transport.close())
+
+        def forward(answer: asyncio.Future[bytes]) -> None:
+            if not reply.done():
+                reply.set_result(answer.result())
+
+        client.send(command).add_done_callback(forward)
@@ -0,0 +1,293 @@
+import asyncio
+import binascii
+import functools
+import os
+import tempfile
+from typing import Callable
+
+from pyredis.command_handler import COMMANDS, handle_command
+from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp import shared_replies
+from pyredis.models.resp.data_types.array import Array
+from pyredis.models.resp.data_types.bulk_string import BulkString
+from pyredis.models.resp.data_types.error import Error
+from pyredis.models.resp.pending_reply import PendingReply
+from pyredis.models.resp.shared_replies import encode_reply
+from pyredis.models.shard_client import ShardClient
+from pyredis.protocol_handler import (
+    ProtocolError,
+    extract_command_arguments_and_size,
+    extract_resp_data_and_size,
+)
+
+SLOTS = 16384
+
+_CROSS_SHARD = Error(
+    "CROSSSLOT", "Keys in request don't hash to the same slot"
+).encode()
+_CONNECT_RETRY_INTERVAL = 0.05
+_SCAN_DONE = b"*2\r\n$1\r\n0\r\n*0\r\n"
+
+# Multi-key commands that are split by shard, with the integer replies of
+# each part summed up, the array replies merged back in key order, or the
+# first error of any part returned.
+_SUMMED_FAN_OUT = {b"DEL", b"EXISTS", b"UNLINK"}
+_MERGED_FAN_OUT = {b"MGET"}
+_ACKNOWLEDGED_FAN_OUT = {b"MSET"}
+# Keyless commands that act on the whole keyspace, so every shard runs them,
+# and PUBLISH, as the subscribers of a channel may be connected to any shard.
+# The number of subscriptions each shard reached is summed up, and the keys
+# each shard found are concatenated.
+_BROADCAST = {b"FLUSHALL", b"FLUSHDB"}
+_SUMMED_BROADCAST = {b"PUBLISH"}
+_CONCATENATED_BROADCAST = {b"KEYS"}
+# SCAN walks the shards one after the other, with the shard it is on kept in
+# the bits of the cursor above that shard's own cursor.
+_SCAN_SHARD_SHIFT = 48
+# Commands that may wait on the shard running them for other clients' pushes.
+_BLOCKING = {b"BLPOP", b"BRPOP", b"BLMOVE"}
+
+ShardReply = bytes | asyncio.Future[bytes]
+
+
+def key_slot(key: bytes) -> int:
+    # Same slot as Redis Cluster: CRC16 of the key, or of its hash tag, so
+    # keys sharing a {tag} always land on the same shard.
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            key = key[start + 1 : end]
+    return binascii.crc_hqx(key, 0) % SLOTS
+
+
+def shard_socket_path(port: int, shard: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"pyredis-{port}-shard-{shard}.sock")
+
+
+async def connect_to_shards(
+    port: int, shard: int, num_shards: int
+) -> list[ShardClient | None]:
+    # Connects to every other shard's socket, waiting for those that are still
+    # starting up. The entry for this shard is None.
+    loop, peers = asyncio.get_running_loop(), list[ShardClient | None]()
+    for peer in range(num_shards):
+        if peer == shard:
+            peers.append(None)
+            continue
+        while True:
+            try:
+                path = shard_socket_path(port, peer)
+                _, client = await loop.create_unix_connection(
+                    functools.partial(ShardClient, path), path
+                )
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(_CONNECT_RETRY_INTERVAL)
+        peers.append(client)
+    return peers
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        data_store: DataStore,
+        persister: AppendOnlyPersister | None,
+        peers: list[ShardClient | None],
+    ) -> None:
+        self._data_store = data_store
+        self._persister = persister
+        self._peers = peers
+
+    def shard_of(self, key: bytes) -> int:
+        return key_slot(key) % len(self._peers)
+
+    def execute(self, command: Array, raw_command: bytes) -> ShardReply:
+        # Runs a command on the shard owning its keys. Keyless commands run
+        # on this shard, and multi-key commands are split when supported.
+        try:
+            arguments, _ = extract_command_arguments_and_size(raw_command)
+        except ProtocolError:
+            arguments = None
+        name = arguments[0].upper() if arguments else b""
+        command_spec = COMMANDS.get(name)
+        if (
+            arguments is None
+            or command_spec is None
+            or not command_spec.accepts(len(arguments))
+        ):
+            return self._run_locally(command)
+        if name == b"SCAN":
+            return self._scan(command, arguments)
+        if (
+            name in _BROADCAST
+            or name in _SUMMED_BROADCAST
+            or name in _CONCATENATED_BROADCAST
+        ):
+            parts = [
+                self._run_on(shard, command, raw_command)
+                for shard in range(len(self._peers))
+            ]
+            if name in _SUMMED_BROADCAST:
+                return _combine(parts, _sum)
+            if name in _CONCATENATED_BROADCAST:
+                return _combine(parts, _concatenate_arrays)
+            return _combine(parts, _first_error)
+        positions = command_spec.key_positions(arguments)
+        key_shards = [self.shard_of(arguments[position]) for position in positions]
+        shards = set(key_shards)
+        if len(shards) == 0:
+            return self._run_locally(command)
+        if len(shards) == 1:
+            shard = shards.pop()
+            peer = self._peers[shard]
+            if name in _BLOCKING and peer is not None:
+                return peer.send_alone(raw_command)
+            return self._run_on(shard, command, raw_command)
+        combine: Callable[[list[bytes]], bytes]
+        if name in _SUMMED_FAN_OUT:
+            combine = _sum
+        elif name in _MERGED_FAN_OUT:
+            combine = _merge_arrays(key_shards)
+        elif name in _ACKNOWLEDGED_FAN_OUT:
+            combine = _first_error
+        else:
+            return _CROSS_SHARD
+        # Each part gets the arguments from every key it owns up to the next
+        # key, so values travel with their keys.
+        arguments_by_shard: dict[int, list[bytes]] = {}
+        for position, shard in zip(positions, key_shards):
+            arguments_by_shard.setdefault(shard, []).extend(
+                arguments[position : position + positions.step]
+            )
+        parts = []
+        for shard, shard_arguments in arguments_by_shard.items():
+            part = Array.from_list(
+                [BulkString(name), *map(BulkString, shard_arguments)]
+            )
+            parts.append(self._run_on(shard, part, part.encode()))
+        return _combine(parts, combine)
+
+    def _scan(self, command: Array, arguments: list[bytes]) -> ShardReply:
+        try:
+            cursor = int(arguments[1])
+        except ValueError:
+            cursor = -1
+        if cursor < 0:
+            return self._run_locally(command)
+        shard = cursor >> _SCAN_SHARD_SHIFT
+        if shard >= len(self._peers):
+            return _SCAN_DONE
+        shard_cursor = cursor & ((1 << _SCAN_SHARD_SHIFT) - 1)
+        part = Array.from_list(
+            [
+                BulkString(argument)
+                for argument in [arguments[0], b"%d" % shard_cursor, *arguments[2:]]
+            ]
+        )
+        reply = self._run_on(shard, part, part.encode())
+        num_shards = len(self._peers)
+
+        def continue_cursor(replies: list[bytes]) -> bytes:
+            if replies[0][:1] != b"*":
+                return replies[0]
+            cursor_element, keys = _array_elements(replies[0])
+            cursor = int(cursor_element.split(b"\r\n")[1])
+            if cursor:
+                cursor |= shard << _SCAN_SHARD_SHIFT
+            elif shard + 1 < num_shards:
+                cursor = (shard + 1) << _SCAN_SHARD_SHIFT
+            encoded_cursor = b"%d" % cursor
+            return b"*2\r\n$%d\r\n%b\r\n%b" % (
+                len(encoded_cursor),
+                encoded_cursor,
+                keys,
+            )
+
+        return _combine([reply], continue_cursor)
+
+    def _run_on(self, shard: int, command: Array, raw_command: bytes) -> ShardReply:
+        peer = self._peers[shard]
+        if peer is None:
+            return self._run_locally(command)
+        return peer.send(raw_command)
+
+    def _run_locally(self, command: Array) -> ShardReply:
+        reply = handle_command(command, self._data_store, self._persister)
+        if isinstance(reply, PendingReply):
+            return reply.future
+        return encode_reply(reply)
+
+
+def _combine(
+    parts: list[ShardReply], combine: Callable[[list[bytes]], bytes]
+) -> ShardReply:
+    futures = [part for part in parts if isinstance(part, asyncio.Future)]
+    if not futures:
+        return combine([part for part in parts if isinstance(part, bytes)])
+    merged = asyncio.get_running_loop().create_future()
+
+    def merge(_: asyncio.Future[bytes]) -> None:
+        if not merged.done() and all(future.done() for future in futures):
+            merged.set_result(
+                combine(
+                    [
+                        part if isinstance(part, bytes) else part.result()
+                        for part in parts
+                    ]
+                )
+            )
+
+    for future in futures:
+        future.add_done_callback(merge)
+    return merged
+
+
+def _merge_arrays(key_shards: list[int]) -> Callable[[list[bytes]], bytes]:
+    # Interleaves the elements of each part's array reply back into the order
+    # of the keys they belong to. Parts are numbered by first appearance.
+    part_of_shard = {
+        shard: part for part, shard in enumerate(dict.fromkeys(key_shards))
+    }
+
+    def merge(replies: list[bytes]) -> bytes:
+        if any(reply[:1] != b"*" for reply in replies):
+            return _first_error(replies)
+        elements = [iter(_array_elements(reply)) for reply in replies]
+        return b"*%d\r\n%b" % (
+            len(key_shards),
+            b"".join([next(elements[part_of_shard[shard]]) for shard in key_shards]),
+        )
+
+    return merge
+
+
+def _array_elements(reply: bytes) -> list[bytes]:
+    header_end = reply.index(b"\r\n") + 2
+    elements, cursor = [], header_end
+    for _ in range(int(reply[1 : header_end - 2])):
+        _, size = extract_resp_data_and_size(reply, cursor)
+        elements.append(reply[cursor : cursor + size])
+        cursor += size
+    return elements
+
+
+def _concatenate_arrays(replies: list[bytes]) -> bytes:
+    if any(reply[:1] != b"*" for reply in replies):
+        return _first_error(replies)
+    elements = [element for reply in replies for element in _array_elements(reply)]
+    return b"*%d\r\n%b" % (len(elements), b"".join(elements))
+
+
+def _first_error(replies: list[bytes]) -> bytes:
+    return next((reply for reply in replies if reply[:1] == b"-"), replies[0])
+
+
+def _sum(replies: list[bytes]) -> bytes:
+    total = 0
+    for reply in replies:
+        if reply[:1] != b":":
+            return reply
+        total += int(reply[1:-2])
+    return shared_replies.integer(total)
@@ -0,0 +1,218 @@
+import mmap
+import os
+import struct
+import zlib
+from typing import BinaryIO, NamedTuple
+
+from pyredis.models.data_store import DataStore
+from pyredis.models.encoding import shared_integer
+from pyredis.models.entry import Entry
+from pyredis.models.hash import Hash
+from pyredis.models.quicklist import QuickList
+from pyredis.models.set import Set
+from pyredis.models.sorted_set import SortedSet
+
+_MAGIC = b"PYREDIS"
+_VERSION = 1
+
+_HEADER = struct.Struct("<7sHQQ")
+_RECORD = struct.Struct("<Bq")
+_LENGTH = struct.Struct("<I")
+_SCORE = struct.Struct("<d")
+_CHECKSUM = struct.Struct("<I")
+
+_STRING = 0
+_INTEGER = 1
+_LIST = 2
+_HASH = 3
+_SORTED_SET = 4
+_SET = 5
+_END = 0xFF
+
+_NO_EXPIRY = -1
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class SnapshotHeader(NamedTuple):
+    # Identifies the append only file the snapshot was taken against and how
+    # much of it the snapshot already covers.
+    aof_inode: int
+    aof_offset: int
+
+
+class _ChecksummedWriter:
+    def __init__(self, file: BinaryIO) -> None:
+        self._file = file
+        self._buffer = bytearray()
+        self._checksum = 0
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        if len(self._buffer) >= _WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self._checksum = zlib.crc32(self._buffer, self._checksum)
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.write(_CHECKSUM.pack(self._checksum))
+
+
+def write_snapshot(
+    filename: str, data_store: DataStore, header: SnapshotHeader
+) -> None:
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, mode="wb") as file:
+        writer = _ChecksummedWriter(file)
+        writer.write(_HEADER.pack(_MAGIC, _VERSION, *header))
+        for key, entry in data_store.items():
+            _write_entry(writer, key, entry)
+        writer.write(bytes([_END]))
+        writer.close()
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_filename, filename)
+
+
+def _write_entry(writer: _ChecksummedWriter, key: bytes, entry: Entry) -> None:
+    expiry = _NO_EXPIRY if entry.expiry is None else entry.expiry
+    if isinstance(entry.value, QuickList):
+        writer.write(_RECORD.pack(_LIST, expiry))
+        _write_bytes(writer, key)
+        writer.write(_LENGTH.pack(len(entry.value)))
+        for element in entry.value:
+            _write_bytes(writer, element)
+    elif isinstance(entry.value, Hash):
+        writer.write(_RECORD.pack(_HASH, expiry))
+        _write_bytes(writer, key)
+        writer.write(_LENGTH.pack(len(entry.value)))
+        for field, value in entry.value.items():
+            _write_bytes(writer, field)
+            _write_bytes(writer, value)
+    elif isinstance(entry.value, SortedSet):
+        writer.write(_RECORD.pack(_SORTED_SET, expiry))
+        _write_bytes(writer, key)
+        writer.write(_LENGTH.pack(len(entry.value)))
+        for member, score in entry.value.items():
+            _write_bytes(writer, member)
+            writer.write(_SCORE.pack(score))
+    elif isinstance(entry.value, Set):
+        writer.write(_RECORD.pack(_SET, expiry))
+        _write_bytes(writer, key)
+        writer.write(_LENGTH.pack(len(entry.value)))
+        for member in entry.value:
+            _write_bytes(writer, member)
+    elif isinstance(entry.value, int):
+        writer.write(_RECORD.pack(_INTEGER, expiry))
+        _write_bytes(writer, key)
+        _write_bytes(writer, str(entry.value).encode())
+    else:
+        writer.write(_RECORD.pack(_STRING, expiry))
+        _write_bytes(writer, key)
+        _write_bytes(writer, entry.value)
+
+
+def _write_bytes(writer: _ChecksummedWriter, data: bytes) -> None:
+    writer.write(_LENGTH.pack(len(data)))
+    writer.write(data)
+
+
+def read_snapshot_header(filename: str) -> SnapshotHeader | None:
+    try:
+        with open(filename, mode="rb") as file:
+            data = file.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(data) < _HEADER.size:
+        return None
+    magic, version, aof_inode, aof_offset = _HEADER.unpack(data)
+    if magic != _MAGIC or version != _VERSION:
+        return None
+    return SnapshotHeader(aof_inode, aof_offset)
+
+
+def load_snapshot(filename: str, data_store: DataStore) -> bool:
+    with open(filename, mode="rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            with memoryview(buffer) as view:
+                return _load_entries(view, data_store)
+
+
+def _load_entries(view: memoryview, data_store: DataStore) -> bool:
+    end = len(view) - _CHECKSUM.size
+    if end < _HEADER.size + 1:
+        return False
+    (checksum,) = _CHECKSUM.unpack_from(view, end)
+    if zlib.crc32(view[:end]) != checksum:
+        return False
+
+    offset = _HEADER.size
+    while view[offset] != _END:
+        value_type, expiry = _RECORD.unpack_from(view, offset)
+        key, offset = _read_bytes(view, offset + _RECORD.size)
+        value: bytes | int | QuickList | Hash | SortedSet | Set
+        if value_type == _LIST:
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            value = QuickList()
+            for _ in range(length):
+                element, offset = _read_bytes(view, offset)
+                value.append(element)
+        elif value_type == _HASH:
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            value = Hash()
+            for _ in range(length):
+                field, offset = _read_bytes(view, offset)
+                field_value, offset = _read_bytes(view, offset)
+                value.set(
+                    field,
+                    field_value,
+                    data_store.hash_max_listpack_entries,
+                    data_store.hash_max_listpack_value,
+                )
+        elif value_type == _SORTED_SET:
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            value = SortedSet()
+            for _ in range(length):
+                member, offset = _read_bytes(view, offset)
+                (score,) = _SCORE.unpack_from(view, offset)
+                offset += _SCORE.size
+                value.add(
+                    member,
+                    score,
+                    data_store.zset_max_listpack_entries,
+                    data_store.zset_max_listpack_value,
+                )
+        elif value_type == _SET:
+            (length,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            value = Set()
+            for _ in range(length):
+                member, offset = _read_bytes(view, offset)
+                value.add(member, data_store.set_max_intset_entries)
+        elif value_type == _INTEGER:
+            digits, offset = _read_bytes(view, offset)
+            value = shared_integer(int(digits))
+        elif value_type == _STRING:
+            value, offset = _read_bytes(view, offset)
+        else:
+            raise ValueError(f"unknown snapshot value type {value_type}")
+        data_store[key] = _to_entry(value, expiry)
+    return True
+
+
+def _read_bytes(view: memoryview, offset: int) -> tuple[bytes, int]:
+    (length,) = _LENGTH.unpack_from(view, offset)
+    start = offset + _LENGTH.size
+    return bytes(view[start : start + length]), start + length
+
+
+def _to_entry(
+    value: bytes | int | QuickList | Hash | SortedSet | Set, expiry: int
+) -> Entry:
+    return Entry(value, None if expiry == _NO_EXPIRY else expiry)
@@ -0,0 +1,336 @@
+import bisect
+import math
+import random
+import sys
+from typing import Iterator, NamedTuple
+
+ZSET_MAX_LISTPACK_ENTRIES = 128
+ZSET_MAX_LISTPACK_VALUE = 64
+
+# Same as Redis: each level holds about a quarter of the nodes of the one
+# below it, so lookups visit O(log n) nodes.
+_MAX_LEVEL = 32
+_LEVEL_PROBABILITY = 0.25
+_AVERAGE_LEVEL = 1 / (1 - _LEVEL_PROBABILITY)
+_POINTER_SIZE = 8
+
+
+class ScoreRange(NamedTuple):
+    min: float
+    max: float
+    min_exclusive: bool = False
+    max_exclusive: bool = False
+
+    def above_min(self, score: float) -> bool:
+        return score > self.min if self.min_exclusive else score >= self.min
+
+    def below_max(self, score: float) -> bool:
+        return score < self.max if self.max_exclusive else score <= self.max
+
+
+def parse_score(data: bytes) -> float | None:
+    # Accepts what Redis' strtod does, including "inf" and "-inf", but never
+    # NaN, which has no place in an ordering.
+    try:
+        score = float(data)
+    except ValueError:
+        return None
+    return None if math.isnan(score) else score
+
+
+def format_score(score: float) -> bytes:
+    # Like Redis, integral scores are shown without a fractional part and
+    # other ones with as many digits as it takes to read them back exactly.
+    if score.is_integer() and abs(score) < 2**53:
+        return b"%d" % score
+    if math.isinf(score):
+        return b"inf" if score > 0 else b"-inf"
+    return repr(score).encode()
+
+
+class _Node:
+    __slots__ = ("member", "score", "forward", "span")
+
+    def __init__(self, member: bytes, score: float, level: int) -> None:
+        self.member = member
+        self.score = score
+        self.forward: list[_Node | None] = [None] * level
+        # Number of level 0 steps each forward link skips, used for ranks.
+        self.span = [0] * level
+
+
+_NODE_SIZE = sys.getsizeof(_Node(b"", 0.0, 0)) + 2 * (
+    sys.getsizeof([]) + int(_AVERAGE_LEVEL * _POINTER_SIZE)
+)
+
+
+class _SkipList:
+    # Redis' zskiplist without the backward links, as ranges are only read
+    # in ascending order: members ordered by score, then by member, with the
+    # span of every link kept so ranks are found in O(log n) too.
+    __slots__ = ("_header", "_level", "_length")
+
+    def __init__(self) -> None:
+        self._header = _Node(b"", 0.0, _MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[_Node]:
+        node = self._header.forward[0]
+        while node is not None:
+            yield node
+            node = node.forward[0]
+
+    def insert(self, member: bytes, score: float) -> None:
+        update, rank = self._find_predecessors(member, score)
+        level = _random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i], update[i] = 0, self._header
+                self._header.span[i] = self._length
+            self._level = level
+        node = _Node(member, score, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def delete(self, member: bytes, score: float) -> bool:
+        update, _ = self._find_predecessors(member, score)
+        node = update[0].forward[0]
+        if node is None or node.member != member or node.score != score:
+            return False
+        for i in range(self._level):
+            if update[i].forward[i] is node:
+                update[i].span[i] += node.span[i] - 1
+                update[i].forward[i] = node.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._header.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+        return True
+
+    def rank(self, member: bytes, score: float) -> int:
+        # Returns the 0-based rank of a member known to be in the list.
+        node, traversed = self._header, 0
+        for i in range(self._level - 1, -1, -1):
+            while (next_node := node.forward[i]) is not None and (
+                next_node.score < score
+                or (next_node.score == score and next_node.member <= member)
+            ):
+                traversed += node.span[i]
+                node = next_node
+        return traversed - 1
+
+    def node_at(self, rank: int) -> _Node | None:
+        node, traversed = self._header, 0
+        for i in range(self._level - 1, -1, -1):
+            while (next_node := node.forward[i]) is not None and (
+                traversed + node.span[i] <= rank + 1
+            ):
+                traversed += node.span[i]
+                node = next_node
+        return node if traversed == rank + 1 else None
+
+    def first_in_range(self, score_range: ScoreRange) -> _Node | None:
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            while (
+                next_node := node.forward[i]
+            ) is not None and not score_range.above_min(next_node.score):
+                node = next_node
+        first = node.forward[0]
+        if first is None or not score_range.below_max(first.score):
+            return None
+        return first
+
+    def _find_predecessors(
+        self, member: bytes, score: float
+    ) -> tuple[list[_Node], list[int]]:
+        # The last node before (score, member) on each level, and its rank.
+        update, rank = [self._header] * _MAX_LEVEL, [0] * _MAX_LEVEL
+        node = self._header
+        for i in range(self._level - 1, -1, -1):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while (next_node := node.forward[i]) is not None and (
+                next_node.score < score
+                or (next_node.score == score and next_node.member < member)
+            ):
+                rank[i] += node.span[i]
+                node = next_node
+            update[i] = node
+        return update, rank
+
+
+def _random_level() -> int:
+    level = 1
+    while level < _MAX_LEVEL and random.random() < _LEVEL_PROBABILITY:
+        level += 1
+    return level
+
+
+class _SkipListDict:
+    # Redis' zset: the skiplist orders the members and the dict finds their
+    # scores.
+    __slots__ = ("scores", "skiplist")
+
+    def __init__(self) -> None:
+        self.scores: dict[bytes, float] = {}
+        self.skiplist = _SkipList()
+
+
+class SortedSet:
+    # Members ordered by score. Small sorted sets are a list of (score,
+    # member) pairs kept in order, like Redis' listpack encoding, which is
+    # searched by bisection. Past the limits they are given, they convert
+    # for good to a skiplist for ordered access and a dict from member to
+    # score, so both rank and score lookups stay fast.
+    __slots__ = ("_members",)
+
+    def __init__(self) -> None:
+        self._members: list[tuple[float, bytes]] | _SkipListDict = []
+
+    def __len__(self) -> int:
+        if isinstance(self._members, list):
+            return len(self._members)
+        return len(self._members.scores)
+
+    def __repr__(self) -> str:
+        return f"SortedSet({list(self.items())!r})"
+
+    @property
+    def compact(self) -> bool:
+        return isinstance(self._members, list)
+
+    @property
+    def encoding(self) -> str:
+        return "listpack" if self.compact else "skiplist"
+
+    def element_size(self, member: bytes) -> int:
+        # Estimated bytes one member and its score take up in the current
+        # encoding.
+        size = sys.getsizeof(member) + sys.getsizeof(0.0)
+        if isinstance(self._members, list):
+            return size + sys.getsizeof((0.0, member)) + _POINTER_SIZE
+        return size + _NODE_SIZE + 3 * _POINTER_SIZE
+
+    def items(self) -> Iterator[tuple[bytes, float]]:
+        if isinstance(self._members, list):
+            return ((member, score) for score, member in self._members)
+        return ((node.member, node.score) for node in self._members.skiplist)
+
+    def score(self, member: bytes) -> float | None:
+        if not isinstance(self._members, list):
+            return self._members.scores.get(member)
+        for score, pair_member in self._members:
+            if pair_member == member:
+                return score
+        return None
+
+    def add(
+        self, member: bytes, score: float, max_entries: int, max_value: int
+    ) -> bool:
+        # Adds a member or updates its score, converting to a skiplist first
+        # if the compact encoding would then hold more than max_entries
+        # members or one longer than max_value bytes. Returns whether the
+        # member is new.
+        previous = self.score(member)
+        if isinstance(self._members, list) and (
+            len(member) > max_value
+            or (previous is None and len(self._members) >= max_entries)
+        ):
+            self.convert()
+        if isinstance(self._members, list):
+            if previous is not None:
+                self._members.remove((previous, member))
+            bisect.insort(self._members, (score, member))
+            return previous is None
+        if previous == score:
+            return False
+        if previous is not None:
+            self._members.skiplist.delete(member, previous)
+        self._members.skiplist.insert(member, score)
+        self._members.scores[member] = score
+        return previous is None
+
+    def popmin(self) -> tuple[bytes, float]:
+        if isinstance(self._members, list):
+            if not self._members:
+                raise KeyError("popmin(): sorted set is empty")
+            score, member = self._members.pop(0)
+            return member, score
+        node = self._members.skiplist.node_at(0)
+        if node is None:
+            raise KeyError("popmin(): sorted set is empty")
+        self._members.skiplist.delete(node.member, node.score)
+        del self._members.scores[node.member]
+        return node.member, node.score
+
+    def rank(self, member: bytes) -> int | None:
+        score = self.score(member)
+        if score is None:
+            return None
+        if isinstance(self._members, list):
+            return bisect.bisect_left(self._members, (score, member))
+        return self._members.skiplist.rank(member, score)
+
+    def range(self, start: int, stop: int) -> list[tuple[bytes, float]]:
+        # Returns the members ranked from start up to, but excluding, stop,
+        # for 0 <= start and stop <= len(self).
+        if isinstance(self._members, list):
+            return [(member, score) for score, member in self._members[start:stop]]
+        items: list[tuple[bytes, float]] = []
+        node = self._members.skiplist.node_at(start) if start < stop else None
+        while node is not None and len(items) < stop - start:
+            items.append((node.member, node.score))
+            node = node.forward[0]
+        return items
+
+    def range_by_score(
+        self, score_range: ScoreRange, offset: int = 0, count: int = -1
+    ) -> list[tuple[bytes, float]]:
+        # Returns the members whose score is in the range, skipping the
+        # first `offset` of them and returning at most `count` if it is not
+        # negative.
+        items: list[tuple[bytes, float]] = []
+        if isinstance(self._members, list):
+            pairs = self._members
+            find = (
+                bisect.bisect_right if score_range.min_exclusive else bisect.bisect_left
+            )
+            index = find(pairs, score_range.min, key=lambda pair: pair[0]) + offset
+            while index < len(pairs) and len(items) != count:
+                score, member = pairs[index]
+                if not score_range.below_max(score):
+                    break
+                items.append((member, score))
+                index += 1
+            return items
+        node = self._members.skiplist.first_in_range(score_range)
+        while node is not None and offset > 0:
+            node, offset = node.forward[0], offset - 1
+        while (
+            node is not None
+            and score_range.below_max(node.score)
+            and len(items) != count
+        ):
+            items.append((node.member, node.score))
+            node = node.forward[0]
+        return items
+
+    def convert(self) -> None:
+        if not isinstance(self._members, list):
+            return
+        members = _SkipListDict()
+        for score, member in self._members:
+            members.skiplist.insert(member, score)
+            members.scores[member] = score
+        self._members = members
@@ -1,4 +1,6 @@
 import collections
+import mmap
+from typing import Callable
 
 from pyredis.models.resp.data_types.array import Array
 from pyredis.models.resp.data_types.bulk_string import BulkString
@@ -10,70 +12,210 @@ from pyredis.models.resp.data_types.integer import Integer
 TERMINATOR_SEQUENCE = b"\r\n"
 TERMINATOR_SIZE = len(TERMINATOR_SEQUENCE)
 
+_ARRAY = ord("*")
+_BULK_STRING = ord("$")
+
+Buffer = bytes | bytearray | mmap.mmap
+
+
+class ProtocolError(Exception):
+    pass
+
 
 def extract_resp_data_and_size(
-    payload: bytes,
+    payload: Buffer, start: int = 0
 ) -> tuple[RespDataType | None, int]:
-    terminator_start = payload.find(TERMINATOR_SEQUENCE)
-    if terminator_start == -1:
-        return None, 0
-    else:
-        data = payload[1:terminator_start].decode()
-        remainder = payload[terminator_start + TERMINATOR_SIZE :]
-        match chr(payload[0]):
-            case "+":
-                return SimpleString(data), terminator_start + TERMINATOR_SIZE
-            case "-":
-                return Error.from_string(data), terminator_start + TERMINATOR_SIZE
-            case ":":
-                return _parse_integer_and_size(data, terminator_start)
-            case "$":
-                return _parse_bulk_string_and_size(data, remainder, terminator_start)
-            case "*":
-                return _parse_array_and_size(data, remainder, terminator_start)
+    with memoryview(payload) as view:
+        data, end = _parse(payload, view, start)
+    if data is None:
         return None, 0
+    return data, end - start
 
 
-def _parse_integer_and_size(
-    data: str, terminator_start: int
-) -> tuple[Integer | None, int]:
-    integer = Integer.from_string(data)
-    return integer, terminator_start + TERMINATOR_SIZE
+def extract_command_arguments_and_size(
+    payload: Buffer, start: int = 0
+) -> tuple[list[bytes] | None, int]:
+    # Parses a command sent as an array of bulk strings straight into its
+    # arguments. Returns `(None, 0)` for an incomplete frame and raises
+    # ProtocolError for one that can never become valid.
+    with memoryview(payload) as view:
+        number_of_arguments, cursor = _parse_command_header(payload, start)
+        if number_of_arguments is None:
+            return None, 0
+        arguments = []
+        for _ in range(number_of_arguments):
+            argument, cursor = _parse_argument(payload, view, cursor)
+            if argument is None:
+                return None, 0
+            arguments.append(argument)
+        return arguments, cursor - start
 
 
-def _parse_bulk_string_and_size(
-    data: str, remainder: bytes, terminator_start: int
-) -> tuple[BulkString | None, int]:
+class CommandReader:
+    # Reads the commands a client sends as they arrive. A command split
+    # across reads is resumed after its last complete argument rather than
+    # parsed again, so a large pipelined command is read in linear time.
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        # The command being read starts at _start and continues at _cursor
+        # with its next argument, once its header gave _number_of_arguments.
+        self._start = self._cursor = 0
+        self._number_of_arguments: int | None = None
+        self._arguments: list[bytes] = []
+        self._last_command = slice(0)
+
+    def feed(self, data: bytes) -> None:
+        # Drops the commands read so far before buffering the new data.
+        if self._start:
+            del self._buffer[: self._start]
+            self._cursor -= self._start
+            self._start = 0
+        self._buffer.extend(data)
+
+    def read_command(self) -> list[bytes] | None:
+        # Returns the arguments of the next command, or None until the rest
+        # of it arrives; raises ProtocolError for input that is not a command.
+        buffer = self._buffer
+        if self._number_of_arguments is None:
+            if self._start >= len(buffer):
+                return None
+            self._number_of_arguments, self._cursor = _parse_command_header(
+                buffer, self._start
+            )
+            if self._number_of_arguments is None:
+                return None
+        arguments, cursor = self._arguments, self._cursor
+        with memoryview(buffer) as view:
+            while len(arguments) < self._number_of_arguments:
+                argument, cursor = _parse_argument(buffer, view, cursor)
+                if argument is None:
+                    self._cursor = cursor
+                    return None
+                arguments.append(argument)
+        self._last_command = slice(self._start, cursor)
+        self._start = self._cursor = cursor
+        self._number_of_arguments, self._arguments = None, []
+        return arguments
+
+    def last_command(self) -> bytes:
+        # The encoded form of the command read last.
+        return bytes(self._buffer[self._last_command])
+
+
+def _parse_command_header(payload: Buffer, start: int) -> tuple[int | None, int]:
+    if payload[start] != _ARRAY:
+        raise ProtocolError(f"expected '*', got {chr(payload[start])!r}")
+    terminator_start = payload.find(TERMINATOR_SEQUENCE, start)
+    if terminator_start == -1:
+        return None, start
+    return (
+        _parse_length(payload, start, terminator_start),
+        terminator_start + TERMINATOR_SIZE,
+    )
+
+
+def _parse_argument(
+    payload: Buffer, view: memoryview, cursor: int
+) -> tuple[bytes | None, int]:
+    if cursor >= len(payload):
+        return None, cursor
+    if payload[cursor] != _BULK_STRING:
+        raise ProtocolError(f"expected '$', got {chr(payload[cursor])!r}")
+    terminator_start = payload.find(TERMINATOR_SEQUENCE, cursor)
+    if terminator_start == -1:
+        return None, cursor
+    data_start = terminator_start + TERMINATOR_SIZE
+    data_end = data_start + _parse_length(payload, cursor, terminator_start)
+    if data_end + TERMINATOR_SIZE > len(payload):
+        return None, cursor
+    if payload[data_end : data_end + TERMINATOR_SIZE] != TERMINATOR_SEQUENCE:
+        raise ProtocolError("bulk string is longer than its length prefix")
+    return bytes(view[data_start:data_end]), data_end + TERMINATOR_SIZE
+
+
+def _parse_length(payload: Buffer, position: int, terminator_start: int) -> int:
     try:
-        length = int(data)
+        length = int(payload[position + 1 : terminator_start])
     except ValueError:
-        return None, 0
-    if length == -1:
-        return BulkString(None), 5
-    first_terminator_end = terminator_start + TERMINATOR_SIZE
-    second_terminator = remainder.find(TERMINATOR_SEQUENCE)
-    if second_terminator != -1 and length == second_terminator:
-        data = remainder[:second_terminator].decode()
-        size = first_terminator_end + second_terminator + TERMINATOR_SIZE
-        return BulkString(data), size
-    else:
-        return None, 0
+        raise ProtocolError("invalid length prefix")
+    if length < 0:
+        raise ProtocolError("invalid length prefix")
+    return length
+
+
+def _parse(
+    payload: Buffer, view: memoryview, position: int
+) -> tuple[RespDataType | None, int]:
+    # Returns `(None, position)` for an incomplete frame and raises
+    # ProtocolError for one that can never become valid.
+    if position >= len(payload):
+        return None, position
+    parser = _PARSERS.get(payload[position])
+    if parser is None:
+        raise ProtocolError(f"unknown type byte {chr(payload[position])!r}")
+    terminator_start = payload.find(TERMINATOR_SEQUENCE, position)
+    if terminator_start == -1:
+        return None, position
+    return parser(payload, view, position, terminator_start)
+
+
+def _parse_simple_string(
+    payload: Buffer, view: memoryview, position: int, terminator_start: int
+) -> tuple[SimpleString, int]:
+    data = payload[position + 1 : terminator_start].decode()
+    return SimpleString(data), terminator_start + TERMINATOR_SIZE
+
+
+def _parse_error(
+    payload: Buffer, view: memoryview, position: int, terminator_start: int
+) -> tuple[Error, int]:
+    data = payload[position + 1 : terminator_start].decode()
+    return Error.from_string(data), terminator_start + TERMINATOR_SIZE
+
 
+def _parse_integer(
+    payload: Buffer, view: memoryview, position: int, terminator_start: int
+) -> tuple[Integer, int]:
+    data = payload[position + 1 : terminator_start].decode()
+    return Integer.from_string(data), terminator_start + TERMINATOR_SIZE
 
-def _parse_array_and_size(
-    data: str, remainder: bytes, terminator_start: int
+
+def _parse_bulk_string(
+    payload: Buffer, view: memoryview, position: int, terminator_start: int
+) -> tuple[BulkString | None, int]:
+    data_start = terminator_start + TERMINATOR_SIZE
+    if payload[position + 1 : terminator_start] == b"-1":
+        return BulkString(None), data_start
+    data_end = data_start + _parse_length(payload, position, terminator_start)
+    if data_end + TERMINATOR_SIZE > len(payload):
+        return None, position
+    if payload[data_end : data_end + TERMINATOR_SIZE] != TERMINATOR_SEQUENCE:
+        raise ProtocolError("bulk string is longer than its length prefix")
+    return BulkString(bytes(view[data_start:data_end])), data_end + TERMINATOR_SIZE
+
+
+def _parse_array(
+    payload: Buffer, view: memoryview, position: int, terminator_start: int
 ) -> tuple[Array | None, int]:
-    try:
-        number_of_elements = int(data)
-    except ValueError:
-        return None, 0
-    if number_of_elements == -1:
-        return Array(None), 5
-    elements, size = collections.deque[RespDataType]([]), 0
+    cursor = terminator_start + TERMINATOR_SIZE
+    if payload[position + 1 : terminator_start] == b"-1":
+        return Array(None), cursor
+    number_of_elements = _parse_length(payload, position, terminator_start)
+    elements = collections.deque[RespDataType]()
     for _ in range(number_of_elements):
-        curr_element, curr_size = extract_resp_data_and_size(remainder[size:])
-        if curr_element is None:
-            return None, 0
-        elements.append(curr_element)
-        size += curr_size
-    return Array(elements), size + terminator_start + TERMINATOR_SIZE
+        element, cursor = _parse(payload, view, cursor)
+        if element is None:
+            return None, position
+        elements.append(element)
+    return Array(elements), cursor
+
+
+_PARSERS: dict[
+    int, Callable[[Buffer, memoryview, int, int], tuple[RespDataType | None, int]]
+] = {
+    ord("+"): _parse_simple_string,
+    ord("-"): _parse_error,
+    ord(":"): _parse_integer,
+    _BULK_STRING: _parse_bulk_string,
+    _ARRAY: _parse_array,
+}
@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import os
+from typing import Any
+
+from pyredis.append_only_loader import restore
+from pyredis.models.data_store import DataStore
+from pyredis.models.eviction import EvictionPolicy
+from pyredis.models.hash import HASH_MAX_LISTPACK_ENTRIES, HASH_MAX_LISTPACK_VALUE
+from pyredis.models.server_protocol import ServerProtocol
+from pyredis.models.set import SET_MAX_INTSET_ENTRIES
+from pyredis.models.sorted_set import ZSET_MAX_LISTPACK_ENTRIES, ZSET_MAX_LISTPACK_VALUE
+from pyredis.models.shard_router import (
+    ShardRouter,
+    connect_to_shards,
+    shard_socket_path,
+)
+from pyredis.models.append_only_persister import AppendOnlyPersister, FsyncPolicy
+
+DEFAULT_PORT = 6379
+DEFAULT_HOSTNAME = "127.0.0.1"
+DEFAULT_PERSISTENCE_FILE = "db.aof"
+DEFAULT_SNAPSHOT_FILE = "db.snapshot"
+DEFAULT_APPEND_FSYNC = FsyncPolicy.EVERYSEC
+DEFAULT_AUTO_AOF_REWRITE_PERCENTAGE = 100
+DEFAULT_AUTO_AOF_REWRITE_MIN_SIZE = 64 * 1024 * 1024
+DEFAULT_HZ = 10
+DEFAULT_ACTIVE_EXPIRE_BUDGET = 0.25
+DEFAULT_MAXMEMORY = 0
+DEFAULT_MAXMEMORY_POLICY = EvictionPolicy.NOEVICTION
+DEFAULT_MAXMEMORY_SAMPLES = 5
+DEFAULT_WORKERS = 1
+DEFAULT_HASH_MAX_LISTPACK_ENTRIES = HASH_MAX_LISTPACK_ENTRIES
+DEFAULT_HASH_MAX_LISTPACK_VALUE = HASH_MAX_LISTPACK_VALUE
+DEFAULT_ZSET_MAX_LISTPACK_ENTRIES = ZSET_MAX_LISTPACK_ENTRIES
+DEFAULT_ZSET_MAX_LISTPACK_VALUE = ZSET_MAX_LISTPACK_VALUE
+DEFAULT_SET_MAX_INTSET_ENTRIES = SET_MAX_INTSET_ENTRIES
+
+
+async def flush_expired_data(
+    data_store: DataStore, hz: int, active_expire_budget: float
+) -> None:
+    # Each cycle may spend up to `active_expire_budget` of its 1 / hz period
+    # removing keys whose expiry has passed.
+    while True:
+        data_store.flush_expired_data(active_expire_budget / hz)
+        await asyncio.sleep(1 / hz)
+
+
+async def rewrite_append_only_file(
+    persister: AppendOnlyPersister, data_store: DataStore
+) -> None:
+    while True:
+        if persister.should_rewrite():
+            persister.start_background_rewrite(data_store)
+        await asyncio.sleep(1)
+
+
+def run_shard(shard: int, arguments: dict[str, Any]) -> None:
+    asyncio.run(main(**arguments, shard=shard))
+
+
+async def run_shards(workers: int, arguments: dict[str, Any]) -> None:
+    # Workers are spawned rather than forked so they do not inherit this
+    # process' running event loop.
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_shard, args=(shard, arguments))
+        for shard in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    loop = asyncio.get_running_loop()
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+
+
+def shard_filename(filename: str, shard: int) -> str:
+    root, extension = os.path.splitext(filename)
+    return f"{root}-{shard}{extension}"
+
+
+def report_loading_progress(loaded: int, total: int) -> None:
+    print(f"Loading append only file: {loaded * 100 // total}%")
+
+
+async def main(
+    host: str = DEFAULT_HOSTNAME,
+    port: int = DEFAULT_PORT,
+    persistence_file: str = DEFAULT_PERSISTENCE_FILE,
+    snapshot_file: str = DEFAULT_SNAPSHOT_FILE,
+    append_fsync: FsyncPolicy = DEFAULT_APPEND_FSYNC,
+    auto_aof_rewrite_percentage: int = DEFAULT_AUTO_AOF_REWRITE_PERCENTAGE,
+    auto_aof_rewrite_min_size: int = DEFAULT_AUTO_AOF_REWRITE_MIN_SIZE,
+    hz: int = DEFAULT_HZ,
+    active_expire_budget: float = DEFAULT_ACTIVE_EXPIRE_BUDGET,
+    maxmemory: int = DEFAULT_MAXMEMORY,
+    maxmemory_policy: EvictionPolicy = DEFAULT_MAXMEMORY_POLICY,
+    maxmemory_samples: int = DEFAULT_MAXMEMORY_SAMPLES,
+    workers: int = DEFAULT_WORKERS,
+    hash_max_listpack_entries: int = DEFAULT_HASH_MAX_LISTPACK_ENTRIES,
+    hash_max_listpack_value: int = DEFAULT_HASH_MAX_LISTPACK_VALUE,
+    zset_max_listpack_entries: int = DEFAULT_ZSET_MAX_LISTPACK_ENTRIES,
+    zset_max_listpack_value: int = DEFAULT_ZSET_MAX_LISTPACK_VALUE,
+    set_max_intset_entries: int = DEFAULT_SET_MAX_INTSET_ENTRIES,
+    shard: int | None = None,
+) -> Any:
+    # With several workers, each one owns a hash-partitioned shard of the
+    # keyspace with its own AOF and snapshot, and all of them accept clients
+    # on the same port, forwarding commands to the shard owning their keys.
+    if workers > 1 and shard is None:
+        arguments = {name: value for name, value in locals().items() if name != "shard"}
+        await run_shards(workers, arguments)
+        return
+    if shard is not None:
+        persistence_file = shard_filename(persistence_file, shard)
+        snapshot_file = shard_filename(snapshot_file, shard)
+
+    print(f"Starting PyRedis on port: {port}")
+
+    loop = asyncio.get_running_loop()
+
+    data_store = DataStore(
+        maxmemory,
+        maxmemory_policy,
+        maxmemory_samples,
+        hash_max_listpack_entries,
+        hash_max_listpack_value,
+        zset_max_listpack_entries,
+        zset_max_listpack_value,
+        set_max_intset_entries,
+    )
+    if not restore(
+        persistence_file, snapshot_file, data_store, report_loading_progress
+    ):
+        return -1
+
+    persister = AppendOnlyPersister(
+        persistence_file,
+        append_fsync,
+        auto_aof_rewrite_percentage,
+        auto_aof_rewrite_min_size,
+        snapshot_file,
+    )
+
+    _ = loop.create_task(flush_expired_data(data_store, hz, active_expire_budget))
+    _ = loop.create_task(rewrite_append_only_file(persister, data_store))
+    if append_fsync is FsyncPolicy.EVERYSEC:
+        _ = loop.create_task(persister.fsync_every_second())
+
+    router = None
+    if shard is not None:
+        await loop.create_unix_server(
+            lambda: ServerProtocol(data_store, persister),
+            shard_socket_path(port, shard),
+        )
+        peers = await connect_to_shards(port, shard, workers)
+        router = ShardRouter(data_store, persister, peers)
+
+    server = await loop.create_server(
+        lambda: ServerProtocol(data_store, persister, router),
+        host,
+        port,
+        reuse_port=shard is not None,
+    )
+    async with server:
+        await server.serve_forever()
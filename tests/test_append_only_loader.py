@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from pyredis.append_only_loader import restore_from_file
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp.data_types.array import Array
+
+_COMMANDS = (
+    Array.tokenize("SET key value").encode()
+    + Array.tokenize("INCR counter").encode()
+    + Array.tokenize("RPUSH list a b c").encode()
+)
+
+
+def test_restore_from_missing_file(tmp_path: Path) -> None:
+    assert restore_from_file(str(tmp_path / "missing.aof"), DataStore())
+
+
+def test_restore_from_empty_file(tmp_path: Path) -> None:
+    filename = tmp_path / "test.aof"
+    filename.write_bytes(b"")
+    assert restore_from_file(str(filename), DataStore())
+
+
+def test_restore_from_file(tmp_path: Path) -> None:
+    filename, data_store = tmp_path / "test.aof", DataStore()
+    filename.write_bytes(_COMMANDS)
+    progress: list[tuple[int, int]] = []
+
+    assert restore_from_file(
+        str(filename), data_store, lambda *args: progress.append(args)
+    )
+
+    assert data_store[b"key"].value == b"value"
+    assert data_store[b"counter"].value == 1
+    assert list(data_store[b"list"].value) == [b"a", b"b", b"c"]
+    assert progress[-1] == (len(_COMMANDS), len(_COMMANDS))
+
+
+def test_restore_truncates_incomplete_trailing_command(tmp_path: Path) -> None:
+    filename, data_store = tmp_path / "test.aof", DataStore()
+    filename.write_bytes(_COMMANDS + b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$5\r\nval")
+
+    assert restore_from_file(str(filename), data_store)
+
+    assert filename.read_bytes() == _COMMANDS
+    assert data_store[b"key"].value == b"value"
+
+
+def test_restore_fails_on_corrupt_command(tmp_path: Path) -> None:
+    filename = tmp_path / "test.aof"
+    filename.write_bytes(b"*2\r\n$3\r\nGET\r\n:1\r\n" + _COMMANDS)
+    assert not restore_from_file(str(filename), DataStore())
+    assert filename.read_bytes() == b"*2\r\n$3\r\nGET\r\n:1\r\n" + _COMMANDS
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from pyredis.append_only_loader import restore_from_file
+from pyredis.command_handler import handle_command
+from pyredis.models import append_only_persister
+from pyredis.models.append_only_persister import AppendOnlyPersister, FsyncPolicy
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp.data_types.array import Array
+from pyredis.protocol_handler import extract_resp_data_and_size
+
+_SET_COMMAND = Array.tokenize("SET key value")
+_INCR_COMMAND = Array.tokenize("INCR counter")
+
+
+def test_log_command_without_event_loop_writes_immediately(tmp_path: Path) -> None:
+    filename = tmp_path / "test.aof"
+    persister = AppendOnlyPersister(str(filename))
+    persister.log_command(_SET_COMMAND)
+    assert filename.read_bytes() == _SET_COMMAND.encode()
+
+
+@pytest.mark.parametrize("fsync_policy", list(FsyncPolicy))
+def test_commands_logged_in_one_iteration_are_written_together(
+    tmp_path: Path, fsync_policy: FsyncPolicy
+) -> None:
+    filename = tmp_path / "test.aof"
+
+    async def log_commands() -> bytes:
+        persister = AppendOnlyPersister(str(filename), fsync_policy)
+        persister.log_command(_SET_COMMAND)
+        persister.log_command(_INCR_COMMAND)
+        written_before_yield = filename.read_bytes()
+        await asyncio.sleep(0)
+        return written_before_yield
+
+    assert asyncio.run(log_commands()) == b""
+    assert filename.read_bytes() == _SET_COMMAND.encode() + _INCR_COMMAND.encode()
+
+
+def _replay(payload: bytes) -> DataStore:
+    data_store, offset = DataStore(), 0
+    while offset < len(payload):
+        command, size = extract_resp_data_and_size(payload, offset)
+        assert isinstance(command, Array)
+        handle_command(command, data_store, None)
+        offset += size
+    return data_store
+
+
+def _execute(
+    command: str, data_store: DataStore, persister: AppendOnlyPersister
+) -> None:
+    handle_command(Array.tokenize(command), data_store, persister)
+
+
+def _populate(data_store: DataStore, persister: AppendOnlyPersister) -> None:
+    for _ in range(100):
+        _execute("INCR counter", data_store, persister)
+    _execute("SET deleted value", data_store, persister)
+    _execute("DEL deleted", data_store, persister)
+    _execute("SET expiring value PX 100000", data_store, persister)
+    _execute(
+        "RPUSH list " + " ".join(str(i) for i in range(100)), data_store, persister
+    )
+    for i in range(200):
+        _execute(f"HSET hash field{i} {i}", data_store, persister)
+        _execute(f"ZADD zset {i / 3} member{i}", data_store, persister)
+        _execute(f"SADD set {i}", data_store, persister)
+
+
+def _assert_restored(data_store: DataStore) -> None:
+    assert data_store[b"counter"].value == 100
+    assert b"deleted" not in data_store
+    assert data_store[b"expiring"].value == b"value"
+    assert data_store[b"expiring"].expiry is not None
+    assert list(data_store[b"list"].value) == [str(i).encode() for i in range(100)]
+    assert len(data_store[b"hash"].value) == 200
+    assert data_store[b"hash"].value.get(b"field199") == b"199"
+    assert set(data_store[b"set"].value) == {b"%d" % i for i in range(200)}
+    assert list(data_store[b"zset"].value.items()) == [
+        (b"member%d" % i, i / 3) for i in range(200)
+    ]
+
+
+def test_relative_expiries_are_logged_as_absolute(tmp_path: Path) -> None:
+    filename = tmp_path / "test.aof"
+    data_store, persister = DataStore(), AppendOnlyPersister(str(filename))
+    _execute("SET key abc PX 50", data_store, persister)
+    expiry = data_store[b"key"].expiry
+    time.sleep(0.1)
+    _execute("INCR key", data_store, persister)
+
+    assert filename.read_bytes() == (
+        Array.tokenize(f"SET key abc PXAT {expiry}").encode()
+        + Array.tokenize("INCR key").encode()
+    )
+    restored = DataStore()
+    assert restore_from_file(str(filename), restored)
+    assert restored[b"key"].value == 1 and restored[b"key"].expiry is None
+
+
+def test_rewrite_keeps_only_current_dataset(tmp_path: Path) -> None:
+    filename = tmp_path / "test.aof"
+    data_store, persister = DataStore(), AppendOnlyPersister(str(filename))
+    _populate(data_store, persister)
+    size_before_rewrite = filename.stat().st_size
+
+    persister.rewrite(data_store)
+
+    assert filename.stat().st_size < size_before_rewrite
+    _assert_restored(_replay(filename.read_bytes()))
+
+
+def test_background_rewrite_appends_commands_logged_meanwhile(tmp_path: Path) -> None:
+    filename = tmp_path / "test.aof"
+
+    async def rewrite() -> None:
+        data_store, persister = DataStore(), AppendOnlyPersister(str(filename))
+        _populate(data_store, persister)
+        assert persister.start_background_rewrite(data_store)
+        assert persister.rewrite_in_progress
+        assert not persister.start_background_rewrite(data_store)
+        _execute("SET written_during_rewrite value", data_store, persister)
+        while persister.rewrite_in_progress:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(rewrite())
+
+    data_store = _replay(filename.read_bytes())
+    _assert_restored(data_store)
+    assert data_store[b"written_during_rewrite"].value == b"value"
+
+
+def test_should_rewrite_after_growth(tmp_path: Path) -> None:
+    persister = AppendOnlyPersister(
+        str(tmp_path / "test.aof"), auto_rewrite_percentage=100, auto_rewrite_min_size=1
+    )
+    data_store = DataStore()
+    _execute("SET key value", data_store, persister)
+    assert persister.should_rewrite()
+    persister.rewrite(data_store)
+    assert not persister.should_rewrite()
+    _execute("SET key value", data_store, persister)
+    assert persister.should_rewrite()
+
+
+def test_fsync_failures_do_not_stop_the_everysec_task(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    synced: list[int] = []
+
+    def fsync(fd: int) -> None:
+        if not synced:
+            synced.append(-1)
+            raise OSError("fsync failed")
+        synced.append(fd)
+
+    monkeypatch.setattr(append_only_persister, "_FSYNC_INTERVAL", 0.01)
+    monkeypatch.setattr(os, "fsync", fsync)
+
+    async def run() -> bool:
+        persister = AppendOnlyPersister(str(tmp_path / "test.aof"))
+        task = asyncio.create_task(persister.fsync_every_second())
+        persister.log_command(_SET_COMMAND)
+        while len(synced) < 2:
+            await asyncio.sleep(0.01)
+        persister.rewrite(DataStore())
+        num_synced = len(synced)
+        persister.log_command(_SET_COMMAND)
+        while len(synced) == num_synced:
+            await asyncio.sleep(0.01)
+        running = not task.done()
+        task.cancel()
+        return running
+
+    assert asyncio.run(run())
@@ -1,11 +1,19 @@
+import asyncio
+import os
+import tempfile
 import time
 from datetime import datetime
+from pathlib import Path
 
 import pytest
 
-from pyredis.command_handler import handle_command
+from pyredis.append_only_loader import restore_from_file
+from pyredis.command_handler import COMMANDS, handle_command
 from pyredis.models.append_only_persister import AppendOnlyPersister
 from pyredis.models.data_store import DataStore
+from pyredis.models.entry import Entry
+from pyredis.models.eviction import EvictionPolicy
+from pyredis.models.memory import estimate_key_size, estimate_value_size
 from pyredis.models.resp.data_types.array import Array
 from pyredis.models.resp.data_types.bulk_string import BulkString
 from pyredis.models.resp.data_types.error import (
@@ -16,59 +24,66 @@ from pyredis.models.resp.data_types.error import (
 )
 from pyredis.models.resp.data_types.integer import Integer
 from pyredis.models.resp.data_types.simple_string import SimpleString
+from pyredis.models.resp.pending_reply import PendingReply
+from pyredis.models.resp.shared_replies import OUT_OF_MEMORY, encode_reply
 
 _DATA_STORE = DataStore()
-_PERSISTER = AppendOnlyPersister("test.aof")
+# Commands logged by tests that do not check the log go to a scratch directory.
+_SCRATCH_DIRECTORY = tempfile.mkdtemp()
+_PERSISTER = AppendOnlyPersister(
+    os.path.join(_SCRATCH_DIRECTORY, "test.aof"),
+    snapshot_filename=os.path.join(_SCRATCH_DIRECTORY, "test.snapshot"),
+)
 
 
 @pytest.mark.parametrize(
     "command, expected",
     [
         # PING Tests
-        (Array.from_list([BulkString("PING")]), SimpleString("PONG")),
+        (Array.from_list([BulkString(b"PING")]), SimpleString("PONG")),
         (
-            Array.from_list([BulkString("PING"), BulkString("Hello")]),
-            BulkString("Hello"),
+            Array.from_list([BulkString(b"PING"), BulkString(b"Hello")]),
+            BulkString(b"Hello"),
         ),
         # ECHO Tests
         (
-            Array.from_list([BulkString("ECHO")]),
+            Array.from_list([BulkString(b"ECHO")]),
             NumberOfArgumentsError("echo"),
         ),
         (
-            Array.from_list([BulkString("ECHO"), BulkString("Hello")]),
-            BulkString("Hello"),
+            Array.from_list([BulkString(b"ECHO"), BulkString(b"Hello")]),
+            BulkString(b"Hello"),
         ),
         (
             Array.from_list(
-                [BulkString("echo"), BulkString("Hello"), BulkString("World")]
+                [BulkString(b"echo"), BulkString(b"Hello"), BulkString(b"World")]
             ),
             NumberOfArgumentsError("echo"),
         ),
         # SET Tests
         (
-            Array.from_list([BulkString("SET")]),
+            Array.from_list([BulkString(b"SET")]),
             NumberOfArgumentsError("set"),
         ),
         (
-            Array.from_list([BulkString("set"), BulkString("key")]),
+            Array.from_list([BulkString(b"set"), BulkString(b"key")]),
             NumberOfArgumentsError("set"),
         ),
         (
             Array.from_list(
-                [BulkString("set"), BulkString("key"), BulkString("value")]
+                [BulkString(b"set"), BulkString(b"key"), BulkString(b"value")]
             ),
             SimpleString("OK"),
         ),
         (
             Array.from_list(
-                [BulkString("set"), BulkString("different_key"), BulkString("value")]
+                [BulkString(b"set"), BulkString(b"different_key"), BulkString(b"value")]
             ),
             SimpleString("OK"),
         ),
         (
             Array.from_list(
-                [BulkString("set"), BulkString("int_key_1"), BulkString("1")]
+                [BulkString(b"set"), BulkString(b"int_key_1"), BulkString(b"1")]
             ),
             SimpleString("OK"),
         ),
@@ -76,10 +91,10 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("EX"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"EX"),
                 ]
             ),
             NumberOfArgumentsError("set"),
@@ -87,11 +102,11 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("EX"),
-                    BulkString("10"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"EX"),
+                    BulkString(b"10"),
                 ]
             ),
             SimpleString("OK"),
@@ -100,10 +115,10 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("PX"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"PX"),
                 ]
             ),
             NumberOfArgumentsError("set"),
@@ -111,11 +126,11 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("PX"),
-                    BulkString("10"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"PX"),
+                    BulkString(b"10"),
                 ]
             ),
             SimpleString("OK"),
@@ -124,10 +139,10 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("EXAT"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"EXAT"),
                 ]
             ),
             NumberOfArgumentsError("set"),
@@ -135,11 +150,11 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("EXAT"),
-                    BulkString("1702701458"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"EXAT"),
+                    BulkString(b"1702701458"),
                 ]
             ),
             SimpleString("OK"),
@@ -148,10 +163,10 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("PXAT"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"PXAT"),
                 ]
             ),
             NumberOfArgumentsError("set"),
@@ -159,205 +174,207 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("set"),
-                    BulkString("expiring"),
-                    BulkString("value"),
-                    BulkString("PXAT"),
-                    BulkString("1702701491840"),
+                    BulkString(b"set"),
+                    BulkString(b"expiring"),
+                    BulkString(b"value"),
+                    BulkString(b"PXAT"),
+                    BulkString(b"1702701491840"),
                 ]
             ),
             SimpleString("OK"),
         ),
         # GET Tests
         (
-            Array.from_list([BulkString("GET")]),
+            Array.from_list([BulkString(b"GET")]),
             NumberOfArgumentsError("get"),
         ),
         (
             Array.from_list(
-                [BulkString("get"), BulkString("key"), BulkString("value")]
+                [BulkString(b"get"), BulkString(b"key"), BulkString(b"value")]
             ),
             NumberOfArgumentsError("get"),
         ),
         (
-            Array.from_list([BulkString("get"), BulkString("key")]),
-            BulkString("value"),
+            Array.from_list([BulkString(b"get"), BulkString(b"key")]),
+            BulkString(b"value"),
         ),
         (
-            Array.from_list([BulkString("get"), BulkString("int_key_1")]),
-            Integer(1),
+            Array.from_list([BulkString(b"get"), BulkString(b"int_key_1")]),
+            BulkString(b"1"),
         ),
         (
-            Array.from_list([BulkString("get"), BulkString("non-existent")]),
+            Array.from_list([BulkString(b"get"), BulkString(b"non-existent")]),
             BulkString(None),
         ),
         (
-            Array.from_list([BulkString("get"), BulkString("non-existent")]),
+            Array.from_list([BulkString(b"get"), BulkString(b"non-existent")]),
             BulkString(None),
         ),
         # EXISTS Tests
         (
-            Array.from_list([BulkString("EXISTS")]),
+            Array.from_list([BulkString(b"EXISTS")]),
             NumberOfArgumentsError("exists"),
         ),
         (
-            Array.from_list([BulkString("EXISTS"), BulkString("key")]),
+            Array.from_list([BulkString(b"EXISTS"), BulkString(b"key")]),
             Integer(1),
         ),
         (
-            Array.from_list([BulkString("exists"), BulkString("non-existent")]),
+            Array.from_list([BulkString(b"exists"), BulkString(b"non-existent")]),
             Integer(0),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("EXISTS"),
-                    BulkString("key"),
-                    BulkString("non-existent"),
-                    BulkString("different_key"),
+                    BulkString(b"EXISTS"),
+                    BulkString(b"key"),
+                    BulkString(b"non-existent"),
+                    BulkString(b"different_key"),
                 ]
             ),
             Integer(2),
         ),
         # INCR Tests
         (
-            Array.from_list([BulkString("INCR")]),
+            Array.from_list([BulkString(b"INCR")]),
             NumberOfArgumentsError("incr"),
         ),
         (
             Array.from_list(
-                [BulkString("INCR"), BulkString("key"), BulkString("value")]
+                [BulkString(b"INCR"), BulkString(b"key"), BulkString(b"value")]
             ),
             NumberOfArgumentsError("incr"),
         ),
         (
-            Array.from_list([BulkString("INCR"), BulkString("key")]),
+            Array.from_list([BulkString(b"INCR"), BulkString(b"key")]),
             NonIntOrOutOfRangeError(),
         ),
         (
-            Array.from_list([BulkString("incr"), BulkString("int_key_2")]),
+            Array.from_list([BulkString(b"incr"), BulkString(b"int_key_2")]),
             Integer(1),
         ),
         (
-            Array.from_list([BulkString("incr"), BulkString("int_key_1")]),
+            Array.from_list([BulkString(b"incr"), BulkString(b"int_key_1")]),
             Integer(2),
         ),
         # DECR Tests
         (
-            Array.from_list([BulkString("DECR")]),
+            Array.from_list([BulkString(b"DECR")]),
             NumberOfArgumentsError("decr"),
         ),
         (
             Array.from_list(
-                [BulkString("DECR"), BulkString("key"), BulkString("value")]
+                [BulkString(b"DECR"), BulkString(b"key"), BulkString(b"value")]
             ),
             NumberOfArgumentsError("decr"),
         ),
         (
-            Array.from_list([BulkString("decr"), BulkString("key")]),
+            Array.from_list([BulkString(b"decr"), BulkString(b"key")]),
             NonIntOrOutOfRangeError(),
         ),
         (
-            Array.from_list([BulkString("DECR"), BulkString("int_key_2")]),
+            Array.from_list([BulkString(b"DECR"), BulkString(b"int_key_2")]),
             Integer(0),
         ),
         (
-            Array.from_list([BulkString("DECR"), BulkString("int_key_2")]),
+            Array.from_list([BulkString(b"DECR"), BulkString(b"int_key_2")]),
             Integer(-1),
         ),
         (
-            Array.from_list([BulkString("decr"), BulkString("int_key_3")]),
+            Array.from_list([BulkString(b"decr"), BulkString(b"int_key_3")]),
             Integer(-1),
         ),
         # LPUSH Tests
         (
-            Array.from_list([BulkString("LPUSH")]),
+            Array.from_list([BulkString(b"LPUSH")]),
             NumberOfArgumentsError("lpush"),
         ),
         (
-            Array.from_list([BulkString("LPUSH"), BulkString("key")]),
+            Array.from_list([BulkString(b"LPUSH"), BulkString(b"key")]),
             NumberOfArgumentsError("lpush"),
         ),
         (
             Array.from_list(
-                [BulkString("lpush"), BulkString("list_1"), BulkString("value1")]
+                [BulkString(b"lpush"), BulkString(b"list_1"), BulkString(b"value1")]
             ),
             Integer(1),
         ),
         (
             Array.from_list(
-                [BulkString("lpush"), BulkString("list_1"), BulkString("value2")]
+                [BulkString(b"lpush"), BulkString(b"list_1"), BulkString(b"value2")]
             ),
             Integer(2),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("lpush"),
-                    BulkString("list_1"),
-                    BulkString("value3"),
-                    BulkString("value4"),
+                    BulkString(b"lpush"),
+                    BulkString(b"list_1"),
+                    BulkString(b"value3"),
+                    BulkString(b"value4"),
                 ]
             ),
             Integer(4),
         ),
         (
-            Array.from_list([BulkString("GET"), BulkString("list_1")]),
+            Array.from_list([BulkString(b"GET"), BulkString(b"list_1")]),
             WrongValueTypeError(),
         ),
         # RPUSH Tests
         (
-            Array.from_list([BulkString("RPUSH")]),
+            Array.from_list([BulkString(b"RPUSH")]),
             NumberOfArgumentsError("rpush"),
         ),
         (
-            Array.from_list([BulkString("rpush"), BulkString("key")]),
+            Array.from_list([BulkString(b"rpush"), BulkString(b"key")]),
             NumberOfArgumentsError("rpush"),
         ),
         (
             Array.from_list(
-                [BulkString("rpush"), BulkString("list_2"), BulkString("value1")]
+                [BulkString(b"rpush"), BulkString(b"list_2"), BulkString(b"value1")]
             ),
             Integer(1),
         ),
         (
             Array.from_list(
-                [BulkString("RPUSH"), BulkString("list_2"), BulkString("value2")]
+                [BulkString(b"RPUSH"), BulkString(b"list_2"), BulkString(b"value2")]
             ),
             Integer(2),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("RPUSH"),
-                    BulkString("list_2"),
-                    BulkString("value3"),
-                    BulkString("value4"),
+                    BulkString(b"RPUSH"),
+                    BulkString(b"list_2"),
+                    BulkString(b"value3"),
+                    BulkString(b"value4"),
                 ]
             ),
             Integer(4),
         ),
         # LRANGE Tests
         (
-            Array.from_list([BulkString("LRANGE")]),
+            Array.from_list([BulkString(b"LRANGE")]),
             NumberOfArgumentsError("lrange"),
         ),
         (
-            Array.from_list([BulkString("LRANGE"), BulkString("key")]),
+            Array.from_list([BulkString(b"LRANGE"), BulkString(b"key")]),
             NumberOfArgumentsError("lrange"),
         ),
         (
-            Array.from_list([BulkString("LRANGE"), BulkString("key"), BulkString("0")]),
+            Array.from_list(
+                [BulkString(b"LRANGE"), BulkString(b"key"), BulkString(b"0")]
+            ),
             NumberOfArgumentsError("lrange"),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("key"),
-                    BulkString("0"),
-                    BulkString("-1"),
-                    BulkString("0"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"key"),
+                    BulkString(b"0"),
+                    BulkString(b"-1"),
+                    BulkString(b"0"),
                 ]
             ),
             NumberOfArgumentsError("lrange"),
@@ -365,10 +382,10 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("key"),
-                    BulkString("0"),
-                    BulkString("-1"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"key"),
+                    BulkString(b"0"),
+                    BulkString(b"-1"),
                 ]
             ),
             WrongValueTypeError(),
@@ -376,112 +393,116 @@ _PERSISTER = AppendOnlyPersister("test.aof")
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("list_1"),
-                    BulkString("0"),
-                    BulkString("-1"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_1"),
+                    BulkString(b"0"),
+                    BulkString(b"-1"),
                 ]
             ),
             Array.from_list(
                 [
-                    BulkString("value4"),
-                    BulkString("value3"),
-                    BulkString("value2"),
-                    BulkString("value1"),
+                    BulkString(b"value4"),
+                    BulkString(b"value3"),
+                    BulkString(b"value2"),
+                    BulkString(b"value1"),
                 ]
             ),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("list_2"),
-                    BulkString("0"),
-                    BulkString("-1"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_2"),
+                    BulkString(b"0"),
+                    BulkString(b"-1"),
                 ]
             ),
             Array.from_list(
                 [
-                    BulkString("value1"),
-                    BulkString("value2"),
-                    BulkString("value3"),
-                    BulkString("value4"),
+                    BulkString(b"value1"),
+                    BulkString(b"value2"),
+                    BulkString(b"value3"),
+                    BulkString(b"value4"),
                 ]
             ),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("list_1"),
-                    BulkString("1"),
-                    BulkString("3"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_1"),
+                    BulkString(b"1"),
+                    BulkString(b"3"),
                 ]
             ),
             Array.from_list(
-                [BulkString("value3"), BulkString("value2"), BulkString("value1")]
+                [BulkString(b"value3"), BulkString(b"value2"), BulkString(b"value1")]
             ),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("list_1"),
-                    BulkString("-1"),
-                    BulkString("4"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_1"),
+                    BulkString(b"-1"),
+                    BulkString(b"4"),
                 ]
             ),
+            Array.from_list([BulkString(b"value1")]),
+        ),
+        (
             Array.from_list(
                 [
-                    BulkString("value4"),
-                    BulkString("value3"),
-                    BulkString("value2"),
-                    BulkString("value1"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_1"),
+                    BulkString(b"-3"),
+                    BulkString(b"-2"),
                 ]
             ),
+            Array.from_list([BulkString(b"value3"), BulkString(b"value2")]),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("list_1"),
-                    BulkString("0"),
-                    BulkString("0"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_1"),
+                    BulkString(b"0"),
+                    BulkString(b"0"),
                 ]
             ),
-            Array.from_list([BulkString("value4")]),
+            Array.from_list([BulkString(b"value4")]),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("LRANGE"),
-                    BulkString("list_1"),
-                    BulkString("3"),
-                    BulkString("0"),
+                    BulkString(b"LRANGE"),
+                    BulkString(b"list_1"),
+                    BulkString(b"3"),
+                    BulkString(b"0"),
                 ]
             ),
             Array.from_list([]),
         ),
         # DEL Tests
         (
-            Array.from_list([BulkString("DEL")]),
+            Array.from_list([BulkString(b"DEL")]),
             NumberOfArgumentsError("del"),
         ),
         (
-            Array.from_list([BulkString("DEL"), BulkString("key")]),
+            Array.from_list([BulkString(b"DEL"), BulkString(b"key")]),
             Integer(1),
         ),
         (
-            Array.from_list([BulkString("DEL"), BulkString("non-existent")]),
+            Array.from_list([BulkString(b"DEL"), BulkString(b"non-existent")]),
             Integer(0),
         ),
         (
             Array.from_list(
                 [
-                    BulkString("DEL"),
-                    BulkString("different_key"),
-                    BulkString("non-existent"),
-                    BulkString("int_key_1"),
+                    BulkString(b"DEL"),
+                    BulkString(b"different_key"),
+                    BulkString(b"non-existent"),
+                    BulkString(b"int_key_1"),
                 ]
             ),
             Integer(2),
@@ -492,7 +513,7 @@ def test_handle_command(
     command: Array, expected: SimpleString | Error | BulkString
 ) -> None:
     result = handle_command(command, _DATA_STORE, _PERSISTER)
-    assert result == expected
+    assert encode_reply(result) == expected.encode()
 
 
 @pytest.mark.parametrize(
@@ -508,29 +529,620 @@ def test_expiry(option: str, expiry: str) -> None:
         expiry = str(time.mktime(curr_time.timetuple()) * 1000 + 1000)
     set_command = Array.from_list(
         [
-            BulkString("set"),
-            BulkString("key"),
-            BulkString("value"),
-            BulkString(option),
-            BulkString(expiry),
+            BulkString(b"set"),
+            BulkString(b"key"),
+            BulkString(b"value"),
+            BulkString(option.encode()),
+            BulkString(expiry.encode()),
         ]
     )
     result = handle_command(set_command, _DATA_STORE, _PERSISTER)
-    assert result == SimpleString("OK")
+    assert encode_reply(result) == SimpleString("OK").encode()
     get_command = Array.from_list(
         [
-            BulkString("get"),
-            BulkString("key"),
+            BulkString(b"get"),
+            BulkString(b"key"),
         ]
     )
     result = handle_command(get_command, _DATA_STORE, _PERSISTER)
-    assert result == BulkString("value")
+    assert encode_reply(result) == BulkString(b"value").encode()
     time.sleep(1)
     get_command = Array.from_list(
         [
-            BulkString("get"),
-            BulkString("key"),
+            BulkString(b"get"),
+            BulkString(b"key"),
         ]
     )
     result = handle_command(get_command, _DATA_STORE, _PERSISTER)
-    assert result == BulkString(None)
+    assert encode_reply(result) == BulkString(None).encode()
+
+
+@pytest.mark.parametrize(
+    "option, expiry",
+    [
+        ("EX", "nan"),
+        ("PX", "inf"),
+        ("EXAT", "-inf"),
+        ("EX", "1e400"),
+        ("PXAT", "99999999999999999999"),
+        ("PXAT", str(2**63)),
+        ("EX", str(2**60)),
+    ],
+)
+def test_set_rejects_invalid_expiry(option: str, expiry: str) -> None:
+    command = Array.tokenize(f"SET key value {option} {expiry}")
+    result = handle_command(command, _DATA_STORE, _PERSISTER)
+    assert encode_reply(result) == b"-ERR invalid expire time in 'set' command\r\n"
+
+
+def test_binary_values() -> None:
+    value = b"\x00\xff\r\n\xc3\xa9"
+    set_command = Array.from_list(
+        [BulkString(b"set"), BulkString(b"\xde\xad"), BulkString(value)]
+    )
+    result = handle_command(set_command, _DATA_STORE, _PERSISTER)
+    assert encode_reply(result) == SimpleString("OK").encode()
+    get_command = Array.from_list([BulkString(b"get"), BulkString(b"\xde\xad")])
+    result = handle_command(get_command, _DATA_STORE, _PERSISTER)
+    assert encode_reply(result) == BulkString(value).encode()
+
+
+@pytest.mark.parametrize(
+    "arguments, expected",
+    [
+        ([b"GET", b"key"], [b"key"]),
+        ([b"SET", b"key", b"value", b"EX", b"10"], [b"key"]),
+        ([b"DEL", b"key_1", b"key_2", b"key_3"], [b"key_1", b"key_2", b"key_3"]),
+        ([b"PING"], []),
+        ([b"MEMORY", b"USAGE", b"key"], [b"key"]),
+        ([b"MEMORY", b"STATS"], []),
+        ([b"OBJECT", b"HELP"], []),
+    ],
+)
+def test_command_keys(arguments: list[bytes], expected: list[bytes]) -> None:
+    assert COMMANDS[arguments[0]].keys(arguments) == expected
+
+
+def test_handle_command_does_not_mutate_command() -> None:
+    command = Array.from_list([BulkString(b"SET"), BulkString(b"k"), BulkString(b"v")])
+    handle_command(command, _DATA_STORE, _PERSISTER)
+    assert command == Array.from_list(
+        [BulkString(b"SET"), BulkString(b"k"), BulkString(b"v")]
+    )
+
+
+def test_write_commands_over_maxmemory() -> None:
+    data_store = DataStore(maxmemory=1)
+    data_store[b"key"] = Entry(b"value", None)
+    set_command = Array.tokenize("SET other value")
+
+    result = handle_command(set_command, data_store, None)
+    assert encode_reply(result) == OUT_OF_MEMORY
+    result = handle_command(Array.tokenize("DEL key"), data_store, None)
+    assert encode_reply(result) == Integer(1).encode()
+
+
+def test_evicted_keys_are_logged(tmp_path: Path) -> None:
+    filename = str(tmp_path / "test.aof")
+    data_store = DataStore(maxmemory_policy=EvictionPolicy.ALLKEYS_LRU)
+    persister = AppendOnlyPersister(filename)
+    handle_command(Array.tokenize("SET evicted value"), data_store, persister)
+    data_store[b"evicted"].access -= 1000
+    data_store.maxmemory = data_store.used_memory
+    handle_command(Array.tokenize("SET kept value"), data_store, persister)
+
+    result = handle_command(Array.tokenize("INCR counter"), data_store, persister)
+    assert encode_reply(result) == Integer(1).encode()
+
+    restored = DataStore()
+    assert restore_from_file(filename, restored)
+    assert [key for key, _ in restored.items()] == [b"kept", b"counter"]
+
+
+def test_memory_usage_and_stats() -> None:
+    data_store = DataStore()
+    handle_command(Array.tokenize("SET string value"), data_store, None)
+    handle_command(Array.tokenize("RPUSH list a b c"), data_store, None)
+    string_size = data_store[b"string"].size
+
+    result = handle_command(Array.tokenize("MEMORY USAGE string"), data_store, None)
+    assert encode_reply(result) == Integer(string_size).encode()
+    result = handle_command(Array.tokenize("MEMORY USAGE missing"), data_store, None)
+    assert encode_reply(result) == BulkString(None).encode()
+    for command, expected in [
+        ("MEMORY USAGE string SAMPLES 5", Integer(string_size).encode()),
+        ("MEMORY USAGE string BOGUS 5", b"-ERR syntax error\r\n"),
+        ("MEMORY USAGE string SAMPLES x", NonIntOrOutOfRangeError().encode()),
+    ]:
+        result = handle_command(Array.tokenize(command), data_store, None)
+        assert encode_reply(result) == expected
+
+    handle_command(Array.tokenize("RPUSH list d"), data_store, None)
+    handle_command(Array.tokenize("DEL string"), data_store, None)
+    result = handle_command(Array.tokenize("MEMORY STATS"), data_store, None)
+    assert isinstance(result, Array)
+    elements = list(result)
+    stats = {
+        str(name): value.underlying()
+        for name, value in zip(elements[::2], elements[1::2])
+    }
+    assert stats["keys.count"] == 1
+    assert stats["total.allocated"] == data_store.used_memory
+    assert stats["peak.allocated"] > data_store.used_memory
+    assert stats["dataset.string.bytes"] == 0
+    assert stats["dataset.list.bytes"] > 0
+
+
+@pytest.mark.parametrize(
+    "start, command, result",
+    [("9999", "INCR", "10000"), ("10000", "DECR", "9999")],
+)
+def test_increment_keeps_memory_usage_up_to_date(
+    start: str, command: str, result: str
+) -> None:
+    data_store, fresh = DataStore(), DataStore()
+    handle_command(Array.tokenize(f"SET counter {start}"), data_store, None)
+    handle_command(Array.tokenize(f"{command} counter"), data_store, None)
+    handle_command(Array.tokenize(f"SET counter {result}"), fresh, None)
+
+    assert data_store[b"counter"].value == fresh[b"counter"].value
+    assert data_store[b"counter"].size == fresh[b"counter"].size
+    assert data_store.used_memory == fresh.used_memory
+
+
+def test_info_memory() -> None:
+    data_store = DataStore(maxmemory=1024)
+    handle_command(Array.tokenize("SET key value"), data_store, None)
+
+    result = handle_command(Array.tokenize("INFO memory"), data_store, None)
+
+    assert isinstance(result, BulkString) and result.data is not None
+    lines = result.data.decode().split("\r\n")
+    assert lines[0] == "# Memory"
+    assert f"used_memory:{data_store.used_memory}" in lines
+    assert "maxmemory_human:1.00K" in lines
+    assert "maxmemory_policy:noeviction" in lines
+    result = handle_command(Array.tokenize("INFO keyspace"), data_store, None)
+    assert encode_reply(result) == BulkString(b"").encode()
+
+
+@pytest.mark.parametrize("flush", ["FLUSHALL", "FLUSHDB ASYNC", "FLUSHALL SYNC"])
+def test_unlink_and_flush(flush: str) -> None:
+    data_store = DataStore()
+    items = " ".join(str(i) for i in range(1000))
+    handle_command(Array.tokenize(f"RPUSH big {items}"), data_store, None)
+    handle_command(Array.tokenize(f"RPUSH other {items}"), data_store, None)
+    handle_command(Array.tokenize("SET small value"), data_store, None)
+
+    result = handle_command(Array.tokenize("UNLINK big missing"), data_store, None)
+    assert encode_reply(result) == Integer(1).encode()
+    assert b"big" not in data_store
+
+    result = handle_command(Array.tokenize(flush), data_store, None)
+    assert encode_reply(result) == SimpleString("OK").encode()
+    assert len(data_store) == 0 and data_store.used_memory == 0
+
+
+def test_flush_rejects_unknown_mode() -> None:
+    result = handle_command(Array.tokenize("FLUSHALL LATER"), DataStore(), None)
+    assert encode_reply(result) == Error("ERR", "syntax error").encode()
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (
+            ["LINDEX list 1", "LINDEX list -1", "LINDEX list 5"],
+            [b"$1\r\nb\r\n", b"$1\r\nc\r\n", b"$-1\r\n"],
+        ),
+        (
+            ["LSET list -2 x", "LRANGE list 0 -1"],
+            [b"+OK\r\n", b"*3\r\n$1\r\na\r\n$1\r\nx\r\n$1\r\nc\r\n"],
+        ),
+        (
+            ["LSET list 3 x", "LSET missing 0 x"],
+            [b"-ERR index out of range\r\n", b"-ERR no such key\r\n"],
+        ),
+        (
+            ["LTRIM list 1 -1", "LRANGE list 0 -1"],
+            [b"+OK\r\n", b"*2\r\n$1\r\nb\r\n$1\r\nc\r\n"],
+        ),
+        (["LTRIM list 2 1", "EXISTS list"], [b"+OK\r\n", b":0\r\n"]),
+        (["LRANGE list -100 100"], [b"*3\r\n$1\r\na\r\n$1\r\nb\r\n$1\r\nc\r\n"]),
+    ],
+)
+def test_list_commands(commands: list[str], expected: list[bytes]) -> None:
+    data_store = DataStore()
+    handle_command(Array.tokenize("RPUSH list a b c"), data_store, None)
+
+    results = [
+        handle_command(Array.tokenize(command), data_store, None)
+        for command in commands
+    ]
+
+    assert [encode_reply(result) for result in results] == expected
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (["SET key 10", "OBJECT ENCODING key"], b"$3\r\nint\r\n"),
+        (["SET key 010", "OBJECT ENCODING key"], b"$6\r\nembstr\r\n"),
+        ([f"SET key {'x' * 45}", "OBJECT ENCODING key"], b"$3\r\nraw\r\n"),
+        (["RPUSH key a", "OBJECT ENCODING key"], b"$9\r\nquicklist\r\n"),
+        (["OBJECT ENCODING missing"], b"$-1\r\n"),
+        (["SET key 010", "INCR key"], NonIntOrOutOfRangeError().encode()),
+        (
+            ["SET key 9223372036854775807", "INCR key"],
+            b"-ERR increment or decrement would overflow\r\n",
+        ),
+    ],
+)
+def test_value_encodings(commands: list[str], expected: bytes) -> None:
+    data_store = DataStore()
+    for command in commands:
+        result = handle_command(Array.tokenize(command), data_store, None)
+    assert encode_reply(result) == expected
+
+
+@pytest.mark.parametrize(
+    "command, expected",
+    [
+        ("SCAN 0", b"*2\r\n$1\r\n0\r\n*3\r\n$2\r\nk1\r\n$2\r\nk2\r\n$1\r\nl\r\n"),
+        ("SCAN 0 MATCH k*", b"*2\r\n$1\r\n0\r\n*2\r\n$2\r\nk1\r\n$2\r\nk2\r\n"),
+        ("SCAN 0 TYPE list COUNT 5", b"*2\r\n$1\r\n0\r\n*1\r\n$1\r\nl\r\n"),
+        ("SCAN 7", b"*2\r\n$1\r\n0\r\n*0\r\n"),
+        ("SCAN -1", b"-ERR invalid cursor\r\n"),
+        ("SCAN 0 COUNT 0", b"-ERR syntax error\r\n"),
+        ("SCAN 0 MATCH", b"-ERR syntax error\r\n"),
+        ("KEYS k?", b"*2\r\n$2\r\nk1\r\n$2\r\nk2\r\n"),
+        ("KEYS k[^1]", b"*1\r\n$2\r\nk2\r\n"),
+        ("KEYS k\\?", b"*0\r\n"),
+        ("SCAN 0 MATCH [^k]*", b"*2\r\n$1\r\n0\r\n*1\r\n$1\r\nl\r\n"),
+    ],
+)
+def test_scan_and_keys(command: str, expected: bytes) -> None:
+    data_store = DataStore()
+    for setup in ["SET k1 a", "SET k2 b", "RPUSH l c"]:
+        handle_command(Array.tokenize(setup), data_store, None)
+
+    result = handle_command(Array.tokenize(command), data_store, None)
+
+    assert encode_reply(result) == expected
+
+
+def test_keys_yields_to_the_event_loop_between_batches() -> None:
+    async def run() -> tuple[bool, bytes]:
+        data_store = DataStore()
+        for i in range(2500):
+            data_store[b"%04d" % i] = Entry(b"value", None)
+        result = handle_command(Array.tokenize("KEYS *"), data_store, None)
+        assert isinstance(result, PendingReply)
+        done_after_first_batch = result.future.done()
+        return done_after_first_batch, await result.future
+
+    done_after_first_batch, reply = asyncio.run(run())
+
+    assert not done_after_first_batch
+    assert reply.startswith(b"*2500\r\n$4\r\n0000\r\n")
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (
+            ["MSET a 1 b two", "MGET a missing b list"],
+            b"*4\r\n$1\r\n1\r\n$-1\r\n$3\r\ntwo\r\n$-1\r\n",
+        ),
+        (["MSET a 1 b"], NumberOfArgumentsError("mset").encode()),
+        (["MSETNX a 1 b 2", "MGET a b"], b"*2\r\n$1\r\n1\r\n$1\r\n2\r\n"),
+        (["MSETNX a 1 list 2", "EXISTS a"], b":0\r\n"),
+        (["MSET a 1 a 2", "GET a"], b"$1\r\n2\r\n"),
+        (["INCR a", "GET a"], b"$1\r\n1\r\n"),
+        (["INCR a", "MGET a"], b"*1\r\n$1\r\n1\r\n"),
+    ],
+)
+def test_batch_commands(commands: list[str], expected: bytes) -> None:
+    data_store = DataStore()
+    handle_command(Array.tokenize("RPUSH list x"), data_store, None)
+    for command in commands:
+        result = handle_command(Array.tokenize(command), data_store, None)
+    assert encode_reply(result) == expected
+
+
+def test_batch_commands_are_logged_once(tmp_path: Path) -> None:
+    persister = AppendOnlyPersister(str(tmp_path / "batch.aof"))
+    handle_command(Array.tokenize("MSET a 1 b 2 c 3"), DataStore(), persister)
+    persister.flush()
+
+    with open(tmp_path / "batch.aof", "rb") as file:
+        assert file.read().count(b"*7\r\n") == 1
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (["HSET hash a 1 b 2", "HSET hash b 3 c 4"], b":1\r\n"),
+        (["HSET hash a 1 b"], NumberOfArgumentsError("hset").encode()),
+        (["HSET hash a 1", "HGET hash a"], b"$1\r\n1\r\n"),
+        (["HGET hash a"], b"$-1\r\n"),
+        (
+            ["HSET hash a 1 b 2", "HMGET hash b x a"],
+            b"*3\r\n$1\r\n2\r\n$-1\r\n$1\r\n1\r\n",
+        ),
+        (["HMGET hash a"], b"*1\r\n$-1\r\n"),
+        (
+            ["HSET hash a 1 b 2", "HGETALL hash"],
+            b"*4\r\n$1\r\na\r\n$1\r\n1\r\n$1\r\nb\r\n$1\r\n2\r\n",
+        ),
+        (["HGETALL hash"], b"*0\r\n"),
+        (["HINCRBY hash n 5", "HINCRBY hash n -7"], b":-2\r\n"),
+        (
+            ["HSET hash n x", "HINCRBY hash n 1"],
+            b"-ERR hash value is not an integer\r\n",
+        ),
+        (["HINCRBY hash n x"], NonIntOrOutOfRangeError().encode()),
+        (
+            ["HSET hash n 9223372036854775807", "HINCRBY hash n 1"],
+            b"-ERR increment or decrement would overflow\r\n",
+        ),
+        (["HSET hash a 1", "OBJECT ENCODING hash"], b"$8\r\nlistpack\r\n"),
+        (
+            [f"HSET hash a {'x' * 65}", "OBJECT ENCODING hash"],
+            b"$9\r\nhashtable\r\n",
+        ),
+        (["SET string a", "HGET string a"], WrongValueTypeError().encode()),
+        (["HSET hash a 1", "GET hash"], WrongValueTypeError().encode()),
+        (["HSET hash a 1", "INCR hash"], WrongValueTypeError().encode()),
+        (["HSET hash a 1", "LPUSH hash a"], WrongValueTypeError().encode()),
+    ],
+)
+def test_hash_commands(commands: list[str], expected: bytes) -> None:
+    data_store = DataStore()
+    for command in commands:
+        result = handle_command(Array.tokenize(command), data_store, None)
+    assert encode_reply(result) == expected
+
+
+def test_hash_memory_is_remeasured_on_conversion() -> None:
+    data_store = DataStore(hash_max_listpack_entries=19)
+    for i in range(20):
+        handle_command(Array.tokenize(f"HSET hash f{i} {i}"), data_store, None)
+    handle_command(Array.tokenize("HSET hash f0 updated"), data_store, None)
+
+    entry = data_store[b"hash"]
+    assert not entry.value.compact
+    assert entry.size == estimate_key_size(b"hash") + estimate_value_size(entry.value)
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (["ZADD zset 1 a 2 b", "ZADD zset 3 b 4 c"], b":1\r\n"),
+        (["ZADD zset 1 a", "ZADD zset CH 3 a 4 c"], b":2\r\n"),
+        (["ZADD zset 1 a", "ZADD zset NX 3 a"], b":0\r\n"),
+        (["ZADD zset XX 3 a", "EXISTS zset"], b":0\r\n"),
+        (["ZADD zset 5 a", "ZADD zset GT 3 a", "ZSCORE zset a"], b"$1\r\n5\r\n"),
+        (["ZADD zset 5 a", "ZADD zset LT 3 a", "ZSCORE zset a"], b"$1\r\n3\r\n"),
+        (["ZADD zset INCR 2.5 a", "ZADD zset INCR 1 a"], b"$3\r\n3.5\r\n"),
+        (
+            ["ZADD zset NX XX 1 a"],
+            b"-ERR XX and NX options at the same time are not compatible\r\n",
+        ),
+        (
+            ["ZADD zset INCR 1 a 2 b"],
+            b"-ERR INCR option supports a single increment-element pair\r\n",
+        ),
+        (["ZADD zset 1 a 2"], b"-ERR syntax error\r\n"),
+        (["ZADD zset x a"], b"-ERR value is not a valid float\r\n"),
+        (["ZINCRBY zset 2 a", "ZINCRBY zset -0.5 a"], b"$3\r\n1.5\r\n"),
+        (
+            ["ZADD zset inf a", "ZINCRBY zset -inf a"],
+            b"-ERR resulting score is not a number (NaN)\r\n",
+        ),
+        (
+            ["ZADD zset 3 c 1 a 2 b", "ZRANGE zset 0 -1"],
+            b"*3\r\n$1\r\na\r\n$1\r\nb\r\n$1\r\nc\r\n",
+        ),
+        (
+            ["ZADD zset 3 c 1 a 2 b", "ZRANGE zset -2 -1 WITHSCORES"],
+            b"*4\r\n$1\r\nb\r\n$1\r\n2\r\n$1\r\nc\r\n$1\r\n3\r\n",
+        ),
+        (["ZRANGE zset 0 -1"], b"*0\r\n"),
+        (
+            ["ZADD zset 3 c 1 a 2 b", "ZRANGEBYSCORE zset (1 +inf"],
+            b"*2\r\n$1\r\nb\r\n$1\r\nc\r\n",
+        ),
+        (
+            ["ZADD zset 3 c 1 a 2 b", "ZRANGEBYSCORE zset -inf 2 WITHSCORES LIMIT 1 5"],
+            b"*2\r\n$1\r\nb\r\n$1\r\n2\r\n",
+        ),
+        (
+            [
+                "ZADD zset 3 c 1 a 2 b",
+                "ZRANGEBYSCORE zset -inf +inf LIMIT 0 2 WITHSCORES",
+            ],
+            b"*4\r\n$1\r\na\r\n$1\r\n1\r\n$1\r\nb\r\n$1\r\n2\r\n",
+        ),
+        (["ZADD zset 1 a", "ZRANGEBYSCORE zset 0 1 LIMIT 0"], b"-ERR syntax error\r\n"),
+        (["ZADD zset 1 a", "ZRANGEBYSCORE zset 0 1 BOGUS"], b"-ERR syntax error\r\n"),
+        (["ZRANGEBYSCORE zset x 2"], b"-ERR min or max is not a float\r\n"),
+        (["ZADD zset 3 c 1 a 2 b", "ZRANK zset c"], b":2\r\n"),
+        (["ZADD zset 1 a", "ZRANK zset x"], b"$-1\r\n"),
+        (["ZADD zset 1 a 2 b", "ZCARD zset"], b":2\r\n"),
+        (["ZADD zset 1 a", "OBJECT ENCODING zset"], b"$8\r\nlistpack\r\n"),
+        ([f"ZADD zset 1 {'x' * 65}", "OBJECT ENCODING zset"], b"$8\r\nskiplist\r\n"),
+        (["SET string a", "ZADD string 1 a"], WrongValueTypeError().encode()),
+        (["ZADD zset 1 a", "ZRANGE zset 0 -1 LIMIT"], b"-ERR syntax error\r\n"),
+    ],
+)
+def test_sorted_set_commands(commands: list[str], expected: bytes) -> None:
+    data_store = DataStore()
+    for command in commands:
+        result = handle_command(Array.tokenize(command), data_store, None)
+    assert encode_reply(result) == expected
+
+
+def test_sorted_set_memory_is_remeasured_on_conversion() -> None:
+    data_store = DataStore(zset_max_listpack_entries=19)
+    for i in range(20):
+        handle_command(Array.tokenize(f"ZADD zset {i} m{i}"), data_store, None)
+    handle_command(Array.tokenize("ZADD zset 100 m0"), data_store, None)
+
+    entry = data_store[b"zset"]
+    assert not entry.value.compact
+    assert entry.size == estimate_key_size(b"zset") + estimate_value_size(entry.value)
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (["SADD set 1 2", "SADD set 2 3 3"], b":1\r\n"),
+        (["SADD set 1 2 a", "SREM set 2 x a"], b":2\r\n"),
+        (["SADD set 1", "SREM set 1", "EXISTS set"], b":0\r\n"),
+        (["SADD set 1 a", "SISMEMBER set a"], b":1\r\n"),
+        (["SADD set 1", "SISMEMBER set 2"], b":0\r\n"),
+        (
+            ["SADD set 3 1 2", "SMEMBERS set"],
+            b"*3\r\n$1\r\n1\r\n$1\r\n2\r\n$1\r\n3\r\n",
+        ),
+        (["SMEMBERS set"], b"*0\r\n"),
+        (["SADD set 1 2 3", "SCARD set"], b":3\r\n"),
+        (
+            ["SADD a 1 2 3", "SADD b 3 2 9", "SINTER a b"],
+            b"*2\r\n$1\r\n2\r\n$1\r\n3\r\n",
+        ),
+        (["SADD a 1 2 3", "SINTER a missing"], b"*0\r\n"),
+        (["SADD a 1 2 3", "SADD b 2 3", "SDIFF a b missing"], b"*1\r\n$1\r\n1\r\n"),
+        (["SADD b 1", "SDIFF missing b"], b"*0\r\n"),
+        (["SADD a 1", "SADD b 1", "SUNION a b missing"], b"*1\r\n$1\r\n1\r\n"),
+        (["SADD set 1", "OBJECT ENCODING set"], b"$6\r\nintset\r\n"),
+        (["SADD set a", "OBJECT ENCODING set"], b"$9\r\nhashtable\r\n"),
+        (["SET string a", "SADD string 1"], WrongValueTypeError().encode()),
+        (
+            ["SET string a", "SADD a 1", "SINTER a string"],
+            WrongValueTypeError().encode(),
+        ),
+        (["SADD set 1", "INCR set"], WrongValueTypeError().encode()),
+    ],
+)
+def test_set_commands(commands: list[str], expected: bytes) -> None:
+    data_store = DataStore()
+    for command in commands:
+        result = handle_command(Array.tokenize(command), data_store, None)
+    assert encode_reply(result) == expected
+
+
+def test_set_memory_is_remeasured_on_conversion() -> None:
+    data_store = DataStore()
+    handle_command(Array.tokenize("SADD set 1 2 3"), data_store, None)
+    handle_command(Array.tokenize("SADD set a"), data_store, None)
+
+    entry = data_store[b"set"]
+    assert not entry.value.intset
+    assert entry.size == estimate_key_size(b"set") + estimate_value_size(entry.value)
+
+
+@pytest.mark.parametrize(
+    "commands, expected",
+    [
+        (["RPUSH l a b c", "LPOP l"], b"$1\r\na\r\n"),
+        (["RPUSH l a b c", "RPOP l"], b"$1\r\nc\r\n"),
+        (["RPUSH l a", "LPOP l", "EXISTS l"], b":0\r\n"),
+        (["LPOP l"], b"$-1\r\n"),
+        (["SET s x", "RPOP s"], WrongValueTypeError().encode()),
+        (
+            ["RPUSH l a b", "LMOVE l m RIGHT LEFT", "LRANGE m 0 -1"],
+            b"*1\r\n$1\r\nb\r\n",
+        ),
+        (
+            ["RPUSH l a b", "LMOVE l l LEFT RIGHT", "LRANGE l 0 -1"],
+            b"*2\r\n$1\r\nb\r\n$1\r\na\r\n",
+        ),
+        (["RPUSH l a", "LMOVE l l LEFT RIGHT", "LRANGE l 0 -1"], b"*1\r\n$1\r\na\r\n"),
+        (
+            ["RPUSH l a", "SET s x", "LMOVE l s LEFT LEFT"],
+            WrongValueTypeError().encode(),
+        ),
+        (
+            ["RPUSH l a", "SET s x", "LMOVE l s LEFT LEFT", "LRANGE l 0 -1"],
+            b"*1\r\n$1\r\na\r\n",
+        ),
+        (["RPUSH l a", "LMOVE l m UP LEFT"], b"-ERR syntax error\r\n"),
+        (["RPUSH l a", "BLPOP missing l 0"], b"*2\r\n$1\r\nl\r\n$1\r\na\r\n"),
+        (["RPUSH l a b", "BRPOP l 0"], b"*2\r\n$1\r\nl\r\n$1\r\nb\r\n"),
+        (["BLPOP l 0"], b"*-1\r\n"),
+        (["BLPOP l -1"], b"-ERR timeout is negative\r\n"),
+        (["BLPOP l x"], b"-ERR timeout is not a float or out of range\r\n"),
+        (["SET s x", "BLPOP s 0"], WrongValueTypeError().encode()),
+        (["RPUSH l a b", "BLMOVE l m RIGHT LEFT 0"], b"$1\r\nb\r\n"),
+        (["BLMOVE l m LEFT LEFT 1"], b"$-1\r\n"),
+    ],
+)
+def test_list_pops(commands: list[str], expected: bytes) -> None:
+    data_store = DataStore()
+    for command in commands:
+        result = handle_command(Array.tokenize(command), data_store, None)
+    assert encode_reply(result) == expected
+
+
+def test_pushes_wake_the_clients_they_can_serve_in_order() -> None:
+    async def run() -> None:
+        data_store = DataStore()
+        first, second, third = [
+            handle_command(Array.tokenize(command), data_store, None)
+            for command in ["BLPOP a b 0", "BRPOP b 0", "BLPOP b 0"]
+        ]
+        assert isinstance(first, PendingReply) and isinstance(second, PendingReply)
+        assert isinstance(third, PendingReply)
+
+        reply = handle_command(Array.tokenize("RPUSH b x y"), data_store, None)
+
+        assert reply == b":2\r\n"
+        assert first.future.result() == b"*2\r\n$1\r\nb\r\n$1\r\nx\r\n"
+        assert second.future.result() == b"*2\r\n$1\r\nb\r\n$1\r\ny\r\n"
+        assert not third.future.done() and b"b" not in data_store
+        assert len(data_store.blocked_clients) == 1
+        third.future.cancel()
+        await asyncio.sleep(0)
+        assert len(data_store.blocked_clients) == 0
+
+    asyncio.run(run())
+
+
+def test_blocked_clients_time_out() -> None:
+    async def run() -> bytes:
+        data_store = DataStore()
+        result = handle_command(Array.tokenize("BLPOP l 0.01"), data_store, None)
+        assert isinstance(result, PendingReply)
+        reply = await result.future
+        assert len(data_store.blocked_clients) == 0
+        return reply
+
+    assert asyncio.run(run()) == b"*-1\r\n"
+
+
+def test_served_blocked_clients_are_logged(tmp_path: Path) -> None:
+    filename = str(tmp_path / "blocking.aof")
+    persister = AppendOnlyPersister(filename)
+
+    async def run() -> list[bytes]:
+        data_store = DataStore()
+        commands = ["BLMOVE src dst RIGHT LEFT 0", "BLPOP dst 0", "RPUSH src x y"]
+        replies = [
+            handle_command(Array.tokenize(command), data_store, persister)
+            for command in commands
+        ]
+        return [encode_reply(reply) for reply in replies]
+
+    assert asyncio.run(run()) == [
+        b"$1\r\ny\r\n",
+        b"*2\r\n$3\r\ndst\r\n$1\r\ny\r\n",
+        b":2\r\n",
+    ]
+    persister.flush()
+    restored = DataStore()
+    assert restore_from_file(filename, restored)
+    assert [key for key, _ in restored.items()] == [b"src"]
+    result = handle_command(Array.tokenize("LRANGE src 0 -1"), restored, None)
+    assert encode_reply(result) == b"*1\r\n$1\r\nx\r\n"
@@ -0,0 +1,174 @@
+import asyncio
+import time
+
+import pytest
+
+from pyredis.models import clock
+from pyredis.models.data_store import DataStore
+from pyredis.models.entry import Entry
+from pyredis.models.eviction import EvictionPolicy
+
+_PAST = int(time.time() * 1000) - 1000
+_FUTURE = int(time.time() * 1000) + 3600 * 1000
+
+
+def test_flush_expired_data_removes_only_due_keys() -> None:
+    data_store = DataStore()
+    data_store[b"persistent"] = Entry(b"value", None)
+    data_store[b"expired"] = Entry(b"value", _PAST)
+    data_store[b"volatile"] = Entry(b"value", _FUTURE)
+
+    assert data_store.flush_expired_data(1) == 1
+
+    assert list(key for key, _ in data_store.items()) == [b"persistent", b"volatile"]
+    assert data_store.flush_expired_data(1) == 0
+
+
+def test_flush_expired_data_skips_keys_whose_expiry_changed() -> None:
+    data_store = DataStore()
+    data_store[b"extended"] = Entry(b"value", _PAST)
+    data_store[b"extended"] = Entry(b"value", _FUTURE)
+    data_store[b"persisted"] = Entry(b"value", _PAST)
+    data_store[b"persisted"] = Entry(b"value", None)
+    data_store[b"deleted"] = Entry(b"value", _PAST)
+    del data_store[b"deleted"]
+
+    assert data_store.flush_expired_data(1) == 0
+
+    assert b"extended" in data_store
+    assert b"persisted" in data_store
+
+
+def test_flush_expired_data_respects_time_budget() -> None:
+    data_store = DataStore()
+    for i in range(1000):
+        data_store[str(i).encode()] = Entry(b"value", _PAST)
+
+    assert data_store.flush_expired_data(0) < 1000
+    assert data_store.flush_expired_data(1) > 0
+    assert list(data_store.items()) == []
+
+
+def test_clock_is_cached_per_event_loop_iteration() -> None:
+    async def read_clock() -> tuple[int, int, int]:
+        first = clock.now_ms()
+        time.sleep(0.01)
+        same_iteration = clock.now_ms()
+        await asyncio.sleep(0)
+        return first, same_iteration, clock.now_ms()
+
+    first, same_iteration, next_iteration = asyncio.run(read_clock())
+    assert first == same_iteration
+    assert next_iteration >= first + 10
+
+
+def test_lookup_and_delete() -> None:
+    data_store = DataStore()
+    data_store[b"key"] = Entry(b"value", None)
+    data_store[b"expired"] = Entry(b"value", _PAST)
+
+    assert data_store.lookup(b"key") == Entry(b"value", None)
+    assert data_store.lookup(b"missing") is None
+    assert data_store.lookup(b"expired") is None
+    assert list(data_store.items()) == [(b"key", Entry(b"value", None))]
+
+    data_store[b"expired"] = Entry(b"value", _PAST)
+    assert data_store.delete(b"key")
+    assert not data_store.delete(b"key")
+    assert not data_store.delete(b"expired")
+    assert data_store.flush_expired_data(1) == 0
+
+
+def test_scan_returns_keys_present_throughout_exactly_once() -> None:
+    data_store = DataStore()
+    for i in range(1000):
+        data_store[b"key%d" % i] = Entry(b"value", None)
+
+    seen: list[bytes] = []
+    cursor, items = data_store.scan(0, 100)
+    seen += [key for key, _ in items]
+    for i in range(0, 1000, 2):
+        data_store.delete(b"key%d" % i)
+    for i in range(1000, 1500):
+        data_store[b"key%d" % i] = Entry(b"value", None)
+    while cursor:
+        cursor, items = data_store.scan(cursor, 100)
+        seen += [key for key, _ in items]
+
+    assert len(seen) == len(set(seen))
+    assert {b"key%d" % i for i in range(1, 1000, 2)} <= set(seen)
+    data_store[b"expired"] = Entry(b"value", _PAST)
+    assert b"expired" not in [key for key, _ in data_store.scan(0, 10_000)[1]]
+
+
+def test_memory_usage_is_tracked_incrementally() -> None:
+    data_store = DataStore()
+    data_store[b"first"] = Entry(b"value", None)
+    data_store[b"second"] = Entry(b"value", _FUTURE)
+    used_memory = data_store.used_memory
+
+    data_store[b"first"] = Entry(b"a much longer value", None)
+    assert data_store.used_memory > used_memory
+
+    assert data_store.delete(b"first")
+    del data_store[b"second"]
+    assert data_store.used_memory == 0
+
+
+@pytest.mark.parametrize(
+    "policy, evicted",
+    [
+        (EvictionPolicy.ALLKEYS_LRU, b"idle"),
+        (EvictionPolicy.VOLATILE_LRU, b"volatile_idle"),
+        (EvictionPolicy.VOLATILE_TTL, b"volatile_busy"),
+    ],
+)
+def test_evict_picks_candidates_by_policy(
+    policy: EvictionPolicy, evicted: bytes
+) -> None:
+    data_store = DataStore(maxmemory_policy=policy, maxmemory_samples=64)
+    data_store[b"idle"] = Entry(b"value", None)
+    data_store[b"volatile_idle"] = Entry(b"value", _FUTURE + 1000)
+    data_store[b"volatile_busy"] = Entry(b"value", _FUTURE)
+    data_store[b"busy"] = Entry(b"value", None)
+    for idle_time, key in enumerate([b"busy", b"volatile_busy", b"volatile_idle"]):
+        data_store._data[key].access += 1000 * (3 - idle_time)
+    data_store.maxmemory = data_store.used_memory - 1
+
+    assert data_store.evict() == [evicted]
+    assert not data_store.over_maxmemory()
+
+
+def test_lfu_eviction_keeps_frequently_used_keys() -> None:
+    data_store = DataStore(
+        maxmemory_policy=EvictionPolicy.ALLKEYS_LFU, maxmemory_samples=64
+    )
+    for key in [b"rare", b"frequent", b"accessed_once"]:
+        data_store[key] = Entry(b"value", None)
+    data_store.lookup(b"accessed_once")
+    for _ in range(100):
+        data_store.lookup(b"frequent")
+    data_store.maxmemory = data_store.used_memory - 1
+
+    assert data_store.evict() == [b"rare"]
+
+
+@pytest.mark.parametrize(
+    "policy", [EvictionPolicy.ALLKEYS_RANDOM, EvictionPolicy.VOLATILE_RANDOM]
+)
+def test_random_eviction_frees_memory(policy: EvictionPolicy) -> None:
+    data_store = DataStore(maxmemory_policy=policy)
+    for i in range(100):
+        data_store[b"%03d" % i] = Entry(b"value", _FUTURE)
+    data_store.maxmemory = data_store.used_memory // 2
+
+    assert len(data_store.evict()) == 50
+    assert not data_store.over_maxmemory()
+
+
+def test_noeviction_keeps_keys() -> None:
+    data_store = DataStore(maxmemory=1)
+    data_store[b"key"] = Entry(b"value", None)
+
+    assert data_store.evict() == []
+    assert data_store.over_maxmemory()
@@ -0,0 +1,44 @@
+import pytest
+
+from pyredis.models.encoding import encode_string, object_encoding, parse_int
+from pyredis.models.quicklist import QuickList
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (b"0", 0),
+        (b"-42", -42),
+        (b"9223372036854775807", 2**63 - 1),
+        (b"-9223372036854775808", -(2**63)),
+        (b"9223372036854775808", None),
+        (b"007", None),
+        (b"+1", None),
+        (b" 1", None),
+        (b"1 ", None),
+        (b"1_000", None),
+        (b"-0", None),
+        (b"", None),
+        (b"value", None),
+    ],
+)
+def test_parse_int(value: bytes, expected: int | None) -> None:
+    assert parse_int(value) == expected
+
+
+def test_small_integers_are_shared() -> None:
+    assert encode_string(b"1234") is encode_string(b"1234")
+    assert encode_string(b"123456") == 123456
+
+
+@pytest.mark.parametrize(
+    "value, encoding",
+    [
+        (1, "int"),
+        (b"x" * 44, "embstr"),
+        (b"x" * 45, "raw"),
+        (QuickList([b"a"]), "quicklist"),
+    ],
+)
+def test_object_encoding(value: int | bytes | QuickList, encoding: str) -> None:
+    assert object_encoding(value) == encoding
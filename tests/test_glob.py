@@ -0,0 +1,38 @@
+import pytest
+
+from pyredis.models.glob import compile_glob
+
+
+@pytest.mark.parametrize(
+    "pattern, string, matches",
+    [
+        (b"*", b"", True),
+        (b"h*o", b"hello", True),
+        (b"h*o", b"hell", False),
+        (b"h?llo", b"hallo", True),
+        (b"h?llo", b"hllo", False),
+        (b"h[ae]llo", b"hello", True),
+        (b"h[ae]llo", b"hillo", False),
+        (b"h[^e]llo", b"hallo", True),
+        (b"h[^e]llo", b"hello", False),
+        (b"h[a-b]llo", b"hbllo", True),
+        (b"h[b-a]llo", b"hbllo", True),
+        (b"h[a-b]llo", b"hcllo", False),
+        (b"h[^a-b]llo", b"hcllo", True),
+        (b"h\\*llo", b"h*llo", True),
+        (b"h\\*llo", b"hello", False),
+        (b"h\\?llo", b"hello", False),
+        (b"h[\\]]llo", b"h]llo", True),
+        (b"h[\\^]llo", b"h^llo", True),
+        (b"h[\\^]llo", b"hello", False),
+        (b"[]", b"a", False),
+        (b"[^]", b"a", True),
+        (b"h[el", b"he", True),
+        (b"back\\", b"back\\", True),
+        (b"a.b", b"axb", False),
+        (b"a*", b"a\nb", True),
+        (b"\xff*", b"\xff\x00", True),
+    ],
+)
+def test_redis_glob_rules(pattern: bytes, string: bytes, matches: bool) -> None:
+    assert (compile_glob(pattern)(string) is not None) == matches
@@ -0,0 +1,53 @@
+import pytest
+
+from pyredis.models.hash import Hash
+
+_MAX_ENTRIES, _MAX_VALUE = 4, 8
+
+
+def _fill(count: int) -> Hash:
+    hash_ = Hash()
+    for i in range(count):
+        hash_.set(b"f%d" % i, b"v%d" % i, _MAX_ENTRIES, _MAX_VALUE)
+    return hash_
+
+
+@pytest.mark.parametrize("count, compact", [(0, True), (4, True), (5, False)])
+def test_converts_past_max_entries(count: int, compact: bool) -> None:
+    hash_ = _fill(count)
+
+    assert hash_.compact == compact
+    assert len(hash_) == count
+    assert dict(hash_.items()) == {b"f%d" % i: b"v%d" % i for i in range(count)}
+
+
+@pytest.mark.parametrize("field, value", [(b"f" * 9, b"v"), (b"f", b"v" * 9)])
+def test_converts_on_long_field_or_value(field: bytes, value: bytes) -> None:
+    hash_ = _fill(2)
+
+    assert hash_.set(field, value, _MAX_ENTRIES, _MAX_VALUE)
+
+    assert not hash_.compact
+    assert hash_.get(field) == value and hash_.get(b"f1") == b"v1"
+
+
+def test_fields_are_not_matched_against_values() -> None:
+    hash_ = Hash()
+    hash_.set(b"a", b"b", _MAX_ENTRIES, _MAX_VALUE)
+
+    assert hash_.get(b"b") is None
+    assert hash_.set(b"b", b"a", _MAX_ENTRIES, _MAX_VALUE)
+    assert not hash_.set(b"b", b"c", _MAX_ENTRIES, _MAX_VALUE)
+    assert dict(hash_.items()) == {b"a": b"b", b"b": b"c"}
+
+
+@pytest.mark.parametrize("count", [3, 6])
+def test_popitem_empties_the_hash(count: int) -> None:
+    hash_ = _fill(count)
+
+    popped = dict(hash_.popitem() for _ in range(count))
+
+    assert popped == {b"f%d" % i: b"v%d" % i for i in range(count)}
+    assert len(hash_) == 0
+    with pytest.raises(KeyError):
+        hash_.popitem()
@@ -0,0 +1,32 @@
+import time
+
+from pyredis.models import lazy_free
+from pyredis.models.entry import Entry
+from pyredis.models.hash import Hash
+from pyredis.models.quicklist import QuickList
+from pyredis.models.set import Set
+from pyredis.models.sorted_set import SortedSet
+
+
+def test_large_values_are_freed_in_the_background() -> None:
+    large_list = QuickList(b"%d" % i for i in range(100_000))
+    large_hash, large_sorted_set, large_set = Hash(), SortedSet(), Set()
+    for i in range(100_000):
+        large_hash.set(b"%d" % i, b"value", 128, 64)
+        large_sorted_set.add(b"%d" % i, i, 128, 64)
+        large_set.add(b"%d" % i, 512)
+    large_dict = {b"key": Entry(QuickList(b"%d" % i for i in range(100_000)), None)}
+
+    lazy_free.free(large_list)
+    lazy_free.free(large_hash)
+    lazy_free.free(large_sorted_set)
+    lazy_free.free(large_set)
+    lazy_free.free(large_dict)
+    lazy_free.free(QuickList([b"small"]))
+
+    deadline = time.monotonic() + 5
+    while lazy_free.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert lazy_free.pending() == 0
+    assert not large_list and not large_hash and not large_dict
+    assert not large_sorted_set and not large_set
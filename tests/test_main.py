@@ -0,0 +1,118 @@
+import asyncio
+import inspect
+import os
+import signal
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+import typer
+from typer.testing import CliRunner
+
+from pyredis import __main__, server
+from pyredis.models.append_only_persister import FsyncPolicy
+from pyredis.models.eviction import EvictionPolicy
+from pyredis.models.resp.data_types.array import Array
+
+
+def test_cli_passes_its_options_to_main(monkeypatch: pytest.MonkeyPatch) -> None:
+    arguments: dict[str, Any] = {}
+
+    async def main(**kwargs: Any) -> None:
+        arguments.update(kwargs)
+
+    monkeypatch.setattr(__main__, "main", main)
+    app = typer.Typer()
+    app.command()(__main__.cli)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--workers",
+            "4",
+            "--port",
+            "7000",
+            "--append-fsync",
+            "always",
+            "--maxmemory",
+            "1048576",
+            "--maxmemory-policy",
+            "allkeys-lfu",
+            "--set-max-intset-entries",
+            "64",
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert arguments["workers"] == 4 and arguments["port"] == 7000
+    assert arguments["host"] == "127.0.0.1"
+    assert arguments["append_fsync"] is FsyncPolicy.ALWAYS
+    assert arguments["maxmemory"] == 1048576
+    assert arguments["maxmemory_policy"] is EvictionPolicy.ALLKEYS_LFU
+    assert arguments["set_max_intset_entries"] == 64
+    assert arguments["hz"] == 10
+
+
+def test_cli_exposes_every_setting_of_main() -> None:
+    cli_parameters = inspect.signature(__main__.cli).parameters
+    main_parameters = inspect.signature(server.main).parameters
+    assert set(cli_parameters) == set(main_parameters) - {"shard"}
+    assert all(
+        cli_parameters[name].default == main_parameters[name].default
+        for name in cli_parameters
+    )
+
+
+def test_workers_serve_clients(tmp_path: Path) -> None:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # The workers are spawned, so they must be importable from a fresh
+    # interpreter, as they are when the server is started from a shell.
+    server = subprocess.Popen(
+        [sys.executable, "-m", "pyredis", "--workers", "2", "--port", str(port)],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parents[1])},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+
+    async def send(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter, command: str
+    ) -> bytes:
+        writer.write(Array.tokenize(command).encode())
+        return await reader.readline()
+
+    async def run() -> list[bytes]:
+        for _ in range(100):
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except ConnectionRefusedError:
+                assert server.poll() is None, server.communicate()[1]
+                await asyncio.sleep(0.1)
+        else:
+            raise AssertionError("the workers did not start listening")
+        replies = [await send(reader, writer, "PING")]
+        # Keys spread over both shards, so some commands are forwarded.
+        for key in range(8):
+            replies.append(await send(reader, writer, f"SET key{key} {key}"))
+        for key in range(8):
+            assert await send(reader, writer, f"GET key{key}") == b"$1\r\n"
+            replies.append(await reader.readline())
+        writer.close()
+        return replies
+
+    try:
+        replies = asyncio.run(asyncio.wait_for(run(), 30))
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    assert replies == [b"+PONG\r\n"] + [b"+OK\r\n"] * 8 + [
+        f"{key}\r\n".encode() for key in range(8)
+    ]
@@ -6,14 +6,19 @@ from pyredis.models.resp.resp_data_type import RespDataType
 from pyredis.models.resp.data_types.simple_string import SimpleString
 from pyredis.models.resp.data_types.error import Error
 from pyredis.models.resp.data_types.integer import Integer
-from pyredis.protocol_handler import extract_resp_data_and_size
+from pyredis.models.resp import shared_replies
+from pyredis.models.resp.shared_replies import SHARED_INTEGERS
+from pyredis.protocol_handler import (
+    CommandReader,
+    ProtocolError,
+    extract_command_arguments_and_size,
+    extract_resp_data_and_size,
+)
 
 
 @pytest.mark.parametrize(
     "payload, expected",
     [
-        # Test cases for invalid payloads
-        (b"PING\r\n", (None, 0)),
         # Test cases for Simple Strings
         (b"+PAR", (None, 0)),
         (b"+OK\r\n", (SimpleString("OK"), 5)),
@@ -37,25 +42,24 @@ from pyredis.protocol_handler import extract_resp_data_and_size
         # Test cases for Bulk Strings
         (b"$1", (None, 0)),
         (b"$18\r\nMissing terminator", (None, 0)),
-        (b"$NaN\r\nOK\r\n", (None, 0)),
-        (b"$2\r\nOK\r\n", (BulkString("OK"), 8)),
-        (b"$3\r\nToo long\r\n", (None, 0)),
+        (b"$2\r\nOK\r\n", (BulkString(b"OK"), 8)),
         (b"$12\r\nToo short\r\n", (None, 0)),
-        (b"$0\r\n\r\n", (BulkString(""), 6)),
-        (b"$16\r\nLong bulk string\r\n", (BulkString("Long bulk string"), 23)),
-        (b"$2\r\nOK\r\nextra", (BulkString("OK"), 8)),
+        (b"$0\r\n\r\n", (BulkString(b""), 6)),
+        (b"$16\r\nLong bulk string\r\n", (BulkString(b"Long bulk string"), 23)),
+        (b"$2\r\nOK\r\nextra", (BulkString(b"OK"), 8)),
         (b"$-1\r\n", (BulkString(None), 5)),
+        (b"$4\r\na\r\nb\r\n", (BulkString(b"a\r\nb"), 10)),
+        (b"$4\r\n\xc3\xa9\x00\xff\r\n", (BulkString(b"\xc3\xa9\x00\xff"), 10)),
         # Test cases for Arrays
         (b"*1", (None, 0)),
         (b"*1\r\n+Missing terminator", (None, 0)),
-        (b"*NaN\r\nOK\r\n", (None, 0)),
         (
             b"*2\r\n$5\r\nhello\r\n$5\r\nworld\r\n",
-            (Array.from_list([BulkString("hello"), BulkString("world")]), 26),
+            (Array.from_list([BulkString(b"hello"), BulkString(b"world")]), 26),
         ),
         (
             b"*2\r\n:1\r\n$5\r\nhello\r\n",
-            (Array.from_list([Integer(1), BulkString("hello")]), 19),
+            (Array.from_list([Integer(1), BulkString(b"hello")]), 19),
         ),
         (
             b"*2\r\n*1\r\n:1\r\n*1\r\n-Hello\r\n",
@@ -83,6 +87,25 @@ def test_extract_data_from_payload(
     assert actual == expected
 
 
+@pytest.mark.parametrize(
+    "payload",
+    [
+        b"PING\r\n",
+        b"PING",
+        b"\r\n",
+        b"$NaN\r\nOK\r\n",
+        b"$-2\r\n",
+        b"$3\r\nToo long\r\n",
+        b"*NaN\r\nOK\r\n",
+        b"*1\r\n$1\r\nab\r\n",
+        b"*2\r\n$1\r\na\r\n?\r\n",
+    ],
+)
+def test_extract_data_from_invalid_payload(payload: bytes) -> None:
+    with pytest.raises(ProtocolError):
+        extract_resp_data_and_size(payload)
+
+
 @pytest.mark.parametrize(
     "data, expected",
     [
@@ -94,9 +117,10 @@ def test_extract_data_from_payload(
         # Test cases for Integers
         (Integer(100), b":100\r\n"),
         # Test cases for Bulk Strings
-        (BulkString("This is a Bulk String"), b"$21\r\nThis is a Bulk String\r\n"),
-        (BulkString(""), b"$0\r\n\r\n"),
+        (BulkString(b"This is a Bulk String"), b"$21\r\nThis is a Bulk String\r\n"),
+        (BulkString(b""), b"$0\r\n\r\n"),
         (BulkString(None), b"$-1\r\n"),
+        (BulkString("é".encode()), b"$2\r\n\xc3\xa9\r\n"),
         # Test cases for Arrays
         (Array.from_list([]), b"*0\r\n"),
         (Array(None), b"*-1\r\n"),
@@ -111,3 +135,82 @@ def test_extract_data_from_payload(
 def test_encode_data(data: RespDataType, expected: bytes) -> None:
     actual = data.encode()
     assert actual == expected
+
+
+@pytest.mark.parametrize(
+    "payload, start, expected",
+    [
+        (b"+OK\r\n:1\r\n", 5, (Integer(1), 4)),
+        (b"+OK\r\n$5\r\nhel", 5, (None, 0)),
+        (
+            b":1\r\n*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n",
+            4,
+            (Array.from_list([BulkString(b"GET"), BulkString(b"key")]), 22),
+        ),
+    ],
+)
+def test_extract_data_from_offset(
+    payload: bytes,
+    start: int,
+    expected: tuple[RespDataType | None, int],
+) -> None:
+    actual = extract_resp_data_and_size(payload, start)
+    assert actual == expected
+
+
+def test_extract_large_array() -> None:
+    number_of_elements = 10_000
+    payload = (
+        f"*{number_of_elements}\r\n".encode() + b"$1\r\na\r\n" * number_of_elements
+    )
+    actual, size = extract_resp_data_and_size(bytearray(payload))
+    assert size == len(payload)
+    assert actual == Array.from_list([BulkString(b"a")] * number_of_elements)
+
+
+@pytest.mark.parametrize("value", [0, 1, SHARED_INTEGERS, SHARED_INTEGERS + 1, -1])
+def test_shared_integer_replies(value: int) -> None:
+    assert shared_replies.integer(value) == Integer(value).encode()
+    assert (shared_replies.integer(value) is shared_replies.integer(value)) == (
+        0 <= value <= SHARED_INTEGERS
+    )
+
+
+@pytest.mark.parametrize(
+    "payload, expected",
+    [
+        (b"*1\r\n$4\r\nPING\r\n", ([b"PING"], 14)),
+        (b"*2\r\n$3\r\nGET\r\n$3\r\na\r\n\r\n+extra", ([b"GET", b"a\r\n"], 22)),
+        (b"*0\r\n", ([], 4)),
+        (b"*2", (None, 0)),
+        (b"*2\r\n$3\r\nGET\r\n", (None, 0)),
+        (b"*2\r\n$3\r\nGET\r\n$3\r\nke", (None, 0)),
+    ],
+)
+def test_extract_command_arguments(
+    payload: bytes, expected: tuple[list[bytes] | None, int]
+) -> None:
+    assert extract_command_arguments_and_size(payload) == expected
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b"+OK\r\n", b"*1\r\n:1\r\n", b"*NaN\r\n", b"*1\r\n$1\r\nToo long\r\n"],
+)
+def test_extract_command_arguments_from_invalid_payload(payload: bytes) -> None:
+    with pytest.raises(ProtocolError):
+        extract_command_arguments_and_size(payload)
+
+
+def test_command_reader_resumes_commands_split_across_reads() -> None:
+    payload = b"*2\r\n$4\r\nECHO\r\n$5\r\nhello\r\n*1\r\n$4\r\nPING\r\n*0\r\n"
+    reader, commands = CommandReader(), []
+    for byte in payload:
+        reader.feed(bytes([byte]))
+        while (arguments := reader.read_command()) is not None:
+            commands.append((arguments, reader.last_command()))
+    assert commands == [
+        ([b"ECHO", b"hello"], b"*2\r\n$4\r\nECHO\r\n$5\r\nhello\r\n"),
+        ([b"PING"], b"*1\r\n$4\r\nPING\r\n"),
+        ([], b"*0\r\n"),
+    ]
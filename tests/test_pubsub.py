@@ -0,0 +1,73 @@
+import pytest
+
+from pyredis.models.pubsub import PubSub
+
+
+class FakeSubscriber:
+    def __init__(self) -> None:
+        self.messages: list[bytes] = []
+        self.written: list[list[bytes]] = []
+
+    def flush_messages(self) -> None:
+        self.written.append(self.messages)
+        self.messages = []
+
+
+@pytest.mark.parametrize(
+    "pattern, matches",
+    [
+        (b"news.*", [b"news.", b"news.sport"]),
+        (b"*", [b"news.", b"news.sport", b"new", b"other"]),
+        (b"new?", []),
+        (b"ne[wx]", [b"new"]),
+        (b"ne[^w]*", []),
+        (b"[^n]*", [b"other"]),
+        (b"news\\.*", [b"news.", b"news.sport"]),
+        (b"news\\*", []),
+        (b"news.sport", [b"news.sport"]),
+        (b"*.sport", [b"news.sport"]),
+    ],
+)
+def test_patterns_match_channels(pattern: bytes, matches: list[bytes]) -> None:
+    pubsub, subscriber = PubSub(), FakeSubscriber()
+    pubsub.psubscribe(subscriber, pattern)
+
+    published = [
+        channel
+        for channel in [b"news.", b"news.sport", b"new", b"other"]
+        if pubsub.publish(channel, b"message")
+    ]
+
+    assert published == matches
+
+
+def test_messages_are_encoded_once_for_all_subscribers() -> None:
+    pubsub = PubSub()
+    subscribers = [FakeSubscriber() for _ in range(3)]
+    for subscriber in subscribers:
+        pubsub.subscribe(subscriber, b"news")
+    pubsub.psubscribe(subscribers[0], b"n*")
+
+    assert pubsub.publish(b"news", b"hello") == 4
+
+    message = b"*3\r\n$7\r\nmessage\r\n$4\r\nnews\r\n$5\r\nhello\r\n"
+    pmessage = b"*4\r\n$8\r\npmessage\r\n$2\r\nn*\r\n$4\r\nnews\r\n$5\r\nhello\r\n"
+    assert subscribers[0].written == [[message, pmessage]]
+    assert [subscriber.written for subscriber in subscribers[1:]] == [[[message]]] * 2
+    assert all(
+        subscriber.written[0][0] is subscribers[0].written[0][0]
+        for subscriber in subscribers
+    )
+
+
+def test_unsubscribed_subscribers_get_nothing() -> None:
+    pubsub, subscriber = PubSub(), FakeSubscriber()
+    pubsub.subscribe(subscriber, b"news")
+    pubsub.psubscribe(subscriber, b"n*")
+    pubsub.psubscribe(subscriber, b"o*")
+    pubsub.unsubscribe(subscriber, b"news")
+    pubsub.punsubscribe(subscriber, b"n*")
+    pubsub.punsubscribe(subscriber, b"missing")
+
+    assert pubsub.publish(b"news", b"hello") == 0
+    assert pubsub.publish(b"other", b"hello") == 1
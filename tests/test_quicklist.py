@@ -0,0 +1,58 @@
+import pytest
+
+from pyredis.models.quicklist import NODE_CAPACITY, QuickList
+
+_LENGTH = NODE_CAPACITY * 5 + 3
+
+
+def _values(count: int) -> list[bytes]:
+    return [b"%d" % i for i in range(count)]
+
+
+def test_pushes_and_pops_at_both_ends() -> None:
+    quicklist, expected = QuickList(), list[bytes]()
+    for value in _values(_LENGTH):
+        quicklist.append(value)
+        quicklist.appendleft(value)
+        expected = [value, *expected, value]
+
+    assert list(quicklist) == expected and len(quicklist) == len(expected)
+    assert [quicklist.popleft() for _ in range(_LENGTH)] == expected[:_LENGTH]
+    assert [quicklist.pop() for _ in range(_LENGTH)] == expected[_LENGTH:][::-1]
+    assert len(quicklist) == 0
+    with pytest.raises(IndexError):
+        quicklist.pop()
+
+
+@pytest.mark.parametrize("index", [0, 1, NODE_CAPACITY, _LENGTH // 2, -1, -200])
+def test_indexing(index: int) -> None:
+    quicklist, expected = QuickList(_values(_LENGTH)), _values(_LENGTH)
+    quicklist.appendleft(b"head")
+    expected.insert(0, b"head")
+
+    assert quicklist[index] == expected[index]
+    quicklist[index] = b"changed"
+    expected[index] = b"changed"
+    assert list(quicklist) == expected
+
+
+@pytest.mark.parametrize("index", [_LENGTH, -_LENGTH - 1])
+def test_indexing_out_of_range(index: int) -> None:
+    with pytest.raises(IndexError):
+        QuickList(_values(_LENGTH))[index]
+
+
+@pytest.mark.parametrize(
+    "start, stop",
+    [(0, _LENGTH), (5, 10), (NODE_CAPACITY - 1, NODE_CAPACITY * 3 + 1), (7, 7)],
+)
+def test_range_and_trim(start: int, stop: int) -> None:
+    quicklist, expected = QuickList(_values(_LENGTH)), _values(_LENGTH)
+
+    assert quicklist.range(start, stop) == expected[start:stop]
+
+    quicklist.trim(start, stop)
+    assert list(quicklist) == expected[start:stop]
+    assert len(quicklist) == stop - start
+    quicklist.appendleft(b"head")
+    assert quicklist[0] == b"head"
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import tempfile
+from typing import Iterable
+
+import pytest
+
+from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp.data_types.array import Array
+from pyredis.models.server_protocol import ServerProtocol
+from pyredis.models.shard_router import ShardReply
+
+# Commands logged by tests that do not check the log go to a scratch directory.
+_SCRATCH_DIRECTORY = tempfile.mkdtemp()
+_PERSISTER = AppendOnlyPersister(
+    os.path.join(_SCRATCH_DIRECTORY, "test.aof"),
+    snapshot_filename=os.path.join(_SCRATCH_DIRECTORY, "test.snapshot"),
+)
+
+
+class FakeTransport:
+    def __init__(self) -> None:
+        self.writes: list[list[bytes]] = []
+        self.closed = False
+
+    def writelines(self, data: Iterable[bytes]) -> None:
+        self.writes.append(list(data))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def protocol_and_transport() -> tuple[ServerProtocol, FakeTransport]:
+    protocol, transport = ServerProtocol(DataStore(), _PERSISTER), FakeTransport()
+    protocol.connection_made(transport)  # type: ignore
+    return protocol, transport
+
+
+def test_pipelined_commands_are_answered_in_order_in_one_write(
+    protocol_and_transport: tuple[ServerProtocol, FakeTransport],
+) -> None:
+    protocol, transport = protocol_and_transport
+    protocol.data_received(
+        b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$5\r\nvalue\r\n"
+        b"*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n"
+        b"*1\r\n$4\r\nPING\r\n"
+    )
+    assert transport.writes == [[b"+OK\r\n", b"$5\r\nvalue\r\n", b"+PONG\r\n"]]
+
+
+def test_command_split_across_reads_is_buffered(
+    protocol_and_transport: tuple[ServerProtocol, FakeTransport],
+) -> None:
+    protocol, transport = protocol_and_transport
+    protocol.data_received(b"*2\r\n$4\r\nECHO\r\n$5\r\nhel")
+    assert transport.writes == []
+    protocol.data_received(b"lo\r\n*1\r\n$4\r\nPI")
+    assert transport.writes == [[b"$5\r\nhello\r\n"]]
+    protocol.data_received(b"NG\r\n")
+    assert transport.writes == [[b"$5\r\nhello\r\n"], [b"+PONG\r\n"]]
+
+
+@pytest.mark.parametrize(
+    "payload, error",
+    [
+        (b"PING\r\n", b"expected '*', got 'P'"),
+        (b"+OK\r\n", b"expected '*', got '+'"),
+        (b"*1\r\n:1\r\n", b"expected '$', got ':'"),
+        (b"*1\r\n$x\r\nPING\r\n", b"invalid length prefix"),
+        (
+            b"*1\r\n$3\r\nPING\r\n",
+            b"bulk string is longer than its length prefix",
+        ),
+    ],
+)
+def test_malformed_input_is_answered_with_an_error_and_closes_the_connection(
+    protocol_and_transport: tuple[ServerProtocol, FakeTransport],
+    payload: bytes,
+    error: bytes,
+) -> None:
+    protocol, transport = protocol_and_transport
+    protocol.data_received(b"*1\r\n$4\r\nPING\r\n" + payload)
+    protocol.data_received(b"*1\r\n$4\r\nPING\r\n")
+    assert transport.writes == [
+        [b"+PONG\r\n", b"-ERR Protocol error: " + error + b"\r\n"]
+    ]
+    assert transport.closed
+
+
+def test_replies_wait_for_forwarded_commands() -> None:
+    async def run() -> list[list[bytes]]:
+        forwarded = asyncio.get_running_loop().create_future()
+
+        class FakeRouter:
+            def execute(self, command: Array, raw_command: bytes) -> ShardReply:
+                if str(command[0]) == "GET":
+                    return forwarded
+                return b"+PONG\r\n"
+
+        protocol = ServerProtocol(DataStore(), _PERSISTER, FakeRouter())  # type: ignore
+        transport = FakeTransport()
+        protocol.connection_made(transport)  # type: ignore
+        protocol.data_received(
+            b"*1\r\n$4\r\nPING\r\n*2\r\n$3\r\nGET\r\n$3\r\nkey\r\n*1\r\n$4\r\nPING\r\n"
+        )
+        forwarded.set_result(b"$5\r\nvalue\r\n")
+        await asyncio.sleep(0)
+        return transport.writes
+
+    assert asyncio.run(run()) == [
+        [b"+PONG\r\n"],
+        [b"$5\r\nvalue\r\n", b"+PONG\r\n"],
+    ]
+
+
+def test_blocked_replies_are_written_once_served_and_dropped_on_disconnect() -> None:
+    async def run() -> tuple[list[list[bytes]], list[list[bytes]]]:
+        data_store = DataStore()
+        gone, waiting, pusher = [
+            ServerProtocol(data_store, _PERSISTER) for _ in range(3)
+        ]
+        transports = [FakeTransport() for _ in range(3)]
+        for protocol, transport in zip([gone, waiting, pusher], transports):
+            protocol.connection_made(transport)  # type: ignore
+        blpop = b"*3\r\n$5\r\nBLPOP\r\n$4\r\njobs\r\n$1\r\n0\r\n"
+        gone.data_received(blpop)
+        waiting.data_received(blpop + b"*1\r\n$4\r\nPING\r\n")
+        gone.connection_lost(None)
+        await asyncio.sleep(0)
+        pusher.data_received(b"*3\r\n$5\r\nRPUSH\r\n$4\r\njobs\r\n$3\r\njob\r\n")
+        await asyncio.sleep(0)
+        return transports[0].writes, transports[1].writes
+
+    gone_writes, waiting_writes = asyncio.run(run())
+
+    assert gone_writes == []
+    assert waiting_writes == [
+        [b"*2\r\n$4\r\njobs\r\n$3\r\njob\r\n", b"+PONG\r\n"],
+    ]
+
+
+def test_subscribers_get_messages_in_push_mode() -> None:
+    async def run() -> tuple[list[list[bytes]], list[list[bytes]]]:
+        data_store = DataStore()
+        subscriber, publisher = [
+            ServerProtocol(data_store, _PERSISTER) for _ in range(2)
+        ]
+        transports = [FakeTransport(), FakeTransport()]
+        subscriber.connection_made(transports[0])  # type: ignore
+        publisher.connection_made(transports[1])  # type: ignore
+        subscriber.data_received(
+            b"*3\r\n$9\r\nSUBSCRIBE\r\n$1\r\na\r\n$1\r\nb\r\n"
+            b"*2\r\n$10\r\nPSUBSCRIBE\r\n$2\r\na*\r\n"
+            b"*2\r\n$3\r\nGET\r\n$1\r\na\r\n"
+            b"*1\r\n$4\r\nPING\r\n"
+        )
+        publisher.data_received(
+            b"*3\r\n$7\r\nPUBLISH\r\n$1\r\na\r\n$1\r\nx\r\n"
+            b"*3\r\n$7\r\nPUBLISH\r\n$1\r\nb\r\n$1\r\ny\r\n"
+        )
+        await asyncio.sleep(0)
+        subscriber.data_received(b"*1\r\n$11\r\nUNSUBSCRIBE\r\n")
+        subscriber.connection_lost(None)
+        publisher.data_received(b"*3\r\n$7\r\nPUBLISH\r\n$1\r\na\r\n$1\r\nz\r\n")
+        return transports[0].writes, transports[1].writes
+
+    subscriber_writes, publisher_writes = asyncio.run(run())
+
+    assert subscriber_writes == [
+        [
+            b"*3\r\n$9\r\nsubscribe\r\n$1\r\na\r\n:1\r\n"
+            b"*3\r\n$9\r\nsubscribe\r\n$1\r\nb\r\n:2\r\n",
+            b"*3\r\n$10\r\npsubscribe\r\n$2\r\na*\r\n:3\r\n",
+            b"-ERR Can't execute 'get': only (P)SUBSCRIBE / (P)UNSUBSCRIBE / PING"
+            b" are allowed in this context\r\n",
+            b"*2\r\n$4\r\npong\r\n$0\r\n\r\n",
+        ],
+        [
+            b"*3\r\n$7\r\nmessage\r\n$1\r\na\r\n$1\r\nx\r\n",
+            b"*4\r\n$8\r\npmessage\r\n$2\r\na*\r\n$1\r\na\r\n$1\r\nx\r\n",
+            b"*3\r\n$7\r\nmessage\r\n$1\r\nb\r\n$1\r\ny\r\n",
+        ],
+        [
+            b"*3\r\n$11\r\nunsubscribe\r\n$1\r\na\r\n:2\r\n"
+            b"*3\r\n$11\r\nunsubscribe\r\n$1\r\nb\r\n:1\r\n"
+        ],
+    ]
+    assert publisher_writes == [[b":2\r\n", b":1\r\n"], [b":0\r\n"]]
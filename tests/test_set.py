@@ -0,0 +1,64 @@
+import pytest
+
+from pyredis.models.set import Set, difference, intersection, union
+
+_MAX_INTSET_ENTRIES = 4
+
+
+def _set(*members: bytes) -> Set:
+    member_set = Set()
+    for member in members:
+        member_set.add(member, _MAX_INTSET_ENTRIES)
+    return member_set
+
+
+@pytest.mark.parametrize(
+    "members, intset",
+    [
+        ([b"3", b"-1", b"2"], True),
+        ([b"1", b"2", b"3", b"4", b"5"], False),
+        ([b"1", b"a"], False),
+        ([b"1", b"01"], False),
+        ([b"9223372036854775808"], False),
+    ],
+)
+def test_encoding(members: list[bytes], intset: bool) -> None:
+    member_set = _set(*members)
+
+    assert member_set.intset == intset
+    assert set(member_set) == set(members) and len(member_set) == len(members)
+    assert all(member in member_set for member in members)
+    assert b"7" not in member_set and b"x" not in member_set
+
+
+@pytest.mark.parametrize("members", [[b"1", b"2", b"3"], [b"a", b"1", b"b"]])
+def test_add_and_remove(members: list[bytes]) -> None:
+    member_set = _set(*members)
+
+    assert not member_set.add(members[0], _MAX_INTSET_ENTRIES)
+    assert member_set.remove(members[1])
+    assert not member_set.remove(members[1])
+    assert not member_set.remove(b"missing")
+    assert set(member_set) == {members[0], members[2]}
+    assert {member_set.pop(), member_set.pop()} == {members[0], members[2]}
+    assert not member_set
+
+
+@pytest.mark.parametrize(
+    "sets, expected",
+    [
+        ([_set(b"1", b"2", b"3"), _set(b"2", b"3"), _set(b"3", b"1")], {b"3"}),
+        ([_set(b"1", b"2", b"a"), _set(b"2", b"a"), _set(b"a", b"2")], {b"2", b"a"}),
+        ([_set(b"1", b"2"), _set(b"2", b"a")], {b"2"}),
+        ([_set(b"1"), Set()], set()),
+    ],
+)
+def test_intersection(sets: list[Set], expected: set[bytes]) -> None:
+    assert set(intersection(sets)) == expected
+
+
+def test_union_and_difference() -> None:
+    sets = [_set(b"1", b"2", b"a"), _set(b"2"), _set(b"a", b"b")]
+
+    assert sorted(union(sets)) == [b"1", b"2", b"a", b"b"]
+    assert difference(sets[0], sets[1:]) == [b"1"]
@@ -0,0 +1,170 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp.data_types.array import Array
+from pyredis.models.resp.data_types.bulk_string import BulkString
+from pyredis.models.server_protocol import ServerProtocol
+from pyredis.protocol_handler import extract_resp_data_and_size
+from pyredis.models.shard_router import (
+    ShardReply,
+    ShardRouter,
+    connect_to_shards,
+    key_slot,
+    shard_socket_path,
+)
+
+
+@pytest.mark.parametrize(
+    "key, slot",
+    [
+        (b"foo", 12182),
+        (b"bar", 5061),
+        (b"{user1000}.following", 3443),
+        (b"{user1000}.followers", 3443),
+        (b"foo{}{bar}", 8363),
+    ],
+)
+def test_key_slot(key: bytes, slot: int) -> None:
+    assert key_slot(key) == slot
+
+
+def parse_array(reply: bytes) -> Array:
+    data, _ = extract_resp_data_and_size(reply, 0)
+    assert isinstance(data, Array)
+    return data
+
+
+class Subscriber:
+    def __init__(self) -> None:
+        self.messages: list[bytes] = []
+
+    def flush_messages(self) -> None:
+        self.messages = []
+
+
+def test_commands_run_on_the_shard_owning_their_keys(tmp_path: Path) -> None:
+    port, data_stores = 40000 + os.getpid() % 10000, [DataStore(), DataStore()]
+
+    async def execute(router: ShardRouter, command: str) -> bytes:
+        reply: ShardReply = router.execute(
+            Array.tokenize(command), Array.tokenize(command).encode()
+        )
+        return reply if isinstance(reply, bytes) else await reply
+
+    async def run() -> tuple[list[bytes], list[int]]:
+        loop = asyncio.get_running_loop()
+        persisters = [
+            AppendOnlyPersister(str(tmp_path / f"{shard}.aof")) for shard in range(2)
+        ]
+        for shard in range(2):
+            await loop.create_unix_server(
+                lambda shard=shard: ServerProtocol(  # type: ignore
+                    data_stores[shard], persisters[shard]
+                ),
+                shard_socket_path(port, shard),
+            )
+        peers = await connect_to_shards(port, 0, 2)
+        router = ShardRouter(data_stores[0], persisters[0], peers)
+        keys = " ".join(f"key{i}" for i in range(10))
+        pairs = " ".join(f"key{i} value{i}" for i in range(10))
+        replies = [await execute(router, f"MSET {pairs}")]
+        sizes = [len(data_store) for data_store in data_stores]
+        replies.append(await execute(router, "GET key7"))
+        replies.append(await execute(router, "MGET key3 missing key8 key0"))
+        replies.append(await execute(router, f"MSETNX {pairs}"))
+        replies.append(await execute(router, f"EXISTS {keys} missing"))
+        scanned, cursor = [], b"0"
+        while True:
+            reply = parse_array(
+                await execute(router, f"SCAN {cursor.decode()} COUNT 3")
+            )
+            cursor = reply[0].data
+            scanned += [key.data for key in reply[1]]
+            if cursor == b"0":
+                break
+        found = parse_array(await execute(router, "KEYS key*"))
+        expected = sorted(f"key{i}".encode() for i in range(10))
+        assert (
+            sorted(scanned)
+            == sorted(found[i].data for i in range(len(found)))
+            == expected
+        )
+        replies.append(await execute(router, "MEMORY USAGE missing"))
+        stats = parse_array(await execute(router, "MEMORY STATS"))
+        assert stats[0].data == b"peak.allocated"
+        replies.append(await execute(router, "OBJECT HELP"))
+        replies.append(await execute(router, f"DEL {keys}"))
+        for data_store in data_stores:
+            data_store.pubsub.subscribe(Subscriber(), b"news")
+        replies.append(await execute(router, "PUBLISH news hello"))
+        return replies, sizes
+
+    replies, sizes = asyncio.run(run())
+
+    assert replies == [
+        b"+OK\r\n",
+        b"$6\r\nvalue7\r\n",
+        b"*4\r\n$6\r\nvalue3\r\n$-1\r\n$6\r\nvalue8\r\n$6\r\nvalue0\r\n",
+        b"-CROSSSLOT Keys in request don't hash to the same slot\r\n",
+        b":10\r\n",
+        b"$-1\r\n",
+        b"-ERR unknown subcommand or wrong number of arguments for 'HELP'\r\n",
+        b":10\r\n",
+        b":2\r\n",
+    ]
+    assert sizes[0] > 0 and sizes[1] > 0 and sum(sizes) == 10
+    assert all(len(data_store) == 0 for data_store in data_stores)
+
+
+def test_blocked_commands_do_not_hold_up_other_clients(tmp_path: Path) -> None:
+    port, data_stores = 30000 + os.getpid() % 10000, [DataStore(), DataStore()]
+
+    async def run() -> tuple[bytes, list[bytes]]:
+        loop = asyncio.get_running_loop()
+        persister = AppendOnlyPersister(str(tmp_path / "blocking.aof"))
+        for shard in range(2):
+            await loop.create_unix_server(
+                lambda shard=shard: ServerProtocol(  # type: ignore
+                    data_stores[shard], persister
+                ),
+                shard_socket_path(port, shard),
+            )
+        peers = await connect_to_shards(port, 0, 2)
+        router = ShardRouter(data_stores[0], persister, peers)
+        key, other = [
+            key
+            for key in (b"key%d" % i for i in range(20))
+            if router.shard_of(key) == 1
+        ][:2]
+
+        def send(*arguments: bytes) -> asyncio.Future[bytes]:
+            command = Array.from_list([BulkString(argument) for argument in arguments])
+            reply = router.execute(command, command.encode())
+            assert isinstance(reply, asyncio.Future)
+            return reply
+
+        gone, served = send(b"BLPOP", key, b"0"), send(b"BLPOP", key, b"0")
+        replies = [await asyncio.wait_for(send(b"SET", other, b"value"), 1)]
+        while len(data_stores[1].blocked_clients) < 2:
+            await asyncio.sleep(0.01)
+        gone.cancel()
+        while len(data_stores[1].blocked_clients) > 1:
+            await asyncio.sleep(0.01)
+        replies.append(await send(b"RPUSH", key, b"a", b"b"))
+        replies.append(await asyncio.wait_for(served, 1))
+        replies.append(await send(b"LRANGE", key, b"0", b"-1"))
+        return key, replies
+
+    key, replies = asyncio.run(run())
+
+    assert replies == [
+        b"+OK\r\n",
+        b":2\r\n",
+        b"*2\r\n$%d\r\n%b\r\n$1\r\na\r\n" % (len(key), key),
+        b"*1\r\n$1\r\nb\r\n",
+    ]
@@ -0,0 +1,149 @@
+import asyncio
+from pathlib import Path
+
+from pyredis.append_only_loader import restore
+from pyredis.command_handler import handle_command
+from pyredis.models.append_only_persister import AppendOnlyPersister
+from pyredis.models.data_store import DataStore
+from pyredis.models.resp.data_types.array import Array
+from pyredis.models.snapshot import (
+    SnapshotHeader,
+    load_snapshot,
+    read_snapshot_header,
+    write_snapshot,
+)
+
+
+def _execute(
+    command: str, data_store: DataStore, persister: AppendOnlyPersister | None
+) -> None:
+    handle_command(Array.tokenize(command), data_store, persister)
+
+
+def _populate(data_store: DataStore, persister: AppendOnlyPersister | None) -> None:
+    _execute("SET string value", data_store, persister)
+    _execute("SET integer 1234567890123456789", data_store, persister)
+    _execute("SET expiring value PX 100000", data_store, persister)
+    _execute("RPUSH list a b c", data_store, persister)
+    _execute("HSET hash field value other 1", data_store, persister)
+    _execute("ZADD zset 1.5 a -inf b", data_store, persister)
+    _execute("SADD intset 3 1 2", data_store, persister)
+    _execute("SADD set a 1", data_store, persister)
+
+
+def _assert_populated(data_store: DataStore) -> None:
+    assert data_store[b"string"].value == b"value"
+    assert data_store[b"integer"].value == 1234567890123456789
+    assert data_store[b"expiring"].value == b"value"
+    assert data_store[b"expiring"].expiry is not None
+    assert list(data_store[b"list"].value) == [b"a", b"b", b"c"]
+    assert dict(data_store[b"hash"].value.items()) == {
+        b"field": b"value",
+        b"other": b"1",
+    }
+    assert data_store[b"intset"].value.intset
+    assert list(data_store[b"intset"].value) == [b"1", b"2", b"3"]
+    assert set(data_store[b"set"].value) == {b"a", b"1"}
+    assert list(data_store[b"zset"].value.items()) == [
+        (b"b", float("-inf")),
+        (b"a", 1.5),
+    ]
+
+
+def test_snapshot_round_trip(tmp_path: Path) -> None:
+    filename, data_store = str(tmp_path / "test.snapshot"), DataStore()
+    _populate(data_store, None)
+
+    write_snapshot(filename, data_store, SnapshotHeader(1, 2))
+
+    assert read_snapshot_header(filename) == SnapshotHeader(1, 2)
+    restored = DataStore()
+    assert load_snapshot(filename, restored)
+    _assert_populated(restored)
+
+
+def test_snapshot_keeps_the_furthest_expiry(tmp_path: Path) -> None:
+    filename, data_store = str(tmp_path / "test.snapshot"), DataStore()
+    _execute(f"SET key value PXAT {2**62}", data_store, None)
+    _execute("SET other value PXAT 99999999999999999999", data_store, None)
+
+    write_snapshot(filename, data_store, SnapshotHeader(1, 2))
+
+    restored = DataStore()
+    assert load_snapshot(filename, restored)
+    assert restored[b"key"].expiry == 2**62 and b"other" not in restored
+
+
+def test_corrupt_snapshot_is_rejected(tmp_path: Path) -> None:
+    filename, data_store = tmp_path / "test.snapshot", DataStore()
+    _populate(data_store, None)
+    write_snapshot(str(filename), data_store, SnapshotHeader(1, 2))
+    payload = bytearray(filename.read_bytes())
+    payload[-10] ^= 0xFF
+    filename.write_bytes(payload)
+
+    restored = DataStore()
+    assert not load_snapshot(str(filename), restored)
+    assert b"string" not in restored
+
+
+def test_restore_replays_only_commands_after_snapshot(tmp_path: Path) -> None:
+    aof_filename, snapshot_filename = tmp_path / "test.aof", tmp_path / "test.snapshot"
+    data_store = DataStore()
+    persister = AppendOnlyPersister(
+        str(aof_filename), snapshot_filename=str(snapshot_filename)
+    )
+    _populate(data_store, persister)
+    persister.save(data_store)
+    # Tamper with the logged history to show it is not replayed again.
+    aof_size = aof_filename.stat().st_size
+    with open(aof_filename, "r+b") as file:
+        file.write(Array.tokenize("SET string ignored").encode()[:aof_size])
+    _execute("RPUSH list d", data_store, persister)
+
+    restored = DataStore()
+    assert restore(str(aof_filename), str(snapshot_filename), restored)
+
+    assert restored[b"string"].value == b"value"
+    assert list(restored[b"list"].value) == [b"a", b"b", b"c", b"d"]
+
+
+def test_restore_ignores_snapshot_of_another_aof(tmp_path: Path) -> None:
+    aof_filename, snapshot_filename = tmp_path / "test.aof", tmp_path / "test.snapshot"
+    data_store = DataStore()
+    persister = AppendOnlyPersister(
+        str(aof_filename), snapshot_filename=str(snapshot_filename)
+    )
+    _populate(data_store, persister)
+    persister.save(data_store)
+    persister.rewrite(data_store)
+    _execute("SET string rewritten", data_store, persister)
+
+    restored = DataStore()
+    assert restore(str(aof_filename), str(snapshot_filename), restored)
+
+    assert restored[b"string"].value == b"rewritten"
+    assert list(restored[b"list"].value) == [b"a", b"b", b"c"]
+
+
+def test_background_save(tmp_path: Path) -> None:
+    filename = tmp_path / "test.snapshot"
+
+    async def save() -> None:
+        data_store = DataStore()
+        persister = AppendOnlyPersister(
+            str(tmp_path / "test.aof"), snapshot_filename=str(filename)
+        )
+        _populate(data_store, persister)
+        assert persister.start_background_save(data_store)
+        assert not persister.start_background_save(data_store)
+        _execute("SET after_fork value", data_store, persister)
+        while persister.child_in_progress:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(save())
+
+    restored = DataStore()
+    assert load_snapshot(str(filename), restored)
+    _assert_populated(restored)
+    assert b"after_fork" not in restored
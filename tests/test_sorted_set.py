@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from pyredis.models.sorted_set import (
+    ScoreRange,
+    SortedSet,
+    format_score,
+    parse_score,
+)
+
+_MAX_ENTRIES, _MAX_VALUE = 16, 8
+
+
+def _random_sorted_set(size: int, seed: int) -> tuple[SortedSet, dict[bytes, float]]:
+    rng, sorted_set, scores = random.Random(seed), SortedSet(), {}
+    for _ in range(size * 3):
+        member, score = b"m%d" % rng.randrange(size), float(rng.randrange(size // 2))
+        is_new = member not in scores
+        assert sorted_set.add(member, score, _MAX_ENTRIES, _MAX_VALUE) == is_new
+        scores[member] = score
+    return sorted_set, scores
+
+
+def _ordered(scores: dict[bytes, float]) -> list[tuple[bytes, float]]:
+    return sorted(scores.items(), key=lambda item: (item[1], item[0]))
+
+
+@pytest.mark.parametrize("size, compact", [(10, True), (1000, False)])
+def test_matches_a_sorted_list(size: int, compact: bool) -> None:
+    sorted_set, scores = _random_sorted_set(size, seed=size)
+    expected = _ordered(scores)
+
+    assert sorted_set.compact == compact
+    assert list(sorted_set.items()) == expected and len(sorted_set) == len(expected)
+    assert [sorted_set.rank(member) for member, _ in expected] == list(
+        range(len(expected))
+    )
+    assert all(sorted_set.score(member) == score for member, score in expected)
+    assert sorted_set.score(b"missing") is None and sorted_set.rank(b"x") is None
+    for start, stop in [(0, len(expected)), (3, 7), (len(expected) - 1, len(expected))]:
+        assert sorted_set.range(start, stop) == expected[start:stop]
+
+
+@pytest.mark.parametrize("size", [10, 1000])
+@pytest.mark.parametrize(
+    "score_range, offset, count",
+    [
+        (ScoreRange(2, 4), 0, -1),
+        (ScoreRange(2, 4, True, True), 0, -1),
+        (ScoreRange(float("-inf"), float("inf")), 2, 3),
+        (ScoreRange(3, 2), 0, -1),
+    ],
+)
+def test_range_by_score(
+    size: int, score_range: ScoreRange, offset: int, count: int
+) -> None:
+    sorted_set, scores = _random_sorted_set(size, seed=size)
+    in_range = [
+        item
+        for item in _ordered(scores)
+        if score_range.above_min(item[1]) and score_range.below_max(item[1])
+    ]
+    expected = in_range[offset:] if count < 0 else in_range[offset : offset + count]
+
+    assert sorted_set.range_by_score(score_range, offset, count) == expected
+
+
+@pytest.mark.parametrize("size", [10, 1000])
+def test_popmin_empties_in_order(size: int) -> None:
+    sorted_set, scores = _random_sorted_set(size, seed=size)
+
+    assert [sorted_set.popmin() for _ in range(len(scores))] == _ordered(scores)
+    with pytest.raises(KeyError):
+        sorted_set.popmin()
+
+
+def test_long_member_converts() -> None:
+    sorted_set = SortedSet()
+    sorted_set.add(b"short", 1, _MAX_ENTRIES, _MAX_VALUE)
+    sorted_set.add(b"x" * 9, 0, _MAX_ENTRIES, _MAX_VALUE)
+
+    assert not sorted_set.compact
+    assert list(sorted_set.items()) == [(b"x" * 9, 0), (b"short", 1)]
+
+
+@pytest.mark.parametrize(
+    "data, score",
+    [
+        (b"1", 1.0),
+        (b"-2.5", -2.5),
+        (b"inf", float("inf")),
+        (b"nan", None),
+        (b"x", None),
+    ],
+)
+def test_parse_score(data: bytes, score: float | None) -> None:
+    assert parse_score(data) == score
+
+
+@pytest.mark.parametrize(
+    "score, data",
+    [
+        (1.0, b"1"),
+        (-2.5, b"-2.5"),
+        (0.1, b"0.1"),
+        (float("-inf"), b"-inf"),
+        (1e20, b"1e+20"),
+    ],
+)
+def test_format_score(score: float, data: bytes) -> None:
+    assert format_score(score) == data